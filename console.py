@@ -3,23 +3,21 @@
 """ This module contains the entry point of the command interpreter"""
 
 import cmd
+import math
 import models
 import re
-from models.base_model import BaseModel
-from models.user import User
-from models.state import State
-from models.city import City
-from models.amenity import Amenity
-from models.place import Place
-from models.review import Review
+import sys
 
 
 class HBNBCommand(cmd.Cmd):
     """The HBNB command interpreter"""
 
     prompt = "(hbnb) "
-    classes = {"BaseModel", "User", "State", "City",
-               "Amenity", "Place", "Review"}
+    classes = models.classes
+    # The bounds of the numbers of the location commands, by name
+    bounds = {"latitude": (-90, 90), "longitude": (-180, 180),
+              "south": (-90, 90), "west": (-180, 180),
+              "north": (-90, 90), "east": (-180, 180)}
 
     def do_quit(self, line):
         """Quit command to exit the program"""
@@ -41,7 +39,7 @@ class HBNBCommand(cmd.Cmd):
         elif line not in HBNBCommand.classes:
             print("** class doesn't exist **")
         else:
-            object = eval(line)()
+            object = HBNBCommand.classes[line]()
             object.save()
             print(object.id)
 
@@ -56,12 +54,11 @@ class HBNBCommand(cmd.Cmd):
             elif len(args) < 2:
                 print("** instance id missing **")
             else:
-                key = "{}.{}".format(args[0], args[1])
-                objects = models.storage.all()
-                if key not in objects.keys():
+                obj = models.storage.get(args[0], args[1])
+                if obj is None:
                     print("** no instance found **")
                 else:
-                    print(objects[key])
+                    print(obj)
 
     def do_destroy(self, line):
         """Deletes an instance based on the class name and id"""
@@ -74,26 +71,23 @@ class HBNBCommand(cmd.Cmd):
             elif len(args) < 2:
                 print("** instance id missing **")
             else:
-                key = "{}.{}".format(args[0], args[1])
-                objects = models.storage.all()
-                if key not in objects.keys():
+                obj = models.storage.get(args[0], args[1])
+                if obj is None:
                     print("** no instance found **")
                 else:
-                    del objects[key]
+                    models.storage.delete(obj)
                     models.storage.save()
 
     def do_all(self, line):
         """Prints all string representation of all instances"""
-        objects = models.storage.all()
         objects_list = []
         if not line:
-            for obj in objects.values():
+            for obj in models.storage.all().values():
                 objects_list.append(str(obj))
             print(objects_list)
         elif line in HBNBCommand.classes:
-            for obj in objects.values():
-                if obj.__class__.__name__ == line:
-                    objects_list.append(str(obj))
+            for obj in models.storage.all(line).values():
+                objects_list.append(str(obj))
             print(objects_list)
         else:
             print("** class doesn't exist **")
@@ -109,9 +103,8 @@ class HBNBCommand(cmd.Cmd):
             elif len(args) < 2:
                 print("** instance id missing **")
             else:
-                key = "{}.{}".format(args[0], args[1])
-                objects = models.storage.all()
-                if key not in objects.keys():
+                obj = models.storage.get(args[0], args[1])
+                if obj is None:
                     print("** no instance found **")
                 elif len(args) < 3:
                     print("** attribute name missing **")
@@ -119,10 +112,15 @@ class HBNBCommand(cmd.Cmd):
                     print("** value missing **")
                 else:
                     try:
-                        setattr(objects[key], args[2], eval(args[3]))
-                    except NameError:
-                        setattr(objects[key], args[2], args[3])
-                    objects[key].save()
+                        value = eval(args[3])
+                    except (NameError, SyntaxError):
+                        value = args[3]
+                    try:
+                        setattr(obj, args[2], value)
+                    except ValueError:
+                        print(f"** {args[2]} already exists **")
+                        return
+                    obj.save()
 
     def do_count(self, line):
         """Counts the number of instances of a class"""
@@ -131,12 +129,60 @@ class HBNBCommand(cmd.Cmd):
         elif line not in HBNBCommand.classes:
             print("** class doesn't exist **")
         else:
-            objects = models.storage.all()
-            count = 0
-            for obj in objects.values():
-                if obj.__class__.__name__ == line:
-                    count += 1
-            print(count)
+            print(models.storage.count(line))
+
+    def do_near(self, line):
+        """Prints the places within a radius in km, nearest first"""
+        args = self.__numbers(line, ("latitude", "longitude", "radius"))
+        if args is not None:
+            latitude, longitude, radius = args
+            query = models.storage.query("Place").near(
+                latitude, longitude, radius)
+            self.__print_places(query.nearest(latitude, longitude))
+
+    def do_nearest(self, line):
+        """Prints the places nearest to a location"""
+        args = self.__numbers(line, ("latitude", "longitude", "count"))
+        if args is not None:
+            latitude, longitude, count = args
+            if count != int(count) or count < 0:
+                print("** invalid count **")
+                return
+            self.__print_places(models.storage.query("Place").nearest(
+                latitude, longitude, int(min(count, sys.maxsize))))
+
+    def do_within(self, line):
+        """Prints the places inside a box of latitudes and longitudes"""
+        args = self.__numbers(line, ("south", "west", "north", "east"))
+        if args is not None:
+            self.__print_places(models.storage.query("Place").within(*args))
+
+    @staticmethod
+    def __numbers(line, names):
+        """Return the numbers named `names` on `line`, or None after
+        printing which one is missing or invalid: not a finite number
+        or out of its `bounds`"""
+        args = line.split()
+        numbers = []
+        for i, name in enumerate(names):
+            if i >= len(args):
+                print(f"** {name} missing **")
+                return None
+            low, high = HBNBCommand.bounds.get(name, (-math.inf, math.inf))
+            try:
+                number = float(args[i])
+            except ValueError:
+                number = math.nan
+            if not math.isfinite(number) or not low <= number <= high:
+                print(f"** invalid {name} **")
+                return None
+            numbers.append(number)
+        return numbers
+
+    @staticmethod
+    def __print_places(places):
+        """Prints the string representation of each of `places`"""
+        print([str(place) for place in places])
 
     def default(self, line: str):
         """Default command to handle commands followed by a dot"""
@@ -2,7 +2,15 @@
 
 """ An initialization file"""
 
-from models.engine.file_storage import FileStorage
+from os import getenv
 
-storage = FileStorage()
+# Every BaseModel class by name, filled in as the classes are defined
+classes = {}
+
+if getenv("HBNB_TYPE_STORAGE") == "db":
+    from models.engine.db_storage import DBStorage
+    storage = DBStorage()
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
 storage.reload()
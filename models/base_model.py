@@ -17,7 +17,26 @@ class BaseModel:
 
     A class that defines all common attributes/methods for other classes
 
+    Every subclass is registered by name in `models.classes`
+    as soon as it is defined, and no two may share a name.
+
     """
+    def __init_subclass__(cls, **kwargs):
+        """Register a new subclass in `models.classes`
+
+        Raises:
+            ValueError: If another class is registered under its name,
+                        unless it's the same class defined again, as
+                        when its module is reloaded
+        """
+        super().__init_subclass__(**kwargs)
+        other = models.classes.get(cls.__name__)
+        if other is not None and (
+                (other.__module__, other.__qualname__) !=
+                (cls.__module__, cls.__qualname__)):
+            raise ValueError(f"Duplicate model name: {cls.__name__}")
+        models.classes[cls.__name__] = cls
+
     def __init__(self, *args, **kwargs):
         """Initialize an instance of the BaseModel class
 
@@ -40,6 +59,44 @@ class BaseModel:
         else:
             models.storage.new(self)
 
+    @classmethod
+    def from_dict(cls, obj_dict):
+        """Build an instance from a dictionary returned by `to_dict`
+
+        Unlike the constructor it doesn't generate an id or read the
+        clock, and it sets every attribute at once without marking
+        the instance dirty in the storage.
+
+        The timestamps may also be datetimes already.
+
+        Args:
+            obj_dict (dict): The dictionary representation of the instance
+
+        Returns:
+            The new instance, which isn't added to the storage
+        """
+        obj = cls.__new__(cls)
+        attrs = dict(obj_dict)
+        del attrs["__class__"]
+        created_at = attrs["created_at"]
+        if isinstance(created_at, str):
+            attrs["created_at"] = datetime.fromisoformat(created_at)
+        if attrs["updated_at"] == created_at:
+            attrs["updated_at"] = attrs["created_at"]
+        elif isinstance(attrs["updated_at"], str):
+            attrs["updated_at"] = datetime.fromisoformat(attrs["updated_at"])
+        obj.__dict__.update(attrs)
+        return obj
+
+    def __setattr__(self, name, value):
+        """Set an attribute and mark the instance dirty in the storage
+
+        Raises:
+            ValueError: If the attribute is unique and another stored
+                        instance holds `value`, leaving it unset
+        """
+        models.storage.assign(self, name, value, super().__setattr__)
+
     def __str__(self):
         """ A string representation of the class
         Returns:
@@ -75,3 +132,6 @@ class BaseModel:
         new_dict["created_at"] = self.created_at.isoformat()
         new_dict["updated_at"] = self.updated_at.isoformat()
         return new_dict
+
+
+models.classes["BaseModel"] = BaseModel
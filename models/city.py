@@ -2,7 +2,9 @@
 
 """ A module that defines the City class"""
 
+import models
 from .base_model import BaseModel
+from .place import Place
 
 
 class City(BaseModel):
@@ -17,3 +19,8 @@ class City(BaseModel):
     """
     state_id = ""
     name = ""
+
+    @property
+    def places(self):
+        """The list of Place instances in this City"""
+        return list(models.storage.lookup(Place, "city_id", self.id).values())
@@ -0,0 +1,276 @@
+#!/usr/bin/python3
+
+"""
+
+This module contains the encoder and decoder of the binary snapshot
+format, where each stored dict is packed by `struct` after the shape
+of its class
+
+A snapshot starts with `MAGIC` and holds one record per object,
+then `END`. A record is the index of its shape in the shape table,
+the fixed-size fields of the shape packed in one struct, then the
+UTF-8 bytes of its str and JSON fields, whose lengths are among the
+fixed-size fields. A shape is the class name and the name and type
+of each attribute, so every object of a class with the same
+attributes shares one. Timestamps are packed as integer microseconds
+and UUID strings as their 16 bytes.
+
+Shapes and attribute names are defined where they're first used:
+an index equal to the size of its table is followed by the new entry.
+
+"""
+
+import json
+import re
+import struct
+from datetime import datetime, timedelta
+
+MAGIC = b"HBNB\x01"
+END = 0xFFFFFFFF
+
+_index = struct.Struct("<I")
+_length = struct.Struct("<H")
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_uuid = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+# The struct format of each type of attribute, by tag
+_formats = {"n": "0s", "b": "?", "i": "q", "f": "d", "t": "q", "u": "16s",
+            "s": "I", "j": "I"}
+# The struct packing the fixed-size fields of each shape
+_packers = {}
+
+
+def _tag(attr, value):
+    """Return the tag of the type `value` is packed as, and its packing"""
+    kind = type(value)
+    if kind is str:
+        if len(value) == 36 and _uuid.fullmatch(value):
+            return "u", bytes.fromhex(value.replace("-", ""))
+        if attr in ("created_at", "updated_at"):
+            return _tag(attr, datetime.fromisoformat(value))
+        return "s", value.encode()
+    if kind is datetime and value.tzinfo is None:
+        return "t", (value - _EPOCH) // _MICROSECOND
+    if kind is int and -2 ** 63 <= value < 2 ** 63:
+        return "i", value
+    if kind is float:
+        return "f", value
+    if value is None:
+        return "n", b""
+    if kind is bool:
+        return "b", value
+    return "j", json.dumps(value).encode()
+
+
+class _Table:
+    """
+
+    Numbers the entries of a string or shape table as they're added
+
+    Attributes:
+        indexes (dict): The index of each entry
+
+    """
+
+    def __init__(self):
+        """Initialize an empty table"""
+        self.indexes = {}
+
+    def ref(self, entry, define):
+        """Return the packed reference to `entry`, defining it if new
+
+        Args:
+            entry: The entry to refer to
+            define (callable): Returns the packed definition of `entry`
+        """
+        index = self.indexes.get(entry)
+        if index is not None:
+            return _index.pack(index)
+        self.indexes[entry] = len(self.indexes)
+        return _index.pack(len(self.indexes) - 1) + define(entry)
+
+
+class _Shape:
+    """
+
+    The attributes of the objects of one class, as decoded
+
+    Attributes:
+        name (str): The class name
+        attrs (list): The name of each attribute
+        unpacker (struct.Struct): Unpacks the fixed-size fields
+        nones (list): The indexes of the None attributes
+        timestamps (list): The indexes of the datetime attributes
+        uuids (list): The indexes of the UUID attributes
+        texts (list): The index of each str or JSON attribute, and
+                        whether it's JSON, in the order of their bytes
+
+    """
+
+    def __init__(self, name, fields):
+        """Initialize the shape of the `fields` of the class `name`
+
+        Args:
+            name (str): The class name
+            fields (list): The name and tag of each attribute
+        """
+        self.name = name
+        self.attrs = [attr for attr, tag in fields]
+        tags = [tag for attr, tag in fields]
+        self.unpacker = struct.Struct(
+            "<" + "".join(_formats[tag] for tag in tags))
+        self.nones = [i for i, tag in enumerate(tags) if tag == "n"]
+        self.timestamps = [i for i, tag in enumerate(tags) if tag == "t"]
+        self.uuids = [i for i, tag in enumerate(tags) if tag == "u"]
+        self.texts = [(i, tag == "j") for i, tag in enumerate(tags)
+                      if tag in "sj"]
+
+
+def pack(name, attrs):
+    """Pack the attributes of an object, apart from its shape reference
+
+    Args:
+        name (str): The class name of the object
+        attrs (dict): The attributes of the object, whose timestamps
+                      are datetimes or the ISO strings of `to_dict`
+
+    Returns:
+        The shape of the object and the bytes of its fields
+
+    Raises:
+        TypeError: If an attribute can't be encoded as JSON
+    """
+    fields = []
+    fixed = []
+    variable = []
+    for attr, value in attrs.items():
+        if attr == "__class__":
+            continue
+        tag, packed = _tag(attr, value)
+        fields.append((attr, tag))
+        if tag in "sj":
+            fixed.append(len(packed))
+            variable.append(packed)
+        else:
+            fixed.append(packed)
+    shape = (name, tuple(fields))
+    packer = _packers.get(shape)
+    if packer is None:
+        packer = struct.Struct(
+            "<" + "".join(_formats[tag] for attr, tag in fields))
+        _packers[shape] = packer
+    return shape, b"".join([packer.pack(*fixed), *variable])
+
+
+def encode(packed):
+    """Yield the bytes of a snapshot of the `packed` objects
+
+    Args:
+        packed (iterable): The shape and bytes of each object,
+                           as returned by `pack`
+    """
+    strings = _Table()
+    shapes = _Table()
+
+    def define_string(string):
+        data = string.encode()
+        return _length.pack(len(data)) + data
+
+    def define_shape(shape):
+        name, fields = shape
+        parts = [strings.ref(name, define_string), _length.pack(len(fields))]
+        for attr, tag in fields:
+            parts.append(strings.ref(attr, define_string))
+            parts.append(tag.encode())
+        return b"".join(parts)
+
+    yield MAGIC
+    for shape, fields in packed:
+        yield shapes.ref(shape, define_shape) + fields
+    yield _index.pack(END)
+
+
+def iter_records(buffer, datetimes=True):
+    """Yield the key and dict of each object of the snapshot in `buffer`
+
+    The dicts are those of `to_dict`, but for their timestamps which
+    are datetimes unless `datetimes` is False.
+
+    Args:
+        buffer (bytes-like): The snapshot, such as a mapped file
+        datetimes (bool): Whether to decode timestamps as datetimes
+                          rather than ISO strings
+
+    Raises:
+        ValueError: If `buffer` isn't a whole snapshot
+    """
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a binary snapshot")
+    pos = len(MAGIC)
+    strings = []
+    shapes = []
+    # The ids the foreign keys refer to are decoded once and shared
+    uuids = {}
+
+    def string(pos):
+        index, = _index.unpack_from(buffer, pos)
+        pos += _index.size
+        if index == len(strings):
+            length, = _length.unpack_from(buffer, pos)
+            pos += _length.size
+            strings.append(bytes(buffer[pos:pos + length]).decode())
+            pos += length
+        return strings[index], pos
+
+    try:
+        while True:
+            index, = _index.unpack_from(buffer, pos)
+            pos += _index.size
+            if index == END:
+                break
+            if index == len(shapes):
+                name, pos = string(pos)
+                count, = _length.unpack_from(buffer, pos)
+                pos += _length.size
+                fields = []
+                for _ in range(count):
+                    attr, pos = string(pos)
+                    fields.append((attr, chr(buffer[pos])))
+                    pos += 1
+                shapes.append(_Shape(name, fields))
+            shape = shapes[index]
+            values = list(shape.unpacker.unpack_from(buffer, pos))
+            pos += shape.unpacker.size
+            for i in shape.nones:
+                values[i] = None
+            created_at = None
+            for i in shape.timestamps:
+                if created_at is not None and values[i] == created_at[0]:
+                    values[i] = created_at[1]
+                    continue
+                value = _EPOCH + values[i] * _MICROSECOND
+                if not datetimes:
+                    value = value.isoformat()
+                created_at = (values[i], value)
+                values[i] = value
+            for i in shape.uuids:
+                value = uuids.get(values[i])
+                if value is None:
+                    value = values[i].hex()
+                    value = (f"{value[:8]}-{value[8:12]}-{value[12:16]}-"
+                             f"{value[16:20]}-{value[20:]}")
+                    uuids[values[i]] = value
+                values[i] = value
+            for i, is_json in shape.texts:
+                end = pos + values[i]
+                value = bytes(buffer[pos:end]).decode()
+                pos = end
+                values[i] = json.loads(value) if is_json else value
+            obj_dict = dict(zip(shape.attrs, values))
+            obj_dict["__class__"] = shape.name
+            yield f"{shape.name}.{obj_dict['id']}", obj_dict
+    except (struct.error, IndexError, KeyError) as error:
+        raise ValueError(f"Truncated binary snapshot: {error}") from error
+    if pos != len(buffer):
+        raise ValueError("Extra data after the binary snapshot")
@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+
+"""
+
+This module contains the compression methods the storage files
+can be streamed through, and how they're told apart by extension
+
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zlib
+
+# The extension of the files of each compression method
+EXTENSIONS = {"gzip": ".gz", "bz2": ".bz2", "lzma": ".xz", "zlib": ".zz"}
+# What reading a torn or corrupt compressed file may raise
+ERRORS = (EOFError, OSError, zlib.error, lzma.LZMAError)
+
+
+def method_of(path, method=""):
+    """Return the compression method of `path`, or None if uncompressed
+
+    Args:
+        path (str): The path to the file
+        method (str): The method to use whatever the extension of
+                      `path`, "none" for none, or "" to go by it
+
+    Raises:
+        ValueError: If `method` isn't a known method
+    """
+    if method == "none":
+        return None
+    if method:
+        if method not in EXTENSIONS:
+            raise ValueError(f"Unknown compression {method}")
+        return method
+    ext = os.path.splitext(path)[1]
+    for name, extension in EXTENSIONS.items():
+        if ext == extension:
+            return name
+    return None
+
+
+def wrap(f, method, mode):
+    """Return a file object streaming through the compression `method`
+
+    Args:
+        f (file): The binary file the compressed bytes are read from
+                  or written to, which closing the result leaves open
+        method (str): The compression method
+        mode (str): "rb" to decompress, or "wb" to compress
+    """
+    if method == "gzip":
+        return gzip.GzipFile(fileobj=f, mode=mode)
+    if method == "bz2":
+        return bz2.BZ2File(f, mode)
+    if method == "lzma":
+        return lzma.LZMAFile(f, mode)
+    if mode == "rb":
+        return io.BufferedReader(_ZlibReader(f))
+    return io.BufferedWriter(_ZlibWriter(f))
+
+
+class _ZlibWriter(io.RawIOBase):
+    """
+
+    Compresses what's written to it as one zlib stream into a file
+
+    Attributes:
+        f (file): The binary file the stream is written to
+        compressor (zlib.Compress): Compresses the written bytes
+
+    """
+
+    def __init__(self, f):
+        """Initialize a stream written to the binary file `f`"""
+        self.f = f
+        self.compressor = zlib.compressobj()
+
+    def writable(self):
+        """Return True, as the stream is written to"""
+        return True
+
+    def write(self, b):
+        """Compress the bytes `b` into the file"""
+        self.f.write(self.compressor.compress(b))
+        return len(b)
+
+    def close(self):
+        """End the zlib stream, leaving the file open"""
+        if not self.closed:
+            self.f.write(self.compressor.flush())
+        super().close()
+
+
+class _ZlibReader(io.RawIOBase):
+    """
+
+    Decompresses the zlib streams following each other in a file
+
+    Attributes:
+        f (file): The binary file the streams are read from
+        decompressor (zlib.Decompress): Decompresses the current stream
+        pending (bytes): The bytes read but not decompressed yet
+        started (bool): Whether the current stream was read from
+
+    """
+
+    def __init__(self, f):
+        """Initialize a reader of the binary file `f`"""
+        self.f = f
+        self.decompressor = zlib.decompressobj()
+        self.pending = b""
+        self.started = False
+
+    def readable(self):
+        """Return True, as the streams are read"""
+        return True
+
+    def readinto(self, b):
+        """Decompress up to the size of `b` bytes into it
+
+        Raises:
+            EOFError: If the file ends within a stream
+        """
+        while True:
+            if not self.pending:
+                self.pending = self.f.read(io.DEFAULT_BUFFER_SIZE)
+                if not self.pending:
+                    if self.started:
+                        raise EOFError("Compressed file ended before the "
+                                       "end-of-stream marker was reached")
+                    return 0
+            self.started = True
+            data = self.decompressor.decompress(self.pending, len(b))
+            if self.decompressor.eof:
+                self.pending = self.decompressor.unused_data
+                self.decompressor = zlib.decompressobj()
+                self.started = False
+            else:
+                self.pending = self.decompressor.unconsumed_tail
+            if data:
+                b[:len(data)] = data
+                return len(data)
@@ -0,0 +1,365 @@
+#!/usr/bin/python3
+
+"""
+
+This module contains the class DBStorage that
+stores instances in a SQLite database
+
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import models
+from models.base_model import BaseModel
+from models.user import User
+from models.state import State
+from models.city import City
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+from models.engine.query import Query
+
+
+class DBStorage:
+    """
+
+    Stores instances in a SQLite database with one table per class
+    of `models.classes`, keeping the same interface as FileStorage
+
+    Every table is keyed by the instance id, so single instances can
+    be fetched with `get` without loading the rest of the database,
+    and `save` writes the dirty instances in one transaction. Nothing
+    is loaded by `reload`: the rows of a table are loaded the first
+    time every object of its class is needed, but for the rows
+    already loaded.
+
+    Inside a `batch` block saves are deferred to a single transaction
+    at the end of the block, and every change made in the block is
+    undone if it raises, like in FileStorage.
+
+    The emails of users are kept unique like in FileStorage, though
+    checking one loads every user.
+
+    Attributes:
+        db_path (str): The path to the SQLite database
+        connection (sqlite3.Connection): The connection to the database
+        objects (dict): The dictionary that will store the loaded objects
+        dirty (dict): The operations not yet saved, by object key
+        loaded (set): The names of the tables loaded since `reload`
+        tables (set): The names of the tables created, the ones of the
+                    classes defined after the storage on first use
+        undo (dict): The object and its attributes before the open
+                    batch changed it, or None if it wasn't stored, by
+                    key, or None outside batches
+        deferred (bool): Whether a save was deferred by the open batch
+        unique (dict): The attributes whose values must be unique,
+                        by class name
+
+    """
+    __unique = {"User": ("email",)}
+    # The most ids selected by one statement
+    __batch = 500
+
+    def __init__(self):
+        """Open the database named by `HBNB_DB_PATH` and create the tables"""
+        self.__db_path = os.getenv("HBNB_DB_PATH", "hbnb.db")
+        self.__connection = sqlite3.connect(self.__db_path)
+        self.__objects = {}
+        self.__dirty = {}
+        self.__loaded = set()
+        self.__undo = None
+        self.__deferred = False
+        self.__tables = set()
+        with self.__connection:
+            for name in models.classes:
+                self.__create(name)
+
+    def __create(self, name):
+        """Create the table of the class `name` unless it was created"""
+        if name in self.__tables:
+            return
+        self.__connection.execute(
+            f'CREATE TABLE IF NOT EXISTS "{name}" ('
+            "id TEXT PRIMARY KEY, created_at TEXT, "
+            "updated_at TEXT, data TEXT NOT NULL)")
+        self.__tables.add(name)
+
+    def all(self, cls=None):
+        """ Return the `objects` dict, or only the objects of `cls`
+
+        The rows of `cls`, or of every class, that aren't loaded yet
+        are loaded first.
+
+        Args:
+            cls (type or str): The class, or class name, to filter by
+
+        Returns:
+            The `objects` dict if `cls` is None, else a new dict
+            of the objects of `cls` by key
+        """
+        if cls is None:
+            for name in models.classes:
+                self.__load(name)
+            return self.__objects
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if cls not in models.classes:
+            return {}
+        self.__load(cls)
+        prefix = f"{cls}."
+        return {key: obj for key, obj in self.__objects.items()
+                if key.startswith(prefix)}
+
+    def __load(self, name):
+        """Load the rows of the table `name` not loaded yet, selecting
+        their ids first so the rows already loaded aren't fetched again"""
+        if name in self.__loaded:
+            return
+        self.__create(name)
+        ids = [id for id, in self.__connection.execute(
+            f'SELECT id FROM "{name}"')]
+        missing = [id for id in ids if f"{name}.{id}" not in self.__objects
+                   and f"{name}.{id}" not in self.__dirty]
+        if len(missing) == len(ids):
+            rows = list(self.__connection.execute(
+                f'SELECT id, data FROM "{name}"'))
+        else:
+            rows = []
+            for start in range(0, len(missing), DBStorage.__batch):
+                batch = missing[start:start + DBStorage.__batch]
+                rows.extend(self.__connection.execute(
+                    f'SELECT id, data FROM "{name}" '
+                    f'WHERE id IN ({", ".join("?" * len(batch))})', batch))
+        for id, data in rows:
+            self.__objects[f"{name}.{id}"] = models.classes[name].from_dict(
+                json.loads(data))
+        self.__loaded.add(name)
+
+    def count(self, cls=None):
+        """Return the number of stored objects, or of objects of `cls`
+
+        Args:
+            cls (type or str): The class, or class name, to count
+        """
+        if cls is None:
+            return len(self.all())
+        return len(self.all(cls))
+
+    def new(self, obj):
+        """Set in `objects` the `obj` with key <obj class name>.id
+
+        Raises:
+            ValueError: If another stored object holds the value of a
+                        unique attribute of `obj`
+        """
+        key = f"{obj.__class__.__name__}.{obj.id}"
+        for attr in DBStorage.__unique.get(obj.__class__.__name__, ()):
+            self.__check(key, attr, getattr(obj, attr, None))
+        self.__remember(key)
+        self.__dirty[key] = "update"
+        self.__objects[key] = obj
+
+    def assign(self, obj, attr, value, setter):
+        """Assign `value` as `attr` of `obj` with `setter`, marking `obj`
+        dirty if it's stored
+
+        Raises:
+            ValueError: If `attr` is unique, `obj` is stored and another
+                        stored object holds `value`, leaving it unset
+        """
+        name = obj.__class__.__name__
+        key = f"{name}.{getattr(obj, 'id', None)}"
+        if self.__objects.get(key) is not obj:
+            setter(attr, value)
+            return
+        if attr in DBStorage.__unique.get(name, ()):
+            self.__check(key, attr, value)
+        self.__remember(key)
+        setter(attr, value)
+        self.__dirty[key] = "update"
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Defer the saves of a block to a single transaction at its end
+
+        The objects created, changed or destroyed in the block are
+        restored if it raises. A batch opened inside another one
+        joins it.
+        """
+        if self.__undo is not None:
+            yield self
+            return
+        self.__undo = {}
+        self.__deferred = False
+        dirty = dict(self.__dirty)
+        try:
+            yield self
+        except BaseException:
+            self.__rollback(dirty)
+            raise
+        else:
+            changed, self.__undo = self.__undo, None
+            if changed or self.__deferred:
+                self.save()
+        finally:
+            self.__undo = None
+            self.__deferred = False
+
+    def __rollback(self, dirty):
+        """Restore the objects in `undo` and the `dirty` operations"""
+        for key, saved in self.__undo.items():
+            if saved is None:
+                self.__objects.pop(key, None)
+            else:
+                obj, attrs = saved
+                obj.__dict__.clear()
+                obj.__dict__.update(attrs)
+                self.__objects[key] = obj
+        self.__dirty = dirty
+
+    def remember(self, obj):
+        """Remember the stored `obj` before it changes in a batch"""
+        if self.__undo is not None:
+            self.__remember(
+                f"{obj.__class__.__name__}.{getattr(obj, 'id', None)}")
+
+    def __remember(self, key):
+        """Record the object stored under `key` in `undo` if not done yet"""
+        if self.__undo is None or key in self.__undo:
+            return
+        obj = self.__objects.get(key)
+        self.__undo[key] = None if obj is None else (obj, {
+            name: value.copy() if isinstance(value, list) else value
+            for name, value in obj.__dict__.items()})
+
+    def check(self, obj, attr, value):
+        """Check that `obj` can be assigned `value` as `attr`
+
+        Instances that aren't stored aren't checked until `new`
+        stores them.
+
+        Raises:
+            ValueError: If `attr` is unique, `obj` is stored and another
+                        stored object holds `value`
+        """
+        name = obj.__class__.__name__
+        key = f"{name}.{getattr(obj, 'id', None)}"
+        if (attr in DBStorage.__unique.get(name, ()) and
+                self.__objects.get(key) is obj):
+            self.__check(key, attr, value)
+
+    def __check(self, key, attr, value):
+        """Raise a ValueError if an object stored under another key
+        than `key` holds the non-empty `value` as `attr`"""
+        if value is None or value == "":
+            return
+        for other in self.lookup(key.split(".", 1)[0], attr, value):
+            if other != key:
+                raise ValueError(f"Duplicate {attr}: {value!r}")
+
+    def touch(self, obj, attr=None):
+        """Mark the stored `obj` dirty after it was modified, whichever
+        its modified `attr`"""
+        key = f"{obj.__class__.__name__}.{getattr(obj, 'id', None)}"
+        if key in self.__objects:
+            self.__dirty[key] = "update"
+
+    def delete(self, obj=None):
+        """Delete `obj` from `objects` if it's inside"""
+        if obj is None:
+            return
+        key = f"{obj.__class__.__name__}.{obj.id}"
+        self.__remember(key)
+        if self.__objects.pop(key, None) is not None:
+            self.__dirty[key] = "delete"
+
+    def lookup(self, cls, attr, value):
+        """Return the objects of `cls` whose `attr` equals `value`
+
+        Args:
+            cls (type or str): The class, or class name, of the objects
+            attr (str): The attribute to compare
+            value: The value `attr` must be equal to
+
+        Returns:
+            A new dict of the matching objects by key
+        """
+        return {key: obj for key, obj in self.all(cls).items()
+                if getattr(obj, attr, None) == value}
+
+    def query(self, cls):
+        """Return a query of the stored objects of `cls`, checking
+        every object of `cls` against its conditions
+
+        Args:
+            cls (type or str): The class, or class name, of the objects
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        return Query(cls, lambda conditions, order: (
+            list(self.all(cls).values()), False))
+
+    def get_by(self, cls, **attrs):
+        """Return the first instance of `cls` whose attributes equal
+        `attrs`, or None if there's none"""
+        return next(iter(self.query(cls).where(**attrs)), None)
+
+    def get(self, cls, id):
+        """Return the instance of `cls` with `id`, loading only that row
+
+        Args:
+            cls (str): The class name of the instance
+            id (str): The id of the instance
+
+        Returns:
+            The instance, or None if it isn't stored
+        """
+        key = f"{cls}.{id}"
+        if key in self.__objects:
+            return self.__objects[key]
+        if (cls not in models.classes
+                or self.__dirty.get(key) == "delete"):
+            return None
+        self.__create(cls)
+        row = self.__connection.execute(
+            f'SELECT data FROM "{cls}" WHERE id = ?', (id,)).fetchone()
+        if row is None:
+            return None
+        obj = models.classes[cls].from_dict(json.loads(row[0]))
+        self.__objects[key] = obj
+        return obj
+
+    def save(self):
+        """Write the dirty objects to the database in one transaction,
+        or at the end of the open batch"""
+        if self.__undo is not None:
+            self.__deferred = True
+            return
+        with self.__connection:
+            for key, op in self.__dirty.items():
+                cls, id = key.split(".", 1)
+                self.__create(cls)
+                if op == "delete":
+                    self.__connection.execute(
+                        f'DELETE FROM "{cls}" WHERE id = ?', (id,))
+                elif key in self.__objects:
+                    obj_dict = self.__objects[key].to_dict()
+                    self.__connection.execute(
+                        f'INSERT OR REPLACE INTO "{cls}" '
+                        "VALUES (?, ?, ?, ?)",
+                        (id, obj_dict["created_at"], obj_dict["updated_at"],
+                         json.dumps(obj_dict)))
+        self.__dirty = {}
+
+    def reload(self):
+        """Forget the loaded objects and the unsaved operations, the
+        rows being loaded again as they're used"""
+        self.__objects = {}
+        self.__dirty = {}
+        self.__loaded = set()
+
+    def close(self):
+        """Close the connection to the database"""
+        self.__connection.close()
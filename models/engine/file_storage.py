@@ -8,7 +8,22 @@ deserializes JSON file to instances
 
 """
 
+import atexit
+import contextlib
+import functools
+import glob
+import io
+import itertools
 import json
+import mmap
+import os
+import threading
+import zlib
+import models
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 from models.base_model import BaseModel
 from models.user import User
 from models.state import State
@@ -16,6 +31,23 @@ from models.city import City
 from models.amenity import Amenity
 from models.place import Place
 from models.review import Review
+from models.engine import binary, compression, geo, json_stream, ndjson
+from models.engine import parallel
+from models.engine.indexes import GeoIndex, HashIndex, ListIndex
+from models.engine.indexes import SortedIndex, TextIndex, UniqueIndex
+from models.engine.query import Query
+
+# Serializes the write-behind flusher thread with the storage users
+_lock = threading.RLock()
+
+
+def _synchronized(method):
+    """Decorate a FileStorage `method` to run holding `_lock`"""
+    @functools.wraps(method)
+    def locked(*args, **kwargs):
+        with _lock:
+            return method(*args, **kwargs)
+    return locked
 
 
 class FileStorage:
@@ -24,43 +56,1503 @@ class FileStorage:
     Serializes instances to a JSON file
     and deserializes JSON file to instances
 
+    Objects are marked dirty when they are added, assigned an
+    attribute or saved, and `save` only encodes the dirty ones,
+    reusing the cached JSON text of every other object.
+
+    In journal mode `save` appends one record per created, updated
+    or destroyed object to `journal_path` instead of rewriting the
+    whole snapshot, `reload` replays the journal over the snapshot
+    and `compact` folds the journal back into a new snapshot.
+
+    Snapshots are written to a temporary file that then replaces
+    `file_path`, so an interrupted save leaves the previous snapshot
+    intact. `durability` chooses what is flushed to disk before a save
+    returns: nothing ("none"), the written file ("file"), or the file
+    and its directory entry ("dir").
+
+    In write-behind mode `save` returns at once, and a background
+    thread writes every save made in the last `flush_interval` seconds,
+    or as soon as `flush_batch` objects are dirty, in a single write.
+    `flush` writes them immediately and also runs at exit.
+
+    Inside a `batch` block saves are deferred to a single write at the
+    end of the block, and every change made in the block is undone if
+    it raises.
+
+    In sharded mode each class is stored in its own file next to
+    `file_path`, or split into `shard_buckets` files by a hash of the
+    ids, and `save` only rewrites the files holding dirty objects.
+    Sharded mode takes the place of journal mode. Combined with lazy
+    mode, only the files of the classes in use are ever read.
+
+    The file is decoded one object at a time and each instance is
+    built as soon as it's decoded, so reloading a large file doesn't
+    hold its whole text or all its dicts in memory. With more than
+    one of `workers`, JSON files are instead split into chunks of
+    lines whose instances are built by a pool of processes.
+
+    With the "ndjson" `file_format` objects are stored one per line
+    in a .ndjson file next to `file_path`, that `save` appends the
+    dirty objects and tombstones of destroyed ones to. `reload` maps
+    the file and only indexes where each object's last line is, so
+    single objects are decoded from the mapping on first use. The file
+    is compacted once more of its lines are stale than live. It takes
+    the place of both journal and sharded modes.
+
+    With the "binary" `file_format` snapshots are written to a .bin
+    file next to `file_path`, packing the attributes of each object
+    by `struct` rather than as JSON text: timestamps as integers and
+    UUIDs as bytes. It takes the place of sharded mode.
+
+    Snapshots, shards and journals can be streamed through gzip, bz2,
+    lzma or zlib as they're written and read: `compression` chooses
+    the method, or else the extension of `file_path` does, and the
+    extension of the method is added to every file but the .ndjson
+    file, which is mapped.
+
+    In shared mode several processes can use the same files: they're
+    read holding a shared `fcntl.flock` on a .lock file next to
+    `file_path` and written holding it exclusive. Each writer bumps
+    the generation counter in the lock file, so the others only read
+    the files again once it changed, or just replay the new journal
+    records if the snapshot itself didn't change. Unsaved changes are
+    kept over the ones read, so no process overwrites the others'.
+
+    In lazy mode `reload` doesn't read anything: the file is read
+    into `raw` dicts on first use, and instances are only built
+    from them when `all` or `get` reaches them.
+
+    The keys of the stored objects are also indexed by class name,
+    so `all(cls)` only visits the objects of that class and
+    `count(cls)` doesn't visit any, and the foreign keys between
+    classes are indexed by value so `lookup` can follow relations
+    without visiting the other objects. The emails of users are kept
+    unique: `new` and `check` reject a taken one by looking it up in
+    its index, which also answers `get_by`. The numeric attributes of
+    places are kept sorted, so a query of a range of them bisects
+    its bounds instead of visiting every place, and their locations
+    are bucketed in a grid so places near a point are found among the
+    cells around it. The amenity ids of places are indexed by amenity,
+    so the places having several amenities are found by intersecting
+    the places of each from the rarest one. Objects added or assigned
+    are only reindexed once the indexes are next used, so a bulk load
+    doesn't update them one attribute at a time.
+
+    The words of the names, descriptions and review texts are indexed
+    in inverted indexes. With `persist_terms` they're written to a
+    .terms file next to `file_path` with each JSON or binary snapshot,
+    and a reload that finds the .terms file of the snapshot it read
+    takes the indexes from it, only indexing the words of the objects
+    changed since.
+
     Attributes:
         file_path (str): The path to the JSON file
         objects (dict): The dictionary that will store all objects
+        raw (dict): The stored dicts not yet built into `objects`
+        loaded (bool): Whether the file was read since `reload`
+        loaded_shards (set): The names of the classes whose shards
+                            were read since `reload`
+        journal_path (str): The path to the append-only journal
+        dirty (dict): The operations not yet saved, by object key
+        fragments (dict): The object, its JSON text and its binary
+                            shape and fields, by key, for every object
+                            unchanged since encoded
+        journal (bool): Whether `save` appends to the journal
+        journal_limit (int): The number of journal records
+                            after which `save` compacts the journal
+        by_class (dict): The keys of `objects` and `raw`, by class name
+        indexes (dict): The attribute indexes of each class, by name
+        covers (dict): The indexes of each class over each attribute,
+                        by class name and attribute
+        indexed (dict): The `objects` dict that the indexes index
+        unindexed (dict): The attributes whose indexes are out of date,
+                        or None for every index, by key of the objects
+                        added or changed since the indexes were updated
+        terms (dict): The text indexes read from the .terms file of the
+                        snapshot, until the indexes are rebuilt
+        replayed (set): The keys of the journal records replayed
+                        since the indexes were rebuilt
+        lazy (bool): Whether instances are built on first use
+        sharded (bool): Whether each class is stored in its own files
+        shard_buckets (int): The number of files each class is split into
+        by_shard (dict): The keys of `objects` and `raw` by shard,
+                            a (class name, bucket) tuple
+        sharded_by (int): The `shard_buckets` that `by_shard` follows
+        durability (str): "none", "file" or "dir", what `save` fsyncs
+        file_format (str): "json", "ndjson" or "binary", how objects
+                            are stored
+        compression (str): "gzip", "bz2", "lzma", "zlib" or "none",
+                            how files are compressed, or "" to go by
+                            the extension of `file_path`
+        workers (int): The number of processes a reload builds the
+                        instances in, or 0 for one per CPU
+        shared (bool): Whether other processes share the files
+        persist_terms (bool): Whether the text indexes are written with
+                                the snapshots and read back
+        generation (int): The generation of the files last read or written
+        snapshot (tuple): The inode, modification time and size of the
+                            snapshot when last read or written
+        journal_offset (int): The length of the journal read or written
+        lock_file (file): The lock file while it's held, else None
+        exclusive (bool): Whether the lock file is held exclusive
+        stale (int): The number of superseded lines in the .ndjson file
+        write_behind (bool): Whether saves are written by a thread
+        flush_interval (float): The seconds between write-behind flushes
+        flush_batch (int): The number of dirty objects that triggers
+                            a write-behind flush before the interval
+        unflushed (bool): Whether a deferred save wasn't written yet
+        flusher (threading.Thread): The write-behind thread
+        wake (threading.Event): Set to make the flusher flush now
+        flush_error (Exception): What the last write-behind flush raised
+        undo (dict): The object and its attributes before the open
+                    batch changed it, by key, or None outside batches
 
     """
     __file_path = "file.json"
     __objects = {}
+    __raw = {}
+    __loaded = True
+    __loaded_shards = set()
+    __journal_path = "file.json.journal"
+    __dirty = {}
+    __fragments = {}
+    __journal_size = 0
+    __stale = 0
+    __by_class = {}
+    __indexes = {
+        "City": (HashIndex(City, "state_id"),),
+        "Place": (HashIndex(Place, "city_id"), HashIndex(Place, "user_id"),
+                  SortedIndex(Place, "price_by_night"),
+                  SortedIndex(Place, "number_rooms"),
+                  SortedIndex(Place, "number_bathrooms"),
+                  SortedIndex(Place, "max_guest"), GeoIndex(Place),
+                  TextIndex(Place, "name", "description"),
+                  ListIndex(Place, "amenity_ids")),
+        "Review": (HashIndex(Review, "place_id"),
+                   HashIndex(Review, "user_id"), TextIndex(Review, "text")),
+        "Amenity": (TextIndex(Amenity, "name"),),
+        "User": (UniqueIndex(User, "email"),),
+    }
+    __covers = {}
+    __indexed = None
+    __unindexed = {}
+    __terms = None
+    __replayed = set()
+    __by_shard = {}
+    __sharded_by = None
+    __generation = None
+    __snapshot = None
+    __journal_offset = 0
+    __lock_file = None
+    __exclusive = False
+    journal = os.getenv("HBNB_JOURNAL", "0") == "1"
+    journal_limit = int(os.getenv("HBNB_JOURNAL_LIMIT", "10000"))
+    lazy = os.getenv("HBNB_LAZY", "0") == "1"
+    sharded = os.getenv("HBNB_SHARDED", "0") == "1"
+    shard_buckets = int(os.getenv("HBNB_SHARD_BUCKETS", "1"))
+    durability = os.getenv("HBNB_DURABILITY", "none")
+    file_format = os.getenv("HBNB_FORMAT", "json")
+    compression = os.getenv("HBNB_COMPRESSION", "")
+    workers = int(os.getenv("HBNB_WORKERS", "1"))
+    shared = os.getenv("HBNB_SHARED", "0") == "1"
+    persist_terms = os.getenv("HBNB_PERSIST_TERMS", "0") == "1"
+    write_behind = os.getenv("HBNB_WRITE_BEHIND", "0") == "1"
+    flush_interval = float(os.getenv("HBNB_FLUSH_INTERVAL", "1"))
+    flush_batch = int(os.getenv("HBNB_FLUSH_BATCH", "1000"))
+    __unflushed = False
+    __flusher = None
+    __wake = threading.Event()
+    __flush_error = None
+    __undo = None
+
+    @_synchronized
+    def all(self, cls=None):
+        """ Return the `objects` dict, or only the objects of `cls`
 
-    def all(self):
-        """ Return the `objects` dict"""
-        return FileStorage.__objects
+        Args:
+            cls (type or str): The class, or class name, to filter by
+
+        Returns:
+            The `objects` dict if `cls` is None, else a new dict
+            of the objects of `cls` by key
+        """
+        if cls is None:
+            self.__load()
+            if FileStorage.__raw:
+                self.__build(list(FileStorage.__raw))
+            return FileStorage.__objects
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        self.__load(cls)
+        self.__sync()
+        return self.__get_all(FileStorage.__by_class.get(cls, {}))
+
+    @_synchronized
+    def count(self, cls=None):
+        """Return the number of stored objects, or of objects of `cls`
+
+        Args:
+            cls (type or str): The class, or class name, to count
+        """
+        if cls is None:
+            self.__load()
+            return len(FileStorage.__objects) + len(FileStorage.__raw)
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        self.__load(cls)
+        self.__sync()
+        return len(FileStorage.__by_class.get(cls, {}))
 
+    @_synchronized
+    def lookup(self, cls, attr, value):
+        """Return the objects of `cls` whose `attr` equals `value`
+
+        Indexed attributes are looked up in their index, any other
+        attribute is compared on every object of `cls`.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects
+            attr (str): The attribute to compare
+            value: The value `attr` must be equal to
+
+        Returns:
+            A new dict of the matching objects by key
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        self.__load(cls)
+        self.__sync()
+        for index in FileStorage.__indexes.get(cls, ()):
+            if index.attr == attr:
+                keys = index.select([("==", value)])
+                if keys is not None:
+                    return self.__get_all(keys)
+        return {key: obj for key, obj in self.all(cls).items()
+                if getattr(obj, attr, None) == value}
+
+    @_synchronized
+    def query(self, cls):
+        """Return a query of the stored objects of `cls`
+
+        The query looks its conditions up in the indexes of `cls`:
+        "==" and "in" in the hash indexes, ranges in the sorted ones,
+        "near" and "within" in the grid of the place locations, which
+        also yields the places from the nearest to a point, and
+        "match" in the text indexes, which rank the objects of an
+        unordered query by how well they match. It narrows the objects
+        down to the fewest keys found, and only builds and checks the
+        objects under those keys. With no indexed condition every
+        object of `cls` is checked once.
+
+        Args:
+            cls (type or str): The class, or class name, of the objects
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        return Query(cls, functools.partial(self.__select, cls))
+
+    def __select(self, cls, conditions, order):
+        """Return the objects of the class `cls` that may match the
+        `conditions` of a query, built one at a time as they're
+        iterated, and whether they're in its `order`"""
+        with _lock:
+            self.__load(cls)
+            self.__sync()
+            keys, ordered = self.__plan(cls, conditions, order)
+        return self.__fetch(keys), ordered
+
+    def __plan(self, cls, conditions, order):
+        """Return the fewest keys of objects of the class `cls` that the
+        indexes select for the `conditions`, or all its keys, and
+        whether they're in the `order` of the query
+
+        Unless the conditions narrowed the keys down, the keys of a
+        query ordered by distance are searched from the nearest. The
+        keys of an unordered search are ranked from the best match.
+        """
+        by_attr = {}
+        for attr, op, value in conditions:
+            by_attr.setdefault(attr, []).append((op, value))
+        everything = FileStorage.__by_class.get(cls, {})
+        best = everything
+        for index in FileStorage.__indexes.get(cls, ()):
+            if index.attr not in by_attr:
+                continue
+            keys = index.select(by_attr[index.attr])
+            if keys is not None and len(keys) < len(best):
+                best = keys
+        if (best is everything and order is not None and
+                geo.located(order[2])):
+            for index in FileStorage.__indexes.get(cls, ()):
+                if isinstance(index, GeoIndex) and index.attr == order[0]:
+                    return index.nearest(*order[2]), True
+        if order is None:
+            for index in FileStorage.__indexes.get(cls, ()):
+                if isinstance(index, TextIndex) and index.attr in by_attr:
+                    return index.rank(best, by_attr[index.attr]), False
+        return list(best), False
+
+    def __fetch(self, keys):
+        """Yield the objects stored under `keys`, building them one at
+        a time, and skipping those destroyed since"""
+        keys = iter(keys)
+        while True:
+            with _lock:
+                key = next(keys, None)
+                if key is None:
+                    return
+                obj = self.__get_all([key]).get(key)
+            if obj is not None:
+                yield obj
+
+    @_synchronized
+    def get_by(self, cls, **attrs):
+        """Return the instance of `cls` whose attributes equal `attrs`,
+        looked up in their indexes where they're indexed
+
+        Args:
+            cls (type or str): The class, or class name, of the instance
+            attrs (dict): The values of the attributes
+
+        Returns:
+            The first matching instance, or None if there's none
+        """
+        return next(iter(self.query(cls).where(**attrs)), None)
+
+    @_synchronized
+    def check(self, obj, attr, value):
+        """Check that `obj` can be assigned `value` as `attr`
+
+        Args:
+            obj (BaseModel): The instance to be assigned
+            attr (str): The attribute it's assigned
+            value: The value it's assigned
+
+        Instances that aren't stored aren't checked until `new`
+        stores them.
+
+        Raises:
+            ValueError: If `attr` is unique, `obj` is stored and another
+                        stored object holds `value`
+        """
+        name = obj.__class__.__name__
+        indexes = [index for index in self.__covering(name, attr)
+                   if isinstance(index, UniqueIndex)]
+        key = f"{name}.{getattr(obj, 'id', None)}"
+        if not indexes or FileStorage.__objects.get(key) is not obj:
+            return
+        self.__sync()
+        for index in indexes:
+            index.check(key, value)
+
+    @_synchronized
+    def get(self, cls, id):
+        """Return the instance of `cls` with `id`, building only that one
+
+        Args:
+            cls (str): The class name of the instance
+            id (str): The id of the instance
+
+        Returns:
+            The instance, or None if it isn't stored
+        """
+        self.__load(cls)
+        key = f"{cls}.{id}"
+        if key in FileStorage.__raw:
+            self.__build([key])
+        return FileStorage.__objects.get(key)
+
+    @_synchronized
     def new(self, obj):
-        """Set in `objects` the `obj` with key <obj class name>.id"""
-        FileStorage.__objects[f"{obj.__class__.__name__}.{obj.id}"] = obj
+        """Set in `objects` the `obj` with key <obj class name>.id
+
+        Raises:
+            ValueError: If another stored object holds the value of a
+                        unique attribute of `obj`
+        """
+        name = obj.__class__.__name__
+        self.__load(name)
+        key = f"{name}.{obj.id}"
+        unique = [index for index in self.__covering(name, None)
+                  if isinstance(index, UniqueIndex)]
+        if unique:
+            self.__sync()
+            for index in unique:
+                index.check(key, index.value_of(obj))
+        self.__remember(key)
+        if key in FileStorage.__raw:
+            del FileStorage.__raw[key]
+            FileStorage.__dirty.setdefault(key, "update")
+        elif key not in FileStorage.__objects:
+            FileStorage.__dirty[key] = "create"
+        else:
+            FileStorage.__dirty.setdefault(key, "update")
+        FileStorage.__fragments.pop(key, None)
+        FileStorage.__by_class.setdefault(name, {})[key] = None
+        if FileStorage.__sharded_by == FileStorage.shard_buckets > 1:
+            FileStorage.__by_shard.setdefault(
+                self.__shard_of(key), {})[key] = None
+        FileStorage.__objects[key] = obj
+        FileStorage.__unindexed[key] = None
+
+    def assign(self, obj, attr, value, setter):
+        """Assign `value` as `attr` of `obj` with `setter`, marking `obj`
+        dirty and its indexes over `attr` out of date if it's stored
+
+        Instances that aren't stored, such as the ones being
+        initialized, are assigned without taking the lock.
+
+        Args:
+            obj (BaseModel): The instance to be assigned
+            attr (str): The attribute it's assigned
+            value: The value it's assigned
+            setter (callable): Sets an attribute of `obj` by name
+
+        Raises:
+            ValueError: If `attr` is unique, `obj` is stored and another
+                        stored object holds `value`, leaving it unset
+        """
+        key = f"{obj.__class__.__name__}.{getattr(obj, 'id', None)}"
+        if FileStorage.__objects.get(key) is not obj:
+            setter(attr, value)
+            return
+        self.__assign(key, obj, attr, value, setter)
+
+    @_synchronized
+    def __assign(self, key, obj, attr, value, setter):
+        """Assign the object stored under `key` as `assign` does"""
+        if FileStorage.__objects.get(key) is not obj:
+            setter(attr, value)
+            return
+        unique = [index for index in
+                  self.__covering(obj.__class__.__name__, attr)
+                  if isinstance(index, UniqueIndex)]
+        if unique:
+            self.__sync()
+            for index in unique:
+                index.check(key, value)
+        if FileStorage.__undo is not None:
+            self.__remember(key)
+        setter(attr, value)
+        FileStorage.__dirty.setdefault(key, "update")
+        FileStorage.__fragments.pop(key, None)
+        self.__unindex(key, attr)
+
+    def remember(self, obj):
+        """Remember the stored `obj` before it changes in a batch"""
+        if FileStorage.__undo is not None:
+            self.__remember(
+                f"{obj.__class__.__name__}.{getattr(obj, 'id', None)}")
+
+    @_synchronized
+    def __remember(self, key):
+        """Record the object stored under `key` in `undo` if not done yet"""
+        if FileStorage.__undo is None or key in FileStorage.__undo:
+            return
+        obj = FileStorage.__objects.get(key)
+        if obj is not None:
+            FileStorage.__undo[key] = (obj, {
+                name: value.copy() if isinstance(value, list) else value
+                for name, value in obj.__dict__.items()})
+        else:
+            FileStorage.__undo[key] = (None, FileStorage.__raw.get(key))
+
+    @_synchronized
+    def touch(self, obj, attr=None):
+        """Mark the stored `obj` dirty after it was modified
+
+        Copies of a stored object sharing its id, such as the ones
+        built from its `to_dict`, aren't stored and change nothing.
+
+        Args:
+            obj (BaseModel): The modified instance
+            attr (str): The attribute that was modified, so only the
+                        indexes over it are updated, or None for all
+        """
+        key = f"{obj.__class__.__name__}.{getattr(obj, 'id', None)}"
+        if FileStorage.__objects.get(key) is obj:
+            FileStorage.__dirty.setdefault(key, "update")
+            FileStorage.__fragments.pop(key, None)
+            self.__unindex(key, attr)
+
+    def __unindex(self, key, attr):
+        """Mark the indexes of the object stored under `key` over `attr`,
+        or all of them if None, out of date until the next `__sync`
+
+        A changed object is moved after the others, as it would be in
+        the indexes updated right away, unless it's yet to be indexed.
+        """
+        unindexed = FileStorage.__unindexed
+        if unindexed.get(key, ()) is None:
+            return
+        if attr is None:
+            unindexed[key] = None
+        elif key in unindexed:
+            unindexed[key] = {*unindexed.pop(key), attr}
+        elif self.__covering(key.split(".", 1)[0], attr):
+            unindexed[key] = {attr}
 
+    def __covering(self, name, attr):
+        """Return the indexes of the class `name` over `attr`, or all
+        of them if `attr` is None"""
+        indexes = FileStorage.__covers.get((name, attr))
+        if indexes is None:
+            indexes = tuple(
+                index for index in FileStorage.__indexes.get(name, ())
+                if attr is None or index.covers(attr))
+            FileStorage.__covers[(name, attr)] = indexes
+        return indexes
+
+    @_synchronized
+    def delete(self, obj=None):
+        """Delete `obj` from `objects` if it's inside"""
+        if obj is None:
+            return
+        key = f"{obj.__class__.__name__}.{obj.id}"
+        self.__remember(key)
+        if FileStorage.__objects.pop(key, None) is None:
+            return
+        FileStorage.__fragments.pop(key, None)
+        self.__sync()
+        name = obj.__class__.__name__
+        FileStorage.__by_class.get(name, {}).pop(key, None)
+        if FileStorage.__sharded_by == FileStorage.shard_buckets > 1:
+            FileStorage.__by_shard.get(self.__shard_of(key), {}).pop(key,
+                                                                     None)
+        for index in FileStorage.__indexes.get(name, ()):
+            index.discard(key)
+        if FileStorage.__dirty.get(key) == "create":
+            del FileStorage.__dirty[key]
+        else:
+            FileStorage.__dirty[key] = "delete"
+
+    @_synchronized
     def save(self):
         """
         Serialize `objects` class variable
         to the JSON file specified in `file_path` class variable
+
+        In journal mode only the dirty objects are appended
+        to the journal, which is compacted once it grows past
+        `journal_limit` records.
+
+        In write-behind mode the save is only recorded, to be written
+        by the flusher thread.
+        """
+
+        if FileStorage.__undo is not None:
+            FileStorage.__unflushed = True
+            return
+        if not FileStorage.write_behind:
+            self.__write()
+            return
+        self.__raise_flush_error()
+        FileStorage.__unflushed = True
+        self.__start_flusher()
+        if len(FileStorage.__dirty) >= FileStorage.flush_batch:
+            FileStorage.__wake.set()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Defer the saves of a block to a single save at its end
+
+        The objects created, changed or destroyed in the block are
+        restored if it raises, and the storage is locked until it ends.
+        A batch opened inside another one joins it.
+        """
+        with _lock:
+            if FileStorage.__undo is not None:
+                yield self
+                return
+            FileStorage.__undo = {}
+            dirty = dict(FileStorage.__dirty)
+            unflushed = FileStorage.__unflushed
+            try:
+                yield self
+            except BaseException:
+                self.__rollback(dirty, unflushed)
+                raise
+            else:
+                changed = FileStorage.__undo
+                FileStorage.__undo = None
+                if changed or FileStorage.__unflushed:
+                    self.save()
+            finally:
+                FileStorage.__undo = None
+
+    def __rollback(self, dirty, unflushed):
+        """Restore the objects in `undo`, the `dirty` operations
+        and whether a save was deferred, reindexing only those objects"""
+        for key, (obj, attrs) in FileStorage.__undo.items():
+            FileStorage.__fragments.pop(key, None)
+            if obj is None:
+                FileStorage.__objects.pop(key, None)
+                if attrs is not None:
+                    FileStorage.__raw[key] = attrs
+            else:
+                obj.__dict__.clear()
+                obj.__dict__.update(attrs)
+                FileStorage.__objects[key] = obj
+        FileStorage.__dirty = dirty
+        FileStorage.__unflushed = unflushed
+        self.__reindex(FileStorage.__undo)
+
+    @_synchronized
+    def flush(self):
+        """Write the saves deferred by write-behind mode now"""
+        self.__raise_flush_error()
+        if FileStorage.__unflushed:
+            self.__write()
+
+    def __raise_flush_error(self):
+        """Raise the error of the last write-behind flush, if any"""
+        error, FileStorage.__flush_error = FileStorage.__flush_error, None
+        if error is not None:
+            raise error
+
+    def __start_flusher(self):
+        """Start the write-behind thread unless it's running"""
+        if FileStorage.__flusher is None:
+            atexit.register(self.flush)
+        elif FileStorage.__flusher.is_alive():
+            return
+        FileStorage.__flusher = threading.Thread(
+            target=self.__flush_behind, name="FileStorage flusher",
+            daemon=True)
+        FileStorage.__flusher.start()
+
+    def __flush_behind(self):
+        """Flush every `flush_interval` seconds, or sooner once woken"""
+        while FileStorage.write_behind:
+            FileStorage.__wake.wait(FileStorage.flush_interval)
+            FileStorage.__wake.clear()
+            try:
+                self.flush()
+            except Exception as error:
+                FileStorage.__flush_error = error
+
+    def __write(self):
+        """Write the dirty objects to the journal or a new snapshot
+
+        In shared mode they're written holding the exclusive lock,
+        over the changes other processes saved since the files were read.
         """
+        if FileStorage.shared:
+            with self.__locked(True):
+                self.__refresh()
+                self.__write_files()
+            return
+        self.__write_files()
 
-        with open(FileStorage.__file_path, "w", encoding="UTF8") as f:
-            objects_as_dict = {obj_id: obj.to_dict() for obj_id, obj
-                               in FileStorage.__objects.items()}
-            json.dump(objects_as_dict, f)
+    def __write_files(self):
+        """Write the dirty objects as `__write` does, unlocked"""
+        FileStorage.__unflushed = False
+        if self.__format() == "ndjson":
+            self.__append_lines()
+            return
+        if FileStorage.sharded and FileStorage.file_format == "json":
+            self.__write_shards({self.__shard_of(key)
+                                 for key in FileStorage.__dirty})
+            return
+        if not FileStorage.journal:
+            self.compact()
+            return
+        if not FileStorage.__dirty:
+            return
+        records = []
+        for key, op in FileStorage.__dirty.items():
+            record = f'{{"op": "{op}", "key": {json.dumps(key)}'
+            if op != "delete":
+                if key not in FileStorage.__objects:
+                    continue
+                obj = FileStorage.__objects[key]
+                record += f', "obj": {self.__fragment(key, obj)}'
+            records.append(record + "}\n")
+        journal_path = self.__compressed(FileStorage.__journal_path)
+        created = not os.path.exists(journal_path)
+        text = "".join(records)
+        with self.__open(journal_path, "a") as f:
+            f.write(text)
+        FileStorage.__journal_offset += len(text.encode())
+        if created:
+            self.__fsync_dir()
+        FileStorage.__journal_size += len(records)
+        FileStorage.__dirty = {}
+        if FileStorage.__journal_size > FileStorage.journal_limit:
+            self.compact()
 
+    @_synchronized
+    def compact(self):
+        """
+        Write every object to a new snapshot in `file_path`
+        and discard the journal it supersedes
+
+        In sharded mode every shard is rewritten instead, and the files
+        of a former `shard_buckets` layout are removed. In ndjson format
+        the .ndjson file is rewritten without its stale lines.
+        """
+
+        if FileStorage.shared:
+            with self.__locked(True):
+                self.__compact()
+            return
+        self.__compact()
+
+    def __compact(self):
+        """Write a new snapshot as `compact` does, unlocked"""
+        self.__load()
+        if self.__format() == "ndjson":
+            self.__write_snapshot(self.__data_path(), self.__lines(
+                itertools.chain(FileStorage.__objects, FileStorage.__raw)))
+            self.__fsync_dir()
+            FileStorage.__dirty = {}
+            FileStorage.__stale = 0
+            return
+        if FileStorage.sharded and FileStorage.file_format == "json":
+            shards = self.__shard_keys()
+            written = {self.__shard_path(shard) for shard in shards}
+            for paths in self.__shard_paths().values():
+                for path in paths:
+                    if path not in written:
+                        os.remove(path)
+            self.__write_shards(shards)
+            return
+        keys = itertools.chain(FileStorage.__objects, FileStorage.__raw)
+        if FileStorage.file_format == "binary":
+            self.__write_snapshot(self.__data_path(), binary.encode(
+                self.__packed(keys)), "wb")
+        else:
+            self.__write_snapshot(self.__data_path(), self.__entries(keys))
+        try:
+            os.remove(self.__compressed(FileStorage.__journal_path))
+        except FileNotFoundError:
+            pass
+        FileStorage.__snapshot = self.__signature()
+        self.__write_terms()
+        self.__fsync_dir()
+        FileStorage.__dirty = {}
+        FileStorage.__journal_size = 0
+        FileStorage.__journal_offset = 0
+
+    def __terms_path(self):
+        """Return the path to the .terms file of the text indexes"""
+        return self.__compressed(f"{self.__base_path()}.terms")
+
+    def __write_terms(self):
+        """Write the text indexes to the .terms file, stamped with the
+        signature of the snapshot they index, or remove it if they're
+        empty"""
+        if not FileStorage.persist_terms:
+            return
+        self.__sync()
+        indexes = [f"{json.dumps(name)}: {index.dump()}"
+                   for name, indexes in FileStorage.__indexes.items()
+                   for index in indexes
+                   if isinstance(index, TextIndex) and index.terms]
+        if not indexes:
+            try:
+                os.remove(self.__terms_path())
+            except FileNotFoundError:
+                pass
+            return
+        # It isn't replaced atomically, as a torn file can't be decoded
+        # and is read again from the snapshot instead
+        with self.__open(self.__terms_path(), "w") as f:
+            f.write(f'{{"snapshot": {json.dumps(FileStorage.__snapshot)}, '
+                    f'"indexes": {{{", ".join(indexes)}}}}}')
+
+    def __read_terms(self):
+        """Return the text indexes of the .terms file by class name, or
+        None if there's none or it isn't the one of the snapshot"""
+        if not FileStorage.persist_terms:
+            return None
+        try:
+            with self.__open(self.__terms_path(), "r") as f:
+                terms = json.load(f)
+        except FileNotFoundError:
+            return None
+        except compression.ERRORS + (ValueError,):
+            return None
+        if (not isinstance(terms, dict) or FileStorage.__snapshot is None or
+                terms.get("snapshot") != list(FileStorage.__snapshot)):
+            return None
+        return terms.get("indexes")
+
+    def __write_shards(self, shards):
+        """Rewrite the files of `shards`, removing the emptied ones"""
+        by_shard = self.__shard_keys()
+        for shard in shards:
+            path = self.__shard_path(shard)
+            if by_shard.get(shard):
+                self.__write_snapshot(path, self.__entries(by_shard[shard]))
+            else:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        self.__fsync_dir()
+        FileStorage.__dirty = {}
+
+    def __write_snapshot(self, path, chunks, mode="w"):
+        """Write the text, or bytes in "wb" `mode`, `chunks` to a new
+        file in `path`
+
+        The file is written next to `path` and then replaces it,
+        so `path` is never left half written.
+        """
+        tmp_path = f"{path}.tmp"
+        try:
+            with self.__open(tmp_path, mode) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    @contextlib.contextmanager
+    def __open(self, path, mode):
+        """Open `path` in `mode`, through the compression of the files
+
+        Files opened to be written are flushed to disk as `durability`
+        asks once their compressed stream ended.
+
+        Args:
+            path (str): The path to the file
+            mode (str): "r", "w" or "a", followed by "b" for bytes
+        """
+        method = self.__compression()
+        writing = mode[0] in "wa"
+        with open(path, f"{mode[0]}b") as raw:
+            stream = raw
+            if method is not None:
+                stream = compression.wrap(raw, method,
+                                          "wb" if writing else "rb")
+            try:
+                if "b" in mode:
+                    yield stream
+                else:
+                    f = io.TextIOWrapper(stream, encoding="UTF8")
+                    try:
+                        yield f
+                    finally:
+                        f.detach()
+            finally:
+                if stream is not raw:
+                    stream.close()
+            if writing:
+                self.__fsync(raw)
+
+    def __entries(self, keys):
+        """Yield the text of a JSON object of the objects under `keys`
+
+        Each entry is on its own line, so the text can be split
+        between the workers of a parallel reload.
+        """
+        yield "{"
+        separator = ""
+        for key in keys:
+            yield f"{separator}{json.dumps(key)}: {self.__encode(key)}"
+            separator = ",\n"
+        yield "}"
+
+    def __lines(self, keys):
+        """Yield the lines of the objects stored under `keys`"""
+        for key in keys:
+            yield f"{self.__encode(key)}\n"
+
+    def __packed(self, keys):
+        """Yield the binary shape and fields of the objects or dicts
+        stored under `keys`"""
+        for key in keys:
+            obj = FileStorage.__objects.get(key)
+            if obj is None:
+                obj = FileStorage.__raw[key]
+            yield self.__fragment(key, obj, packed=True)
+
+    def __encode(self, key):
+        """Return the JSON text of the object or dict stored under `key`"""
+        obj = FileStorage.__objects.get(key)
+        if obj is not None:
+            return self.__fragment(key, obj)
+        if isinstance(FileStorage.__raw, ndjson.MappedRecords):
+            return FileStorage.__raw.text(key)
+        return self.__fragment(key, FileStorage.__raw[key])
+
+    def __append_lines(self):
+        """Append the dirty objects to the .ndjson file, compacting it
+        once it holds more stale lines than live ones"""
+        if not FileStorage.__dirty:
+            return
+        lines = []
+        for key, op in FileStorage.__dirty.items():
+            if op == "delete":
+                lines.append(ndjson.tombstone(key))
+                FileStorage.__stale += 2
+            elif key in FileStorage.__objects:
+                lines.append(
+                    f"{self.__fragment(key, FileStorage.__objects[key])}\n")
+                FileStorage.__stale += op == "update"
+        path = self.__data_path()
+        created = not os.path.exists(path)
+        with open(path, "a", encoding="UTF8") as f:
+            f.write("".join(lines))
+            self.__fsync(f)
+        if created:
+            self.__fsync_dir()
+        FileStorage.__dirty = {}
+        if FileStorage.__stale > self.count():
+            self.compact()
+
+    def __format(self):
+        """Return `file_format`, after checking it's a known one"""
+        if FileStorage.file_format not in ("json", "ndjson", "binary"):
+            raise ValueError(f"Unknown file format {FileStorage.file_format}")
+        return FileStorage.file_format
+
+    def __data_path(self):
+        """Return the path to the file of the objects in `file_format`"""
+        base_path = self.__base_path()
+        if self.__format() == "json":
+            return self.__compressed(base_path)
+        stem = os.path.splitext(base_path)[0]
+        if FileStorage.file_format == "binary":
+            return self.__compressed(f"{stem}.bin")
+        return f"{stem}.ndjson"
+
+    def __compression(self):
+        """Return the compression method of the files, or None
+
+        It's `compression` if set, else the one of the extension of
+        `file_path`. The .ndjson file is mapped so never compressed.
+        """
+        if FileStorage.file_format == "ndjson":
+            return None
+        return compression.method_of(FileStorage.__file_path,
+                                     FileStorage.compression)
+
+    def __compressed(self, path):
+        """Return `path` with the extension of the compression method"""
+        method = self.__compression()
+        if method is None:
+            return path
+        return path + compression.EXTENSIONS[method]
+
+    def __base_path(self):
+        """Return `file_path` without the extension of its compression"""
+        method = compression.method_of(FileStorage.__file_path)
+        if method is None:
+            return FileStorage.__file_path
+        return FileStorage.__file_path[:-len(compression.EXTENSIONS[method])]
+
+    def __shard_of(self, key):
+        """Return the shard of `key`, a (class name, bucket) tuple"""
+        name, id = key.split(".", 1)
+        if FileStorage.shard_buckets > 1:
+            return name, zlib.crc32(id.encode()) % FileStorage.shard_buckets
+        return name, 0
+
+    def __shard_path(self, shard):
+        """Return the path to the file of `shard`"""
+        stem, ext = os.path.splitext(self.__base_path())
+        name, bucket = shard
+        if FileStorage.shard_buckets > 1:
+            return self.__compressed(f"{stem}.{name}.{bucket}{ext}")
+        return self.__compressed(f"{stem}.{name}{ext}")
+
+    def __shard_paths(self):
+        """Return the paths to the existing shard files by class name"""
+        stem, ext = os.path.splitext(self.__base_path())
+        ext = self.__compressed(ext)
+        paths = {}
+        for path in sorted(glob.glob(
+                f"{glob.escape(stem)}.*{glob.escape(ext)}")):
+            name = path[len(stem) + 1:len(path) - len(ext)].split(".")[0]
+            paths.setdefault(name, []).append(path)
+        return paths
+
+    def __shard_keys(self):
+        """Return the keys of `objects` and `raw` by shard"""
+        self.__sync()
+        if FileStorage.shard_buckets <= 1:
+            return {(name, 0): keys
+                    for name, keys in FileStorage.__by_class.items()}
+        if FileStorage.__sharded_by != FileStorage.shard_buckets:
+            FileStorage.__by_shard = {}
+            for keys in FileStorage.__by_class.values():
+                for key in keys:
+                    FileStorage.__by_shard.setdefault(
+                        self.__shard_of(key), {})[key] = None
+            FileStorage.__sharded_by = FileStorage.shard_buckets
+        return FileStorage.__by_shard
+
+    def __fsync(self, f):
+        """Flush the file `f` to disk unless `durability` is none"""
+        if FileStorage.durability not in ("none", "file", "dir"):
+            raise ValueError(f"Unknown durability {FileStorage.durability}")
+        if FileStorage.durability != "none":
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __fsync_dir(self):
+        """Flush the directory of `file_path` if `durability` is dir"""
+        if FileStorage.durability != "dir":
+            return
+        fd = os.open(os.path.dirname(FileStorage.__file_path) or ".",
+                     os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def __fragment(self, key, obj, packed=False):
+        """Return the JSON text of `obj`, an instance or a `raw` dict,
+        or its binary shape and fields if `packed`, encoding it only if
+        dirty"""
+        cached = FileStorage.__fragments.get(key)
+        if cached is None or cached[0] is not obj:
+            cached = [obj, None, None]
+            FileStorage.__fragments[key] = cached
+        raw = isinstance(obj, dict)
+        if packed:
+            if cached[2] is None:
+                cached[2] = (binary.pack(obj["__class__"], obj) if raw else
+                             binary.pack(obj.__class__.__name__,
+                                         obj.__dict__))
+            return cached[2]
+        if cached[1] is None:
+            cached[1] = json.dumps(obj if raw else obj.to_dict())
+        return cached[1]
+
+    @_synchronized
     def reload(self):
         """
         Deserialize the JSON file specified in `file_path`
+        and replay the journal written since that snapshot
+
+        In lazy mode this is deferred until the objects are first used.
+        In ndjson format only the .ndjson file is read, and instances
+        are built on first use whether in lazy mode or not.
+        The saves deferred by write-behind mode are written first.
+        """
+
+        if FileStorage.__unflushed:
+            self.flush()
+        FileStorage.__raw = {}
+        FileStorage.__dirty = {}
+        FileStorage.__fragments = {}
+        FileStorage.__loaded = False
+        FileStorage.__loaded_shards = set()
+        if FileStorage.lazy:
+            return
+        if self.__format() == "ndjson":
+            self.__load()
+        else:
+            self.all()
+
+    def __load(self, name=None):
+        """Read the snapshot and the journal into `raw` if not done yet
+
+        In sharded mode only the shards of the class named `name`
+        are read, or those of every class if `name` is None.
+
+        In shared mode the files are read holding the shared lock,
+        and read again first if another process changed them.
         """
+        if FileStorage.shared:
+            with self.__locked(False):
+                self.__refresh()
+                self.__load_files(name)
+            return
+        self.__load_files(name)
 
+    def __load_files(self, name=None):
+        """Read the snapshot and the journal as `__load` does, unlocked"""
+        if FileStorage.__loaded or name in FileStorage.__loaded_shards:
+            return
+        if self.__format() == "ndjson":
+            self.__map()
+            return
+        if FileStorage.sharded and FileStorage.file_format == "json":
+            self.__load_shards(name)
+            return
+        FileStorage.__loaded = True
+        FileStorage.__journal_size = 0
+        FileStorage.__journal_offset = 0
+        FileStorage.__snapshot = self.__signature()
+        FileStorage.__raw = {}
+        FileStorage.__objects = {}
+        try:
+            if FileStorage.file_format == "binary":
+                self.__read_binary()
+            else:
+                with self.__open(self.__data_path(), "r") as f:
+                    if not self.__read_parallel([self.__data_path()]):
+                        self.__read(json_stream.iter_items(f))
+        except FileNotFoundError:
+            pass
+        FileStorage.__terms = self.__read_terms()
+        FileStorage.__replayed = set()
+        torn = False
         try:
-            with open(FileStorage.__file_path, "r") as f:
-                objects_as_dict = json.load(f)
-                FileStorage.__objects = {
-                    obj_id: eval(obj_dict["__class__"])(**obj_dict)
-                    for obj_id, obj_dict in objects_as_dict.items()}
+            if self.__compression() is None:
+                with open(FileStorage.__journal_path, "r+b") as f:
+                    replayed = 0
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # Drop a torn last record from an interrupted
+                            # append
+                            f.truncate(replayed)
+                            break
+                        self.__replay(record)
+                        replayed += len(line)
+                        FileStorage.__journal_size += 1
+                    FileStorage.__journal_offset = replayed
+            else:
+                journal_path = self.__compressed(FileStorage.__journal_path)
+                with self.__open(journal_path, "rb") as f:
+                    try:
+                        for line in f:
+                            self.__replay(json.loads(line))
+                            FileStorage.__journal_size += 1
+                    except compression.ERRORS + (ValueError,):
+                        torn = True
         except FileNotFoundError:
             pass
+        FileStorage.__indexed = None
+        if torn:
+            # A compressed journal can't be cut short, so what could be
+            # replayed is folded into a new snapshot instead
+            self.compact()
+
+    def __refresh(self):
+        """Catch up with the files if another process changed them
+        since they were read, holding the lock
+
+        The journal records appended since it was read are replayed
+        if that's all that changed, else the files are read again.
+        Either way the unsaved changes of this process are kept over
+        the changes of the others.
+        """
+        generation = self.__read_generation()
+        if generation == FileStorage.__generation:
+            return
+        FileStorage.__generation = generation
+        if not FileStorage.__loaded and not FileStorage.__loaded_shards:
+            return
+        dirty = FileStorage.__dirty
+        objects = {key: FileStorage.__objects.get(key) for key in dirty}
+        caught_up = self.__catch_up()
+        if not caught_up:
+            FileStorage.__raw = {}
+            FileStorage.__fragments = {}
+            FileStorage.__loaded = False
+            FileStorage.__loaded_shards = set()
+            if not dirty:
+                return
+            self.__load_files()
+        for key, op in dirty.items():
+            FileStorage.__raw.pop(key, None)
+            FileStorage.__fragments.pop(key, None)
+            if op == "delete" or objects[key] is None:
+                FileStorage.__objects.pop(key, None)
+            else:
+                FileStorage.__objects[key] = objects[key]
+        FileStorage.__dirty = dirty
+        if caught_up:
+            self.__reindex(dirty)
+        else:
+            FileStorage.__indexed = None
+
+    def __catch_up(self):
+        """Replay the journal records appended since the journal was read
+
+        Returns:
+            Whether that was all that changed, or False if the files
+            must be read again
+        """
+        if (not FileStorage.__loaded or not FileStorage.journal or
+                self.__format() == "ndjson" or
+                (FileStorage.sharded and FileStorage.file_format == "json") or
+                self.__compression() is not None or
+                self.__signature() != FileStorage.__snapshot):
+            return False
+        try:
+            with open(FileStorage.__journal_path, "rb") as f:
+                f.seek(FileStorage.__journal_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    record = json.loads(line)
+                    FileStorage.__fragments.pop(record["key"], None)
+                    self.__replay(record)
+                    FileStorage.__journal_offset += len(line)
+                    FileStorage.__journal_size += 1
+        except FileNotFoundError:
+            return FileStorage.__journal_offset == 0
+        self.__reindex(list(FileStorage.__replayed))
+        return True
+
+    def __signature(self):
+        """Return the inode, modification time and size of the snapshot,
+        or None if there's none"""
+        try:
+            stat = os.stat(self.__data_path())
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @contextlib.contextmanager
+    def __locked(self, exclusive):
+        """Hold the lock file shared, or exclusive to write the files
+
+        Only the outermost hold opens and closes the lock file,
+        a nested exclusive hold turns a shared one exclusive, and
+        releasing an exclusive hold bumps the generation of the files.
+
+        Raises:
+            OSError: If the platform has no file locks
+        """
+        if fcntl is None:
+            raise OSError("Shared mode needs fcntl file locks")
+        outermost = FileStorage.__lock_file is None
+        if outermost:
+            FileStorage.__lock_file = open(f"{self.__base_path()}.lock",
+                                           "a+", encoding="UTF8")
+            FileStorage.__exclusive = False
+        try:
+            if exclusive and not FileStorage.__exclusive:
+                fcntl.flock(FileStorage.__lock_file, fcntl.LOCK_EX)
+                FileStorage.__exclusive = True
+            elif outermost:
+                fcntl.flock(FileStorage.__lock_file, fcntl.LOCK_SH)
+            yield
+            if outermost and FileStorage.__exclusive:
+                FileStorage.__generation = self.__read_generation() + 1
+                FileStorage.__lock_file.seek(0)
+                FileStorage.__lock_file.truncate()
+                FileStorage.__lock_file.write(str(FileStorage.__generation))
+                FileStorage.__lock_file.flush()
+        finally:
+            if outermost:
+                FileStorage.__lock_file.close()
+                FileStorage.__lock_file = None
+
+    def __read_generation(self):
+        """Return the generation of the files, as written by the last
+        process that held the lock file exclusive"""
+        FileStorage.__lock_file.seek(0)
+        return int(FileStorage.__lock_file.read() or 0)
+
+    def __read_binary(self):
+        """Read the binary snapshot, mapping it unless it's compressed"""
+        if self.__compression() is None:
+            with open(self.__data_path(), "rb") as f:
+                with mmap.mmap(f.fileno(), 0,
+                               access=mmap.ACCESS_READ) as buffer:
+                    self.__read(binary.iter_records(
+                        buffer, datetimes=not FileStorage.lazy))
+            return
+        with self.__open(self.__data_path(), "rb") as f:
+            self.__read(binary.iter_records(
+                f.read(), datetimes=not FileStorage.lazy))
+
+    def __map(self):
+        """Map the .ndjson file and index the offset of each object,
+        truncating a torn last line from an interrupted append"""
+        FileStorage.__loaded = True
+        FileStorage.__stale = 0
+        FileStorage.__objects = {}
+        FileStorage.__raw = {}
+        FileStorage.__indexed = None
+        try:
+            f = open(self.__data_path(), "r+b")
+        except FileNotFoundError:
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            buffer = b""
+            if size:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            offsets, FileStorage.__stale, end = ndjson.index_lines(buffer)
+            if end < size:
+                buffer.close()
+                f.truncate(end)
+                buffer = b""
+                if end:
+                    buffer = mmap.mmap(f.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+        FileStorage.__raw = ndjson.MappedRecords(buffer, offsets)
+
+    def __load_shards(self, name):
+        """Read the shards of the class `name`, or every shard, into `raw`"""
+        paths = self.__shard_paths()
+        if not FileStorage.__loaded_shards:
+            FileStorage.__objects = {}
+        names = [shard_name
+                 for shard_name in (list(paths) if name is None else [name])
+                 if shard_name not in FileStorage.__loaded_shards]
+        FileStorage.__loaded_shards.update(names)
+        shard_paths = [path for shard_name in names
+                       for path in paths.get(shard_name, ())]
+        if not self.__read_parallel(shard_paths):
+            for path in shard_paths:
+                with self.__open(path, "r") as f:
+                    self.__read(json_stream.iter_items(f))
+        if name is None:
+            FileStorage.__loaded = True
+        FileStorage.__indexed = None
+
+    def __read(self, items):
+        """Store the objects of `items` as they're decoded from a file
+
+        Unless in lazy mode each instance is built as soon as its
+        dict is decoded, so the whole file is never held in memory.
+
+        Args:
+            items (iterable): The key and dict of each stored object
+        """
+        for key, obj_dict in items:
+            if FileStorage.lazy:
+                FileStorage.__raw[key] = obj_dict
+            else:
+                FileStorage.__objects[key] = models.classes[
+                    obj_dict["__class__"]].from_dict(obj_dict)
+
+    def __read_parallel(self, paths):
+        """Build the instances of the JSON snapshot files `paths` in
+        `workers` processes
+
+        Returns:
+            Whether they were read, or False if they must be read here:
+            with one worker, in lazy mode, if they're compressed or if
+            they aren't one entry per line
+        """
+        workers = FileStorage.workers or os.cpu_count() or 1
+        if (workers == 1 or FileStorage.lazy or
+                self.__compression() is not None):
+            return False
+        try:
+            FileStorage.__objects.update(parallel.read(paths, workers))
+        except ValueError:
+            return False
+        return True
+
+    def __replay(self, record):
+        """Apply one journal `record` to `raw`"""
+        FileStorage.__replayed.add(record["key"])
+        FileStorage.__objects.pop(record["key"], None)
+        if record["op"] == "delete":
+            FileStorage.__raw.pop(record["key"], None)
+        else:
+            FileStorage.__raw[record["key"]] = record["obj"]
+
+    def __sync(self):
+        """Rebuild `by_class` and the indexes if `objects` was replaced
+
+        The text indexes read from the .terms file are taken as they
+        are, but for the objects replayed from the journal or changed
+        since the snapshot was read.
+        """
+        if FileStorage.__indexed is FileStorage.__objects:
+            if FileStorage.__unindexed:
+                self.__update_indexes()
+            return
+        FileStorage.__unindexed = {}
+        terms = FileStorage.__terms or {}
+        changed = FileStorage.__replayed.union(FileStorage.__dirty)
+        FileStorage.__terms = None
+        FileStorage.__replayed = set()
+        FileStorage.__by_class = {}
+        FileStorage.__sharded_by = None
+        restored = set()
+        for name, indexes in FileStorage.__indexes.items():
+            for index in indexes:
+                index.clear()
+                if (isinstance(index, TextIndex) and
+                        index.load(terms.get(name))):
+                    restored.add(index)
+        for records in (FileStorage.__objects, FileStorage.__raw):
+            for key in records:
+                name = key.split(".", 1)[0]
+                FileStorage.__by_class.setdefault(name, {})[key] = None
+                indexes = FileStorage.__indexes.get(name, ())
+                if indexes:
+                    record = records[key]
+                    for index in indexes:
+                        if index not in restored or key in changed:
+                            index.add(key, record)
+        for index in restored:
+            for key in changed:
+                if (key not in FileStorage.__objects and
+                        key not in FileStorage.__raw):
+                    index.discard(key)
+        FileStorage.__indexed = FileStorage.__objects
+
+    def __update_indexes(self):
+        """Update the indexes of the objects in `unindexed`, over only
+        their changed attributes where they're known"""
+        unindexed, FileStorage.__unindexed = FileStorage.__unindexed, {}
+        self.__reindex([key for key, attrs in unindexed.items()
+                        if attrs is None or
+                        key not in FileStorage.__objects])
+        for key, attrs in unindexed.items():
+            obj = FileStorage.__objects.get(key)
+            if attrs is None or obj is None:
+                continue
+            name = key.split(".", 1)[0]
+            indexes = {}
+            for attr in attrs:
+                indexes.update(dict.fromkeys(self.__covering(name, attr)))
+            for index in indexes:
+                index.add(key, obj)
+
+    def __reindex(self, keys):
+        """Update `by_class`, `by_shard` and the indexes for the keys
+        of `objects` and `raw` in `keys`, which were changed, added or
+        removed behind them, rather than rebuild them all
+
+        Nothing is done if they're to be rebuilt anyway.
+        """
+        if FileStorage.__indexed is not FileStorage.__objects:
+            return
+        sharded = FileStorage.__sharded_by == FileStorage.shard_buckets > 1
+        for key in keys:
+            name = key.split(".", 1)[0]
+            record = FileStorage.__objects.get(key)
+            if record is None:
+                record = FileStorage.__raw.get(key)
+            if record is None:
+                FileStorage.__by_class.get(name, {}).pop(key, None)
+                if sharded:
+                    FileStorage.__by_shard.get(
+                        self.__shard_of(key), {}).pop(key, None)
+                for index in FileStorage.__indexes.get(name, ()):
+                    index.discard(key)
+                continue
+            FileStorage.__by_class.setdefault(name, {})[key] = None
+            if sharded:
+                FileStorage.__by_shard.setdefault(
+                    self.__shard_of(key), {})[key] = None
+            for index in FileStorage.__indexes.get(name, ()):
+                index.add(key, record)
+        FileStorage.__replayed.difference_update(keys)
+
+    def __get_all(self, keys):
+        """Return a new dict of the objects stored under `keys`"""
+        self.__build([key for key in keys if key in FileStorage.__raw])
+        return {key: FileStorage.__objects[key] for key in keys
+                if key in FileStorage.__objects}
+
+    def __build(self, keys):
+        """Build the instances stored under `keys` from their `raw` dicts"""
+        for key in keys:
+            obj_dict = FileStorage.__raw.pop(key)
+            FileStorage.__objects[key] = models.classes[
+                obj_dict["__class__"]].from_dict(obj_dict)
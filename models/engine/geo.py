@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+
+"""
+
+This module contains the geometry of the locations of the stored
+objects: great-circle distances in km and latitude and longitude
+boxes, which may cross the antimeridian
+
+"""
+
+import math
+
+# The mean radius of the Earth in km
+EARTH_RADIUS = 6371.0088
+
+
+def located(point):
+    """Return whether `point` is a valid (latitude, longitude)"""
+    try:
+        latitude, longitude = point
+        return (type(latitude) in (int, float) and
+                type(longitude) in (int, float) and
+                -90 <= latitude <= 90 and -180 <= longitude <= 180)
+    except (TypeError, ValueError):
+        return False
+
+
+def distance(a, b):
+    """Return the great-circle distance in km between two points
+
+    Args:
+        a (tuple): The latitude and longitude of a point, in degrees
+        b (tuple): The latitude and longitude of the other point
+    """
+    latitude_a, longitude_a = map(math.radians, a)
+    latitude_b, longitude_b = map(math.radians, b)
+    h = (math.sin((latitude_b - latitude_a) / 2) ** 2 +
+         math.cos(latitude_a) * math.cos(latitude_b) *
+         math.sin((longitude_b - longitude_a) / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(h)))
+
+
+def in_box(point, box):
+    """Return whether `point` is inside `box`
+
+    Args:
+        point (tuple): The latitude and longitude of the point
+        box (tuple): The south, west, north and east bounds of the box,
+                     whose west bound is east of its east bound if it
+                     crosses the antimeridian
+    """
+    latitude, longitude = point
+    south, west, north, east = box
+    if not south <= latitude <= north:
+        return False
+    if west <= east:
+        return west <= longitude <= east
+    return longitude >= west or longitude <= east
+
+
+def box_around(latitude, longitude, km):
+    """Return the smallest box holding the points within `km` of a point
+
+    Returns:
+        The south, west, north and east bounds of the box
+    """
+    angle = km / EARTH_RADIUS
+    south = latitude - math.degrees(angle)
+    north = latitude + math.degrees(angle)
+    if south <= -90 or north >= 90 or angle >= math.pi / 2:
+        return max(south, -90), -180, min(north, 90), 180
+    spread = math.sin(angle) / math.cos(math.radians(latitude))
+    if spread >= 1:
+        return south, -180, north, 180
+    spread = math.degrees(math.asin(spread))
+    west = longitude - spread
+    east = longitude + spread
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def near(point, circle):
+    """Return whether `point` is within a circle
+
+    Args:
+        point (tuple): The latitude and longitude of the point
+        circle (tuple): The latitude, longitude and radius in km
+                        of the circle
+    """
+    return located(point) and distance(point, circle[:2]) <= circle[2]
+
+
+def within(point, box):
+    """Return whether `point` is a location inside `box`, as `in_box`"""
+    return located(point) and in_box(point, box)
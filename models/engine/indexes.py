@@ -0,0 +1,737 @@
+#!/usr/bin/python3
+
+"""
+
+This module contains the indexes that the storage engines
+maintain over the attributes of the stored objects
+
+"""
+
+import bisect
+import collections
+import heapq
+import json
+import math
+from operator import itemgetter
+from models.engine import geo, text
+
+
+class Index:
+    """
+
+    The base of the indexes over one attribute of a class
+
+    The indexed records may be instances or the dicts they were
+    stored as, in which case missing attributes take the class
+    default like they would on an instance.
+
+    Attributes:
+        cls (type): The class of the indexed objects
+        attr (str): The indexed attribute
+        values (dict): The value indexed for each key
+
+    """
+
+    def __init__(self, cls, attr):
+        """Initialize an empty index over `attr` of `cls`
+
+        Args:
+            cls (type): The class of the indexed objects
+            attr (str): The indexed attribute
+        """
+        self.cls = cls
+        self.attr = attr
+        self.values = {}
+
+    def value_of(self, record):
+        """Return the value of the indexed attribute of `record`"""
+        if isinstance(record, dict):
+            return record.get(self.attr, getattr(self.cls, self.attr, None))
+        return getattr(record, self.attr, None)
+
+    def covers(self, attr):
+        """Return whether the indexed value depends on `attr`"""
+        if isinstance(self.attr, tuple):
+            return attr in self.attr
+        return attr == self.attr
+
+    def select(self, conditions):
+        """Return the keys of the objects that may match `conditions`
+
+        Args:
+            conditions (list): The operator and value of each condition
+                               of a query on the indexed attribute
+
+        Returns:
+            The keys, or None if the index can't narrow them down
+        """
+        return None
+
+
+class HashIndex(Index):
+    """
+
+    Maps each value of one attribute of a class
+    to the keys of the objects holding that value
+
+    Attributes:
+        keys (dict): The keys holding each value, as ordered sets
+
+    """
+
+    def __init__(self, cls, attr):
+        """Initialize an empty index over `attr` of `cls`
+
+        Args:
+            cls (type): The class of the indexed objects
+            attr (str): The indexed attribute
+        """
+        super().__init__(cls, attr)
+        self.keys = {}
+
+    def add(self, key, record):
+        """Index `record` under `key`, replacing what was indexed before"""
+        value = self.value_of(record)
+        try:
+            hash(value)
+        except TypeError:
+            value = None
+        if key in self.values:
+            if self.values[key] == value:
+                return
+            self.discard(key)
+        self.values[key] = value
+        self.keys.setdefault(value, {})[key] = None
+
+    def discard(self, key):
+        """Remove `key` from the index if it's inside"""
+        if key not in self.values:
+            return
+        value = self.values.pop(key)
+        keys = self.keys[value]
+        del keys[key]
+        if not keys:
+            del self.keys[value]
+
+    def find(self, value):
+        """Return the keys of the objects holding `value`"""
+        return self.keys.get(value, {})
+
+    def select(self, conditions):
+        """Return the fewest keys of the objects equal to a value of
+        the "==" and "in" `conditions`, or None if there are none"""
+        best = None
+        for op, value in conditions:
+            if op not in ("==", "in"):
+                continue
+            try:
+                keys = self.find(value) if op == "==" else {
+                    key: None for item in value for key in self.find(item)}
+            except TypeError:
+                continue
+            if best is None or len(keys) < len(best):
+                best = keys
+        return best
+
+    def clear(self):
+        """Remove every key from the index"""
+        self.keys = {}
+        self.values = {}
+
+
+class UniqueIndex(HashIndex):
+    """
+
+    A hash index over an attribute whose values must each be held by
+    one object at most, but for the empty values None and ""
+
+    Objects stored with a taken value before the index existed are
+    still indexed, as the index only keeps new values unique.
+
+    """
+
+    def check(self, key, value):
+        """Check that `value` can be held by the object under `key`
+
+        Raises:
+            ValueError: If another object holds `value`
+        """
+        if value is None or value == "":
+            return
+        try:
+            keys = self.find(value)
+        except TypeError:
+            return
+        for other in keys:
+            if other != key:
+                raise ValueError(f"Duplicate {self.attr}: {value!r}")
+
+
+class ListIndex(Index):
+    """
+
+    An inverted index of a list attribute of a class, which maps each
+    item of the lists to the keys of the objects whose list holds it
+
+    The objects holding every item of a query are found by
+    intersecting the keys of its items from the rarest one, so the
+    query costs as much as that item's keys. Unhashable items, and
+    values that aren't lists or tuples, aren't indexed.
+
+    Attributes:
+        keys (dict): The keys holding each item, as ordered sets
+        values (dict): The distinct items indexed for each key, as tuples
+
+    """
+
+    def __init__(self, cls, attr):
+        """Initialize an empty index over the list `attr` of `cls`
+
+        Args:
+            cls (type): The class of the indexed objects
+            attr (str): The indexed attribute
+        """
+        super().__init__(cls, attr)
+        self.keys = {}
+
+    def items_of(self, record):
+        """Return the distinct hashable items of the list of `record`"""
+        value = self.value_of(record)
+        if not isinstance(value, (list, tuple)):
+            return ()
+        items = {}
+        for item in value:
+            try:
+                items[item] = None
+            except TypeError:
+                continue
+        return tuple(items)
+
+    def add(self, key, record):
+        """Index `record` under `key`, replacing what was indexed before"""
+        items = self.items_of(record)
+        if key in self.values and self.values[key] == items:
+            return
+        self.discard(key)
+        self.values[key] = items
+        for item in items:
+            self.keys.setdefault(item, {})[key] = None
+
+    def discard(self, key):
+        """Remove `key` from the index if it's inside"""
+        for item in self.values.pop(key, ()):
+            keys = self.keys[item]
+            del keys[key]
+            if not keys:
+                del self.keys[item]
+
+    def find(self, item):
+        """Return the keys of the objects whose list holds `item`"""
+        return self.keys.get(item, {})
+
+    def select(self, conditions):
+        """Return the keys of the objects whose list holds the item of
+        every "has" condition, or None if there are none"""
+        postings = []
+        for op, value in conditions:
+            if op != "has":
+                continue
+            try:
+                postings.append(self.find(value))
+            except TypeError:
+                continue
+        if not postings:
+            return None
+        postings.sort(key=len)
+        return {key: None for key in postings[0]
+                if all(key in keys for keys in postings[1:])}
+
+    def clear(self):
+        """Remove every key from the index"""
+        self.keys = {}
+        self.values = {}
+
+
+def _ordered(value):
+    """Return whether `value` is a number a SortedIndex orders"""
+    return (type(value) in (int, float, bool) and
+            not (type(value) is float and math.isnan(value)))
+
+
+class SortedIndex(Index):
+    """
+
+    Keeps the keys of the objects of a class sorted by the value
+    of one numeric attribute, so ranges of values are found by
+    bisection in O(log N + k)
+
+    Only ints, floats and bools are ordered, objects holding any
+    other value are left out of the ranges: they can't be compared
+    with a number anyway.
+
+    Keys added before the index is first searched are only appended,
+    and sorted at once when it is.
+
+    Attributes:
+        entries (list): The value and key of each ordered object
+        ordered (bool): Whether `entries` is sorted
+
+    """
+
+    def __init__(self, cls, attr):
+        """Initialize an empty index over `attr` of `cls`
+
+        Args:
+            cls (type): The class of the indexed objects
+            attr (str): The indexed attribute
+        """
+        super().__init__(cls, attr)
+        self.entries = []
+        self.ordered = False
+
+    def __sort(self):
+        """Sort `entries` if keys were appended since it was sorted"""
+        if not self.ordered:
+            self.entries.sort()
+            self.ordered = True
+
+    def add(self, key, record):
+        """Index `record` under `key`, replacing what was indexed before"""
+        value = self.value_of(record)
+        if key in self.values:
+            if self.values[key] == value and (
+                    type(self.values[key]) is type(value)):
+                return
+            self.discard(key)
+        self.values[key] = value
+        if not _ordered(value):
+            return
+        if self.ordered:
+            bisect.insort(self.entries, (value, key))
+        else:
+            self.entries.append((value, key))
+
+    def discard(self, key):
+        """Remove `key` from the index if it's inside"""
+        if key not in self.values:
+            return
+        value = self.values.pop(key)
+        if not _ordered(value):
+            return
+        self.__sort()
+        del self.entries[bisect.bisect_left(self.entries, (value, key))]
+
+    def range(self, low=None, high=None, low_inclusive=True,
+              high_inclusive=True):
+        """Return the keys of the objects holding a value in a range
+
+        Args:
+            low (int or float): The lowest value, or None for no bound
+            high (int or float): The highest value, or None for no bound
+            low_inclusive (bool): Whether `low` itself is in the range
+            high_inclusive (bool): Whether `high` itself is in the range
+
+        Returns:
+            The keys by increasing value, as an ordered set
+        """
+        self.__sort()
+        value = itemgetter(0)
+        start, end = 0, len(self.entries)
+        if low is not None:
+            find = bisect.bisect_left if low_inclusive else bisect.bisect_right
+            start = find(self.entries, low, key=value)
+        if high is not None:
+            find = (bisect.bisect_right if high_inclusive
+                    else bisect.bisect_left)
+            end = find(self.entries, high, key=value)
+        return {key: None for value, key in self.entries[start:end]}
+
+    def find(self, value):
+        """Return the keys of the objects holding the number `value`"""
+        return self.range(value, value)
+
+    def select(self, conditions):
+        """Return the keys of the objects in the range of the numbers
+        the conditions compare with, or of the numbers of an "in"
+        condition, or None if there are none"""
+        lows = []
+        highs = []
+        best = None
+        for op, value in conditions:
+            if op == "in":
+                if value and all(_ordered(item) for item in value):
+                    keys = {key: None for item in value
+                            for key in self.find(item)}
+                    if best is None or len(keys) < len(best):
+                        best = keys
+                continue
+            if not _ordered(value):
+                continue
+            if op in ("==", ">=", ">"):
+                lows.append((value, op != ">"))
+            if op in ("==", "<=", "<"):
+                highs.append((value, op != "<"))
+        if lows or highs:
+            low, low_inclusive = max(
+                lows, key=lambda bound: (bound[0], not bound[1]),
+                default=(None, True))
+            high, high_inclusive = min(
+                highs, key=itemgetter(0, 1), default=(None, True))
+            keys = self.range(low, high, low_inclusive, high_inclusive)
+            if best is None or len(keys) < len(best):
+                best = keys
+        return best
+
+    def clear(self):
+        """Remove every key from the index"""
+        self.entries = []
+        self.ordered = False
+        self.values = {}
+
+
+class GeoIndex(Index):
+    """
+
+    Buckets the keys of the objects of a class in a grid of cells
+    of `size` degrees by their latitude and longitude, so the places
+    within a radius or a box are found among the cells they overlap,
+    and the nearest places by searching rings of cells around a point
+
+    Objects whose location isn't a valid latitude and longitude
+    aren't in any cell.
+
+    Attributes:
+        size (float): The size of the cells, in degrees
+        rows (int): The number of rows of cells, from south to north
+        columns (int): The number of columns of cells, from west to east
+        cells (dict): The keys of the objects in each cell, by row
+                        and column
+
+    """
+
+    def __init__(self, cls, latitude="latitude", longitude="longitude",
+                 size=1.0):
+        """Initialize an empty index over the location of `cls`
+
+        Args:
+            cls (type): The class of the indexed objects
+            latitude (str): The attribute holding the latitude
+            longitude (str): The attribute holding the longitude
+            size (float): The size of the cells, in degrees
+        """
+        super().__init__(cls, (latitude, longitude))
+        self.size = size
+        self.rows = math.ceil(180 / size)
+        self.columns = math.ceil(360 / size)
+        self.cells = {}
+
+    def value_of(self, record):
+        """Return the latitude and longitude of `record`"""
+        if isinstance(record, dict):
+            return tuple(record.get(attr, getattr(self.cls, attr, None))
+                         for attr in self.attr)
+        return tuple(getattr(record, attr, None) for attr in self.attr)
+
+    def cell(self, point):
+        """Return the row and column of the cell of a valid `point`"""
+        latitude, longitude = point
+        row = min(int((latitude + 90) // self.size), self.rows - 1)
+        return row, int((longitude + 180) // self.size) % self.columns
+
+    def add(self, key, record):
+        """Index `record` under `key`, replacing what was indexed before"""
+        value = self.value_of(record)
+        if key in self.values:
+            if self.values[key] == value:
+                return
+            self.discard(key)
+        self.values[key] = value
+        if geo.located(value):
+            self.cells.setdefault(self.cell(value), {})[key] = None
+
+    def discard(self, key):
+        """Remove `key` from the index if it's inside"""
+        if key not in self.values:
+            return
+        value = self.values.pop(key)
+        if not geo.located(value):
+            return
+        cell = self.cell(value)
+        keys = self.cells[cell]
+        del keys[key]
+        if not keys:
+            del self.cells[cell]
+
+    def box(self, south, west, north, east):
+        """Return the keys of the objects in the cells a box overlaps
+
+        Args:
+            south (float): The southern latitude of the box
+            west (float): The western longitude of the box, east of
+                          `east` if the box crosses the antimeridian
+            north (float): The northern latitude of the box
+            east (float): The eastern longitude of the box
+
+        Returns:
+            The keys, or None if the box overlaps more cells than there
+            are keys, as checking every key is cheaper then
+        """
+        if south > north:
+            return {}
+        first_row, first_column = self.cell((max(south, -90), west))
+        last_row = self.cell((min(north, 90), east))[0]
+        if west > east:
+            east += 360
+        span = int((east + 180) // self.size) - int((west + 180) // self.size)
+        columns = min(span + 1, self.columns)
+        if (last_row - first_row + 1) * columns > len(self.values):
+            return None
+        keys = {}
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, first_column + columns):
+                keys.update(self.cells.get((row, column % self.columns), {}))
+        return keys
+
+    def select(self, conditions):
+        """Return the keys of the objects in the cells overlapped by the
+        smallest circle of the "near" `conditions` or box of the
+        "within" ones, or None if there are none"""
+        best = None
+        for op, value in conditions:
+            try:
+                if op == "near":
+                    keys = self.box(*geo.box_around(*value))
+                elif op == "within":
+                    keys = self.box(*value)
+                else:
+                    continue
+            except (TypeError, ValueError, OverflowError):
+                continue
+            if keys is not None and (best is None or len(keys) < len(best)):
+                best = keys
+        return best
+
+    def nearest(self, latitude, longitude):
+        """Yield the keys of the objects from the nearest to `latitude`
+        and `longitude`, then the keys of those with no location
+
+        The rings of cells around the cell of the point are searched
+        one at a time, and the keys found are yielded once they're no
+        farther than any cell outside of the rings searched so far.
+
+        Raises:
+            ValueError: If `latitude` and `longitude` aren't a valid
+                        location
+        """
+        origin = (latitude, longitude)
+        if not geo.located(origin):
+            raise ValueError(f"Not a location: {origin}")
+        origin_row, origin_column = self.cell(origin)
+        cosine = math.cos(math.radians(latitude))
+        heap = []
+        visited = set()
+        for ring in range(max(self.rows, self.columns)):
+            for row in range(origin_row - ring, origin_row + ring + 1):
+                if not 0 <= row < self.rows:
+                    continue
+                edge = abs(row - origin_row) == ring
+                step = 1 if edge else 2 * ring
+                for column in range(origin_column - ring,
+                                    origin_column + ring + 1, step or 1):
+                    cell = (row, column % self.columns)
+                    if cell in visited:
+                        continue
+                    visited.add(cell)
+                    for key in list(self.cells.get(cell, ())):
+                        heapq.heappush(heap, (
+                            geo.distance(origin, self.values[key]), key))
+            bound = math.inf
+            north = (origin_row + ring + 1) * self.size - 90
+            if north < 90:
+                bound = min(bound, math.radians(north - latitude))
+            south = (origin_row - ring) * self.size - 90
+            if south > -90:
+                bound = min(bound, math.radians(latitude - south))
+            if (2 * ring + 1) * self.size < 360:
+                for degrees in (
+                        (origin_column + ring + 1) * self.size - 180
+                        - longitude,
+                        longitude - (origin_column - ring) * self.size
+                        + 180):
+                    bound = min(bound, math.asin(
+                        math.sin(math.radians(min(degrees, 90))) * cosine))
+            bound *= geo.EARTH_RADIUS
+            while heap and heap[0][0] <= bound:
+                yield heapq.heappop(heap)[1]
+            if bound == math.inf:
+                break
+        while heap:
+            yield heapq.heappop(heap)[1]
+        yield from [key for key, value in self.values.items()
+                    if not geo.located(value)]
+
+    def clear(self):
+        """Remove every key from the index"""
+        self.cells = {}
+        self.values = {}
+
+
+class TextIndex(Index):
+    """
+
+    An inverted index of the words of text attributes of a class,
+    which maps each word to the keys of the objects holding it
+
+    The objects holding every word of a search are found by
+    intersecting the keys of its words from the rarest one, and
+    ranked by BM25, so a search costs as much as its matches. The
+    value indexed for each key is its words joined by spaces.
+
+    Attributes:
+        terms (dict): The keys of the objects holding each word, with
+                      the number of times they hold it
+        length (int): The number of words of every indexed object
+        fragments (dict): The JSON text of the keys of each word,
+                          for every word unchanged since encoded
+
+    """
+
+    # The BM25 saturation of the repeats of a word
+    K1 = 1.2
+    # The BM25 weight of the length of the text
+    B = 0.75
+
+    def __init__(self, cls, *attrs):
+        """Initialize an empty index over the text `attrs` of `cls`
+
+        Args:
+            cls (type): The class of the indexed objects
+            attrs (str): The indexed attributes, whose words are
+                         indexed together
+        """
+        super().__init__(cls, attrs[0] if len(attrs) == 1 else attrs)
+        self.terms = {}
+        self.length = 0
+        self.fragments = {}
+
+    def value_of(self, record):
+        """Return the text of `record`, a tuple if there are many"""
+        if not isinstance(self.attr, tuple):
+            return super().value_of(record)
+        if isinstance(record, dict):
+            return tuple(record.get(attr, getattr(self.cls, attr, None))
+                         for attr in self.attr)
+        return tuple(getattr(record, attr, None) for attr in self.attr)
+
+    def add(self, key, record):
+        """Index `record` under `key`, replacing what was indexed before"""
+        words = text.tokens(self.value_of(record))
+        value = " ".join(words)
+        if self.values.get(key) == value:
+            return
+        self.discard(key)
+        self.values[key] = value
+        for term, count in collections.Counter(words).items():
+            self.terms.setdefault(term, {})[key] = count
+            self.fragments.pop(term, None)
+        self.length += len(words)
+
+    def discard(self, key):
+        """Remove `key` from the index if it's inside"""
+        value = self.values.pop(key, None)
+        if value is None:
+            return
+        words = value.split()
+        for term in set(words):
+            keys = self.terms[term]
+            del keys[key]
+            if not keys:
+                del self.terms[term]
+            self.fragments.pop(term, None)
+        self.length -= len(words)
+
+    def words(self, conditions):
+        """Return the distinct words of the "match" `conditions`"""
+        words = {}
+        for op, value in conditions:
+            if op == "match" and isinstance(value, str):
+                words.update(dict.fromkeys(text.tokens(value)))
+        return list(words)
+
+    def select(self, conditions):
+        """Return the keys of the objects holding every word of the
+        "match" `conditions`, or None if they have no words"""
+        words = self.words(conditions)
+        if not words:
+            return None
+        postings = sorted((self.terms.get(word, {}) for word in words),
+                          key=len)
+        return {key: None for key in postings[0]
+                if all(key in keys for keys in postings[1:])}
+
+    def rank(self, keys, conditions):
+        """Return `keys` from the object that best matches the words
+        of the "match" `conditions`, by their BM25 score"""
+        words = self.words(conditions)
+        if not words or not self.values:
+            return list(keys)
+        average = self.length / len(self.values) or 1
+        weights = []
+        for word in words:
+            keys_of = self.terms.get(word, {})
+            weights.append((keys_of, math.log(
+                1 + (len(self.values) - len(keys_of) + 0.5) /
+                (len(keys_of) + 0.5))))
+
+        def score(key):
+            value = self.values.get(key)
+            if not value:
+                return 0
+            norm = self.K1 * (1 - self.B + self.B *
+                              (value.count(" ") + 1) / average)
+            total = 0
+            for keys_of, weight in weights:
+                count = keys_of.get(key, 0)
+                total += weight * count * (self.K1 + 1) / (count + norm)
+            return total
+        return sorted(keys, key=score, reverse=True)
+
+    def dump(self):
+        """Return the JSON text of the index, reusing the encoded keys
+        of every word unchanged since the last dump"""
+        attrs = self.attr if isinstance(self.attr, tuple) else (self.attr,)
+        terms = []
+        for term, keys in self.terms.items():
+            if term not in self.fragments:
+                self.fragments[term] = json.dumps(keys)
+            terms.append(f"{json.dumps(term)}: {self.fragments[term]}")
+        return (f'{{"attrs": {json.dumps(list(attrs))}, '
+                f'"length": {self.length}, '
+                f'"values": {json.dumps(self.values)}, '
+                f'"terms": {{{", ".join(terms)}}}}}')
+
+    def load(self, state):
+        """Replace the index with `state`, decoded from `dump`
+
+        Returns:
+            Whether `state` was an index of the same attributes
+        """
+        attrs = self.attr if isinstance(self.attr, tuple) else (self.attr,)
+        if not isinstance(state, dict) or state.get("attrs") != list(attrs):
+            return False
+        self.clear()
+        try:
+            self.values = dict(state["values"])
+            self.terms = dict(state["terms"])
+            self.length = int(state["length"])
+        except (KeyError, TypeError, ValueError):
+            self.clear()
+            return False
+        return True
+
+    def clear(self):
+        """Remove every key from the index"""
+        self.terms = {}
+        self.values = {}
+        self.length = 0
+        self.fragments = {}
@@ -0,0 +1,162 @@
+#!/usr/bin/python3
+
+"""
+
+This module contains a reader that decodes the entries of
+a JSON object one at a time from a file, so the file never
+needs to be held in memory as a whole
+
+"""
+
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"[ \t\n\r]*")
+_colon = re.compile(r"[ \t\n\r]*:[ \t\n\r]*")
+_separator = re.compile(r"[ \t\n\r]*([,}])[ \t\n\r]*")
+
+
+class _Reader:
+    """
+
+    Reads a text file in chunks, keeping only the unread text
+
+    Attributes:
+        f (file): The file to read
+        chunk_size (int): The number of characters read at once
+        buffer (str): The text read but not all consumed yet
+        pos (int): The position of the first unread character in `buffer`
+        eof (bool): Whether the end of `f` was reached
+
+    """
+
+    def __init__(self, f, chunk_size):
+        """Initialize a reader of `f` that reads `chunk_size` at once"""
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size):
+        """Read `size` more characters, returning False at end of file"""
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, or "" at the end"""
+        while True:
+            self.pos = _whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.fill(self.chunk_size):
+                return self.buffer[self.pos:self.pos + 1]
+
+    def take(self, expected):
+        """Consume and return the next character if it's in `expected`
+
+        Raises:
+            json.JSONDecodeError: If the next character isn't expected
+        """
+        char = self.peek()
+        if not char or char not in expected:
+            raise json.JSONDecodeError(f"Expecting {expected!r}",
+                                       self.buffer, self.pos)
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """Decode and return the next JSON value, reading as much as needed
+
+        A value that reaches the end of `buffer` may continue in the
+        file, so it's decoded again once more text was read.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill(max(self.chunk_size, len(self.buffer)))
+
+    def entry(self):
+        """Decode the next entry of the object, reading as much as needed
+
+        Returns:
+            The key and value of the entry, whether it's the last one
+            and the position after its separator
+        """
+        if self.peek() != '"':
+            self.take('"')
+        key = self.decode()
+        self.take(":")
+        value = self.decode()
+        return key, value, self.take(",}") == "}", self.pos
+
+
+def _scan(buffer, pos):
+    """Decode the entry of an object starting at `pos` in `buffer`
+
+    Returns:
+        The key and value of the entry, whether it's the last one
+        and the position after its separator, or None if `buffer`
+        doesn't hold a whole valid entry at `pos`
+    """
+    pos = _whitespace.match(buffer, pos).end()
+    if not buffer.startswith('"', pos):
+        return None
+    try:
+        key, end = _decoder.raw_decode(buffer, pos)
+        colon = _colon.match(buffer, end)
+        if colon is None:
+            return None
+        value, end = _decoder.raw_decode(buffer, colon.end())
+    except json.JSONDecodeError:
+        return None
+    separator = _separator.match(buffer, end)
+    if separator is None:
+        return None
+    return key, value, separator.group(1) == "}", separator.end()
+
+
+def iter_items(f, chunk_size=65536):
+    """Yield the key and value of each entry of the JSON object in `f`
+
+    Only the entry being decoded and one chunk of text are held in
+    memory, the values themselves are decoded by the json module.
+    Entries cut by the end of a chunk are decoded again once the
+    next chunk was read.
+
+    Args:
+        f (file): The text file holding a JSON object
+        chunk_size (int): The number of characters read at once
+
+    Raises:
+        json.JSONDecodeError: If `f` doesn't hold a JSON object
+    """
+    reader = _Reader(f, chunk_size)
+    reader.take("{")
+    if reader.peek() == "}":
+        reader.take("}")
+    else:
+        while True:
+            entry = _scan(reader.buffer, reader.pos)
+            if entry is None:
+                if reader.fill(max(chunk_size,
+                                   len(reader.buffer) - reader.pos)):
+                    continue
+                entry = reader.entry()
+            key, value, last, reader.pos = entry
+            yield key, value
+            if last:
+                break
+    if reader.peek():
+        raise json.JSONDecodeError("Extra data", reader.buffer, reader.pos)
@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+
+"""
+
+This module contains the helpers of the line-delimited JSON format,
+where each line holds the dict of one stored object, or a tombstone
+line marking the object it names as destroyed
+
+"""
+
+import json
+import re
+from collections.abc import MutableMapping
+
+# The id leads and the class ends every line, as they do in `to_dict`
+_line = re.compile(rb'\{"id": "([^"\\]*)"(, "__deleted__": true)?'
+                   rb'.*"__class__": "([^"\\]*)"\}')
+
+
+def tombstone(key):
+    """Return the line marking the object stored under `key` as destroyed"""
+    name, id = key.split(".", 1)
+    return (f'{{"id": {json.dumps(id)}, "__deleted__": true, '
+            f'"__class__": {json.dumps(name)}}}\n')
+
+
+def index_lines(buffer):
+    """Index the last line of each object in `buffer`
+
+    The key of a line is read from its id and class without decoding
+    the rest of it, unless they are escaped.
+
+    Args:
+        buffer (bytes-like): The lines, such as a mapped file
+
+    Returns:
+        The offset and length of the line of each live object by key,
+        the number of lines superseded or destroyed since written, and
+        the length of the whole lines, short of `buffer` if it ends
+        with a torn line
+
+    Raises:
+        ValueError: If a whole line isn't a stored object or tombstone
+    """
+    offsets = {}
+    stale = 0
+    start = 0
+    while start < len(buffer):
+        end = buffer.find(b"\n", start)
+        if end == -1:
+            break
+        match = _line.fullmatch(buffer, start, end)
+        if match is not None:
+            key = f"{match[3].decode()}.{match[1].decode()}"
+            deleted = match[2] is not None
+        else:
+            record = json.loads(buffer[start:end])
+            key = f"{record['__class__']}.{record['id']}"
+            deleted = record.get("__deleted__") is True
+        if key in offsets:
+            stale += 1
+        if deleted:
+            offsets.pop(key, None)
+            stale += 1
+        else:
+            offsets[key] = (start, end - start)
+        start = end + 1
+    return offsets, stale, start
+
+
+class MappedRecords(MutableMapping):
+    """
+
+    The dicts of the stored objects by key, each decoded from its
+    line of a mapped file when it's accessed
+
+    Dicts set afterwards are kept decoded, in place of their line.
+
+    Attributes:
+        buffer (bytes-like): The mapped lines
+        offsets (dict): The offset and length of each line by key
+        decoded (dict): The dicts set since the file was mapped, by key
+
+    """
+
+    def __init__(self, buffer, offsets):
+        """Initialize the records of the lines of `buffer` at `offsets`
+
+        Args:
+            buffer (bytes-like): The mapped lines
+            offsets (dict): The offset and length of each line by key
+        """
+        self.buffer = buffer
+        self.offsets = offsets
+        self.decoded = {}
+
+    def __getitem__(self, key):
+        """Return the dict stored under `key`, decoding its line"""
+        if key in self.decoded:
+            return self.decoded[key]
+        offset, length = self.offsets[key]
+        return json.loads(self.buffer[offset:offset + length])
+
+    def __setitem__(self, key, value):
+        """Store the dict `value` under `key`, replacing its line"""
+        self.offsets.pop(key, None)
+        self.decoded[key] = value
+
+    def __delitem__(self, key):
+        """Remove the dict or line stored under `key`"""
+        if self.offsets.pop(key, None) is None:
+            del self.decoded[key]
+
+    def __contains__(self, key):
+        """Return whether a dict or line is stored under `key`"""
+        return key in self.offsets or key in self.decoded
+
+    def __iter__(self):
+        """Iterate over the keys of the lines, then of the dicts"""
+        yield from self.offsets
+        yield from self.decoded
+
+    def __len__(self):
+        """Return the number of stored dicts and lines"""
+        return len(self.offsets) + len(self.decoded)
+
+    def text(self, key):
+        """Return the JSON text stored under `key` without decoding it"""
+        if key in self.decoded:
+            return json.dumps(self.decoded[key])
+        offset, length = self.offsets[key]
+        return self.buffer[offset:offset + length].decode()
@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+
+"""
+
+This module contains the parallel reader of JSON snapshot files,
+which splits them into chunks of whole lines and builds the
+instances of each chunk in a pool of worker processes
+
+A snapshot holds one entry of its JSON object per line, as
+FileStorage writes it, so a chunk of whole lines is a whole
+number of entries that can be decoded on its own.
+
+"""
+
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import models
+
+# The fewest bytes worth sending to a worker as one chunk
+CHUNK_SIZE = 1 << 20
+
+
+def chunks(path, count):
+    """Split the file at `path` into up to `count` chunks of whole lines
+
+    Args:
+        path (str): The path to the file
+        count (int): The number of chunks to split it into
+
+    Returns:
+        The start and end offset of each chunk
+    """
+    size = os.path.getsize(path)
+    count = max(1, min(count, size // CHUNK_SIZE))
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, count):
+            f.seek(max(size * i // count, bounds[-1]))
+            f.readline()
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def decode(path, start, end):
+    """Build the instances of the entries on the lines of a chunk
+
+    Args:
+        path (str): The path to the snapshot file
+        start (int): The offset of the first line of the chunk
+        end (int): The offset after the last line of the chunk
+
+    Returns:
+        The key and instance of each entry
+
+    Raises:
+        ValueError: If a line isn't whole entries of stored objects
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode()
+        last = not f.read(1)
+    # The braces of the object are on the first and last lines
+    if start == 0:
+        text = text.lstrip().removeprefix("{")
+    if last:
+        text = text.rstrip().removesuffix("}")
+    objects = []
+    for line in text.splitlines():
+        line = line.strip().removesuffix(",")
+        if not line:
+            continue
+        for key, obj_dict in json.loads(f"{{{line}}}").items():
+            if (not isinstance(obj_dict, dict) or
+                    obj_dict.get("__class__") not in models.classes or
+                    key != f"{obj_dict['__class__']}.{obj_dict.get('id')}"):
+                raise ValueError(f"Not a stored object: {key}")
+            objects.append((key, models.classes[
+                obj_dict["__class__"]].from_dict(obj_dict)))
+    return objects
+
+
+def read(paths, workers):
+    """Yield the key and instance of each entry of the snapshot `paths`
+
+    The chunks are decoded by `workers` processes, which are forked
+    where possible so they don't import the models anew, and yielded
+    in the order of the files. While the models package is still
+    being imported, as when it loads the storage, they are decoded
+    here instead: forked workers would wait forever for that import
+    to end before they could load `decode`.
+
+    Args:
+        paths (list): The paths to the snapshot files
+        workers (int): The number of worker processes
+
+    Raises:
+        ValueError: If a file isn't one entry per line
+    """
+    tasks = [(path, start, end) for path in paths
+             for start, end in chunks(path, workers)]
+    if len(tasks) < 2 or getattr(models.__spec__, "_initializing", False):
+        for task in tasks:
+            yield from decode(*task)
+        return
+    context = None
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=context) as executor:
+        for objects in executor.map(decode, *zip(*tasks)):
+            yield from objects
@@ -0,0 +1,260 @@
+#!/usr/bin/python3
+
+"""
+
+This module contains the Query class that filters, orders and pages
+the stored objects of one class, letting the storage engine narrow
+the objects down with its indexes first
+
+"""
+
+import datetime
+import heapq
+import itertools
+import math
+import operator
+from models.engine import geo, text
+
+# The attributes holding the location of an object
+LOCATION = ("latitude", "longitude")
+# The attributes holding the searchable text of each class, by name
+TEXT = {"Amenity": "name", "Place": ("name", "description"),
+        "Review": "text"}
+# The comparison of each operator `where` accepts
+OPERATORS = {
+    "==": operator.eq, "!=": operator.ne,
+    "<": operator.lt, "<=": operator.le,
+    ">": operator.gt, ">=": operator.ge,
+    "in": lambda value, values: value in values,
+    "has": lambda values, item: (isinstance(values, (list, tuple)) and
+                                 item in values),
+    "near": geo.near, "within": geo.within, "match": text.matches,
+}
+
+
+def _value(obj, attr):
+    """Return the value of `attr` of `obj`, or the tuple of the values
+    of the attributes if `attr` is a tuple"""
+    if isinstance(attr, tuple):
+        return tuple(getattr(obj, name, None) for name in attr)
+    return getattr(obj, attr, None)
+
+
+def _sort_key(value):
+    """Return the key ordering `value`: None first, then the numbers,
+    then the other values grouped by type, so values of different
+    types are never compared with each other
+
+    Strings, dates and datetimes are ordered by value, the values of
+    other types by their repr, as they may not be ordered at all.
+    """
+    if value is None:
+        return 0, "", 0
+    if isinstance(value, (int, float)):
+        return 1, "", value
+    if isinstance(value, (str, datetime.date)):
+        return 2, type(value).__name__, value
+    return 3, type(value).__name__, repr(value)
+
+
+class Query:
+    """
+
+    A query of the stored objects of one class, narrowed by chaining
+    `where`, `having`, `search`, `order_by`, `limit` and `offset`,
+    each of which returns a new query, and run lazily as it's iterated
+
+    The storage engine selects the objects that may match from its
+    indexes where it can, then each of them is checked against every
+    condition, so an index only ever saves work.
+
+    Attributes:
+        cls (str): The class name of the queried objects
+        select (callable): Returns the objects of `cls` that may match
+                            the conditions it's passed, and whether
+                            they're in the order it's passed
+        conditions (tuple): The attribute, operator and value of each
+                            condition the objects must match
+        order (tuple): The attribute to order by, whether it's in
+                        descending order and the point to order the
+                        distance of its location from, or None for
+                        the stored order
+        count (int): The most objects to yield, or None for every one
+        skip (int): The number of objects to skip first
+
+    """
+
+    def __init__(self, cls, select):
+        """Initialize a query of every object of `cls`
+
+        Args:
+            cls (str): The class name of the queried objects
+            select (callable): Returns the objects of `cls` that may
+                               match the conditions it's passed, and
+                               whether they're already in the order
+                               it's passed
+        """
+        self.cls = cls
+        self.select = select
+        self.conditions = ()
+        self.order = None
+        self.count = None
+        self.skip = 0
+
+    def __copy(self, **attrs):
+        """Return a copy of the query with `attrs` replaced"""
+        query = Query(self.cls, self.select)
+        query.__dict__.update(self.__dict__)
+        query.__dict__.update(attrs)
+        return query
+
+    def where(self, attr=None, op="==", value=None, **equals):
+        """Return the query narrowed to the objects matching a condition
+
+        Args:
+            attr (str): The attribute to compare, or `LOCATION`
+                        for "near" and "within"
+            op (str): The operator comparing it with `value`, one of
+                      `OPERATORS`
+            value: The value to compare the attribute with, the values
+                   it may take for "in", the item its list must hold
+                   for "has", the latitude, longitude and
+                   radius in km for "near", the south, west, north
+                   and east bounds for "within", or the words the
+                   attribute must all hold for "match"
+            equals (dict): The values other attributes must be equal to
+
+        Raises:
+            ValueError: If `op` isn't an operator
+        """
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator {op}")
+        conditions = list(self.conditions)
+        if attr is not None:
+            if op == "in":
+                value = tuple(value)
+            conditions.append((attr, op, value))
+        conditions.extend((attr, "==", value)
+                          for attr, value in equals.items())
+        return self.__copy(conditions=tuple(conditions))
+
+    def having(self, attr, *items):
+        """Return the query narrowed to the objects whose list `attr`
+        holds every one of `items`
+
+        Args:
+            attr (str): The list attribute, such as "amenity_ids"
+            items (tuple): The items the list must all hold
+        """
+        query = self
+        for item in items:
+            query = query.where(attr, "has", item)
+        return query
+
+    def order_by(self, attr, descending=False):
+        """Return the query ordered by `attr`, None values first, then
+        numbers, then the other values grouped by type
+
+        Args:
+            attr (str): The attribute to order by
+            descending (bool): Whether to order from the largest value
+        """
+        return self.__copy(order=(attr, descending, None))
+
+    def near(self, latitude, longitude, km):
+        """Return the query narrowed to the objects located within
+        `km` of `latitude` and `longitude`"""
+        return self.where(LOCATION, "near", (latitude, longitude, km))
+
+    def within(self, south, west, north, east):
+        """Return the query narrowed to the objects located in a box
+
+        Args:
+            south (float): The southern latitude of the box
+            west (float): The western longitude of the box, east of
+                          `east` if the box crosses the antimeridian
+            north (float): The northern latitude of the box
+            east (float): The eastern longitude of the box
+        """
+        return self.where(LOCATION, "within", (south, west, north, east))
+
+    def nearest(self, latitude, longitude, count=None):
+        """Return the query ordered from the object located nearest to
+        `latitude` and `longitude`, the ones with no location last
+
+        No object is nearer than another to a point that isn't a valid
+        location.
+
+        Args:
+            latitude (float): The latitude of the point
+            longitude (float): The longitude of the point
+            count (int): The most objects to yield, or None for every one
+        """
+        query = self.__copy(order=(LOCATION, False, (latitude, longitude)))
+        return query if count is None else query.limit(count)
+
+    def search(self, words, attr=None):
+        """Return the query narrowed to the objects whose text holds
+        every one of `words`, in any case
+
+        Unless the query is ordered, the file storage yields the
+        objects from the best match.
+
+        Args:
+            words (str): The words to search for
+            attr (str): The attribute, or tuple of them, to search in,
+                        or None for the one of `TEXT`
+
+        Raises:
+            ValueError: If `attr` is None and the class has no `TEXT`
+        """
+        if attr is None:
+            if self.cls not in TEXT:
+                raise ValueError(f"No searchable text in {self.cls}")
+            attr = TEXT[self.cls]
+        return self.where(attr, "match", words)
+
+    def limit(self, count):
+        """Return the query yielding no more than `count` objects"""
+        return self.__copy(count=count)
+
+    def offset(self, skip):
+        """Return the query skipping its first `skip` objects"""
+        return self.__copy(skip=skip)
+
+    def matches(self, obj):
+        """Return whether `obj` matches every condition of the query
+
+        Values that can't be compared, such as a str with an int,
+        don't match.
+        """
+        for attr, op, value in self.conditions:
+            try:
+                if not OPERATORS[op](_value(obj, attr), value):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def __iter__(self):
+        """Yield the matching objects, ordered and paged"""
+        objects, ordered = self.select(self.conditions, self.order)
+        objects = (obj for obj in objects if self.matches(obj))
+        if self.order is not None and not ordered:
+            attr, descending, origin = self.order
+            located = geo.located(origin)
+
+            def key(obj):
+                value = _value(obj, attr)
+                if origin is None:
+                    return _sort_key(value)
+                if not located or not geo.located(value):
+                    return math.inf
+                return geo.distance(origin, value)
+            if self.count is None:
+                objects = sorted(objects, key=key, reverse=descending)
+            else:
+                smallest = heapq.nlargest if descending else heapq.nsmallest
+                objects = smallest(self.skip + self.count, objects, key=key)
+        stop = None if self.count is None else self.skip + self.count
+        yield from itertools.islice(objects, self.skip, stop)
@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+
+"""
+
+This module contains the tokenizer of the searchable text of the
+stored objects, which splits it into lowercase words
+
+"""
+
+import re
+import unicodedata
+
+# A word of the text
+WORD = re.compile(r"\w+")
+
+
+def tokens(value):
+    """Return the lowercase words of `value`
+
+    Args:
+        value: A str, or a tuple of them, whose other values have no
+               words
+
+    Returns:
+        The list of the words, in order
+    """
+    if isinstance(value, str):
+        return WORD.findall(unicodedata.normalize("NFKC", value).casefold())
+    if isinstance(value, tuple):
+        return [word for part in value for word in tokens(part)]
+    return []
+
+
+def matches(value, text):
+    """Return whether `value` holds every word of `text`"""
+    return set(tokens(text)) <= set(tokens(value))
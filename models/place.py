@@ -2,7 +2,60 @@
 
 """ A module that defines the Place class"""
 
+import functools
+import models
 from .base_model import BaseModel
+from .review import Review
+
+
+def _changes(method):
+    """Wrap the list `method` so calling it marks the Place changed"""
+    @functools.wraps(method)
+    def change(self, *args, **kwargs):
+        models.storage.remember(self.place)
+        result = method(self, *args, **kwargs)
+        models.storage.touch(self.place, "amenity_ids")
+        return result
+    return change
+
+
+class AmenityIds(list):
+    """
+
+    The list of the Amenity ids of one Place, which marks the Place
+    changed in the storage whenever it's changed in place, so the
+    Place is saved and reindexed like when an attribute is set
+
+    Attributes:
+        place (Place): The Place the list belongs to
+
+    """
+
+    def __init__(self, place, ids=()):
+        """Initialize the list of `place` with `ids`"""
+        super().__init__(ids)
+        self.place = place
+
+    def copy(self):
+        """Return a copy of the list, still belonging to its Place"""
+        return AmenityIds(self.place, self)
+
+    def __reduce__(self):
+        """Pickle the list along with its Place"""
+        return AmenityIds, (self.place, list(self))
+
+    append = _changes(list.append)
+    extend = _changes(list.extend)
+    insert = _changes(list.insert)
+    remove = _changes(list.remove)
+    pop = _changes(list.pop)
+    clear = _changes(list.clear)
+    sort = _changes(list.sort)
+    reverse = _changes(list.reverse)
+    __setitem__ = _changes(list.__setitem__)
+    __delitem__ = _changes(list.__delitem__)
+    __iadd__ = _changes(list.__iadd__)
+    __imul__ = _changes(list.__imul__)
 
 
 class Place(BaseModel):
@@ -21,7 +74,8 @@ class Place(BaseModel):
         price_by_night (int): The price by night
         latitude (float): The latitude
         longitude (float): The longitude
-        amenity_ids (list): The list of Amenity.id
+        amenity_ids (list): The list of Amenity.id, of which every
+                            Place has its own
 
     """
     city_id = ""
@@ -34,4 +88,34 @@ class Place(BaseModel):
     price_by_night = 0
     latitude = 0.0
     longitude = 0.0
-    amenity_ids = []
+    amenity_ids = ()
+
+    def __init__(self, *args, **kwargs):
+        """Initialize a Place with its own list of amenity ids"""
+        super().__init__(*args, **kwargs)
+        if "amenity_ids" not in self.__dict__:
+            self.__dict__["amenity_ids"] = AmenityIds(self)
+
+    @classmethod
+    def from_dict(cls, obj_dict):
+        """Build a Place from a dictionary returned by `to_dict`,
+        giving it its own list of amenity ids"""
+        obj = super().from_dict(obj_dict)
+        ids = obj.__dict__.get("amenity_ids", ())
+        if isinstance(ids, (list, tuple)):
+            obj.__dict__["amenity_ids"] = AmenityIds(obj, ids)
+        return obj
+
+    def __setattr__(self, name, value):
+        """Set an attribute, copying a list of amenity ids into
+        the Place's own"""
+        if (name == "amenity_ids" and isinstance(value, list) and
+                getattr(value, "place", None) is not self):
+            value = AmenityIds(self, value)
+        super().__setattr__(name, value)
+
+    @property
+    def reviews(self):
+        """The list of Review instances of this Place"""
+        return list(
+            models.storage.lookup(Review, "place_id", self.id).values())
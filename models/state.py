@@ -2,7 +2,9 @@
 
 """ A module that defines the State class"""
 
+import models
 from .base_model import BaseModel
+from .city import City
 
 
 class State(BaseModel):
@@ -15,3 +17,8 @@ class State(BaseModel):
 
     """
     name = ""
+
+    @property
+    def cities(self):
+        """The list of City instances of this State"""
+        return list(models.storage.lookup(City, "state_id", self.id).values())
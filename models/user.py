@@ -2,7 +2,10 @@
 
 """ A module that defines the user class"""
 
+import models
 from .base_model import BaseModel
+from .place import Place
+from .review import Review
 
 
 class User(BaseModel):
@@ -21,3 +24,14 @@ class User(BaseModel):
     password = ""
     first_name = ""
     last_name = ""
+
+    @property
+    def places(self):
+        """The list of Place instances owned by this User"""
+        return list(models.storage.lookup(Place, "user_id", self.id).values())
+
+    @property
+    def reviews(self):
+        """The list of Review instances written by this User"""
+        return list(
+            models.storage.lookup(Review, "user_id", self.id).values())
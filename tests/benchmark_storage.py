@@ -0,0 +1,304 @@
+#!/usr/bin/python3
+
+"""
+
+Benchmarks the storage engine at scale
+
+Populates the storage with mixed User, State, City, Amenity, Place
+and Review objects, times save, reload, all, key lookups, the
+rebuild of the indexes, class filtered scans, range, location,
+amenity and text queries, and
+prints the throughput, CPU time and peak memory of each operation
+and the size of the stored files as JSON, so runs can be compared
+with each other:
+
+    $ python3 -m tests.benchmark_storage --sizes 1000 10000 100000
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import models
+from models.engine.file_storage import FileStorage
+from models.user import User
+from models.state import State
+from models.city import City
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+
+
+# The words the review texts are made of
+WORDS = ("quiet", "clean", "cozy", "bright", "spacious", "noisy", "central",
+         "friendly", "host", "view", "beach", "garden", "kitchen", "bed",
+         "comfortable", "small", "modern", "lovely", "place", "stay")
+
+
+def populate(size):
+    """Create `size` related objects and return their keys by class
+
+    Out of every 20 objects 1 is a State, 2 are Users, 2 Amenities,
+    3 Cities, 4 Places and 8 Reviews. Each Place has up to 5 of the
+    first 20 Amenities.
+
+    Args:
+        size (int): The number of objects to create
+    """
+    keys = {}
+    users, states, cities, places = [User()], [State()], [City()], [Place()]
+    amenities = []
+    for i in range(size - 4):
+        slot = i % 20
+        if slot == 0:
+            obj = State()
+            obj.name = f"State {i}"
+            states.append(obj)
+        elif slot < 3:
+            obj = User()
+            obj.email = f"user{i}@hbnb.io"
+            obj.first_name = "Betty"
+            users.append(obj)
+        elif slot < 5:
+            obj = Amenity()
+            obj.name = f"Amenity {i}"
+            amenities.append(obj.id)
+        elif slot < 8:
+            obj = City()
+            obj.state_id = random.choice(states).id
+            obj.name = f"City {i}"
+            cities.append(obj)
+        elif slot < 12:
+            obj = Place()
+            obj.city_id = random.choice(cities).id
+            obj.user_id = random.choice(users).id
+            obj.name = f"Place {i}"
+            obj.price_by_night = random.randint(10, 500)
+            obj.max_guest = random.randint(1, 10)
+            obj.latitude = random.uniform(-90, 90)
+            obj.longitude = random.uniform(-180, 180)
+            obj.amenity_ids = random.sample(
+                amenities[:20], min(len(amenities), random.randint(0, 5)))
+            places.append(obj)
+        else:
+            obj = Review()
+            obj.place_id = random.choice(places).id
+            obj.user_id = random.choice(users).id
+            obj.text = " ".join(random.choices(WORDS, k=12))
+        keys.setdefault(obj.__class__.__name__, []).append(obj.id)
+    for obj in users[:1] + states[:1] + cities[:1] + places[:1]:
+        keys.setdefault(obj.__class__.__name__, []).append(obj.id)
+    return keys
+
+
+def measure(operation, count, memory, reset=None):
+    """Run `operation` and return its timing and memory figures
+
+    Args:
+        operation (callable): The operation to measure
+        count (int): The number of items the operation handles
+        memory (bool): Whether to run it again to trace its peak memory
+        reset (callable): Undoes what the first run left that would
+                          spare the second one work, or None
+    """
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    operation()
+    cpu_seconds = time.process_time() - cpu_start
+    seconds = time.perf_counter() - start
+    result = {"seconds": seconds, "cpu_seconds": cpu_seconds, "items": count,
+              "items_per_second": count / seconds if seconds else None}
+    if memory:
+        if reset is not None:
+            reset()
+        tracemalloc.start()
+        operation()
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def unsave():
+    """Mark every built object unsaved and forget its encoded text, so
+    a save encodes and writes all of them again"""
+    FileStorage._FileStorage__fragments = {}
+    FileStorage._FileStorage__dirty = dict.fromkeys(
+        FileStorage._FileStorage__objects, "update")
+
+
+def run(size, memory=True, lookups=1000):
+    """Benchmark the storage populated with `size` objects, stored in
+    a temporary directory of its own
+
+    Args:
+        size (int): The number of objects to store
+        memory (bool): Whether to trace the peak memory of each operation
+        lookups (int): The number of key lookups to time
+
+    Returns:
+        A dict of the measures of each operation by name
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            return _run(size, memory, lookups)
+        finally:
+            os.chdir(cwd)
+
+
+def _run(size, memory, lookups):
+    """Benchmark the storage populated with `size` objects in the
+    current directory, which must hold no other files"""
+    storage = models.storage
+    FileStorage._FileStorage__objects = {}
+    storage.reload()
+    results = {}
+    start = time.perf_counter()
+    keys = populate(size)
+    seconds = time.perf_counter() - start
+    results["populate"] = {"seconds": seconds, "items": size,
+                           "items_per_second": size / seconds}
+    results["save"] = measure(storage.save, size, memory, unsave)
+    results["save"]["file_bytes"] = sum(
+        os.path.getsize(path) for path in os.listdir())
+    place = storage.get("Place", keys["Place"][0])
+
+    def save_one():
+        place.name = "Updated"
+        place.save()
+    results["save_one"] = measure(save_one, 1, memory)
+    results["reload"] = measure(storage.reload, size, memory)
+    results["all"] = measure(storage.all, size, memory)
+    sample = [random.choice(list(keys.items())) for _ in range(lookups)]
+    sample = [(name, random.choice(ids)) for name, ids in sample]
+
+    def get():
+        for name, id in sample:
+            storage.get(name, id)
+    results["get"] = measure(get, lookups, memory)
+
+    def cold():
+        storage.reload()
+        storage.all()
+    # The first class filtered call after a reload rebuilds the indexes
+    # of every class, so the scans below are timed on warm indexes
+    results["sync"] = measure(lambda: storage.count(Place), size, memory,
+                              cold)
+    places = len(keys["Place"])
+    results["all_class"] = measure(lambda: storage.all(Place), places, memory)
+    results["count_class"] = measure(lambda: storage.count(Place), places,
+                                     memory)
+    city = keys["City"][0]
+    results["lookup"] = measure(
+        lambda: storage.lookup(Place, "city_id", city), 1, memory)
+    emails = [storage.get("User", random.choice(keys["User"])).email
+              for _ in range(lookups)]
+
+    def get_by():
+        for email in emails:
+            storage.get_by(User, email=email)
+    results["get_by"] = measure(get_by, lookups, memory)
+
+    def query_range():
+        return list(storage.query(Place).where("price_by_night", "<", 50)
+                    .where("max_guest", ">=", 8))
+    results["query_range"] = measure(query_range, places, memory)
+
+    def query_near():
+        return list(storage.query(Place).near(40.7, -74.0, 500))
+    results["query_near"] = measure(query_near, places, memory)
+    results["query_nearest"] = measure(
+        lambda: list(storage.query(Place).nearest(40.7, -74.0, 10)), 10,
+        memory)
+
+    amenities = keys["Amenity"][:3]
+    results["query_amenities"] = measure(
+        lambda: list(storage.query(Place).having("amenity_ids", *amenities)),
+        places, memory)
+
+    def search():
+        return list(storage.query(Review).search("quiet beach view")
+                    .limit(10))
+    results["search"] = measure(search, 10, memory)
+
+    def reload_search():
+        storage.reload()
+        return search()
+    results["reload_search"] = measure(reload_search, size, memory)
+    return results
+
+
+def main(argv=None):
+    """Parse the command line, run the benchmarks and print the JSON"""
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the storage engine at scale")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 10000, 100000],
+                        help="the numbers of objects to benchmark with")
+    parser.add_argument("--lookups", type=int, default=1000,
+                        help="the number of key lookups to time")
+    parser.add_argument("--journal", action="store_true",
+                        help="save to the append-only journal")
+    parser.add_argument("--lazy", action="store_true",
+                        help="build the reloaded objects on first use")
+    parser.add_argument("--sharded", action="store_true",
+                        help="store each class in its own file")
+    parser.add_argument("--format", choices=["json", "ndjson", "binary"],
+                        default="json", help="the format of the stored file")
+    parser.add_argument("--compression",
+                        choices=["none", "gzip", "bz2", "lzma", "zlib"],
+                        default="none", help="how the stored files are "
+                        "compressed")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="the number of processes reloading builds "
+                        "the objects in, or 0 for one per CPU")
+    parser.add_argument("--persist-terms", action="store_true",
+                        help="write the text indexes with the snapshots")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="don't trace the peak memory")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="the seed of the generated data")
+    args = parser.parse_args(argv)
+    random.seed(args.seed)
+    options = (FileStorage.journal, FileStorage.lazy, FileStorage.sharded,
+               FileStorage.file_format, FileStorage.compression,
+               FileStorage.workers, FileStorage.persist_terms)
+    FileStorage.journal = args.journal
+    FileStorage.lazy = args.lazy
+    FileStorage.sharded = args.sharded
+    FileStorage.file_format = args.format
+    FileStorage.compression = args.compression
+    FileStorage.workers = args.workers
+    FileStorage.persist_terms = args.persist_terms
+    report = {"python": platform.python_version(),
+              "options": {"journal": args.journal, "lazy": args.lazy,
+                          "sharded": args.sharded, "format": args.format,
+                          "compression": args.compression,
+                          "workers": args.workers,
+                          "persist_terms": args.persist_terms},
+              "runs": []}
+    try:
+        for size in args.sizes:
+            report["runs"].append(
+                {"size": size,
+                 "operations": run(size, args.memory, args.lookups)})
+    finally:
+        (FileStorage.journal, FileStorage.lazy, FileStorage.sharded,
+         FileStorage.file_format, FileStorage.compression,
+         FileStorage.workers, FileStorage.persist_terms) = options
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+
+"""Unittest to smoke test the storage benchmark"""
+
+import json
+import os
+import tempfile
+import unittest
+import models
+from io import StringIO
+from unittest.mock import patch
+from tests import benchmark_storage
+
+
+class TestBenchmarkStorage(unittest.TestCase):
+    """Run the storage benchmark on a tiny dataset"""
+
+    def test_report(self):
+        with patch("sys.stdout", new=StringIO()) as foutput:
+            report = benchmark_storage.main(
+                ["--sizes", "40", "60", "--lookups", "10"])
+        self.assertEqual(report, json.loads(foutput.getvalue()))
+        self.assertEqual([40, 60], [run["size"] for run in report["runs"]])
+        for run in report["runs"]:
+            for name in ("populate", "save", "save_one", "reload", "all",
+                         "get", "sync", "all_class", "count_class",
+                         "lookup", "get_by", "search", "reload_search"):
+                self.assertIn(name, run["operations"])
+            self.assertIn("peak_bytes", run["operations"]["reload"])
+
+    def test_run_keeps_files(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                with open("keep.py", "w") as f:
+                    f.write("")
+                benchmark_storage.run(20, False, 5)
+                self.assertEqual(["keep.py"], os.listdir())
+                self.assertEqual(os.path.realpath(directory),
+                                 os.path.realpath(os.getcwd()))
+            finally:
+                os.chdir(cwd)
+                models.storage.reload()
+
+    def test_modes(self):
+        with patch("sys.stdout", new=StringIO()):
+            report = benchmark_storage.main(
+                ["--sizes", "40", "--journal", "--lazy", "--no-memory"])
+        self.assertEqual({"journal": True, "lazy": True, "sharded": False,
+                          "format": "json", "compression": "none",
+                          "workers": 1, "persist_terms": False},
+                         report["options"])
+        self.assertNotIn("peak_bytes", report["runs"][0]["operations"]["save"])
+
+    def test_sharded(self):
+        with patch("sys.stdout", new=StringIO()):
+            report = benchmark_storage.main(
+                ["--sizes", "40", "--sharded", "--lazy", "--no-memory"])
+        self.assertTrue(report["options"]["sharded"])
+        operations = report["runs"][0]["operations"]
+        self.assertEqual(40, operations["reload"]["items"])
+
+    def test_ndjson(self):
+        with patch("sys.stdout", new=StringIO()):
+            report = benchmark_storage.main(
+                ["--sizes", "40", "--format", "ndjson", "--no-memory"])
+        self.assertEqual("ndjson", report["options"]["format"])
+
+    def test_compression(self):
+        with patch("sys.stdout", new=StringIO()):
+            report = benchmark_storage.main(
+                ["--sizes", "40", "--compression", "gzip", "--no-memory"])
+        self.assertEqual("gzip", report["options"]["compression"])
+        save = report["runs"][0]["operations"]["save"]
+        self.assertIn("cpu_seconds", save)
+        self.assertGreater(save["file_bytes"], 0)
+
+    def test_persist_terms(self):
+        with patch("sys.stdout", new=StringIO()):
+            report = benchmark_storage.main(
+                ["--sizes", "40", "--persist-terms", "--no-memory"])
+        self.assertTrue(report["options"]["persist_terms"])
+        self.assertIn("reload_search", report["runs"][0]["operations"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,6 +10,7 @@ Unittest classes:
     TestHBNBCommand_all
     TestHBNBCommand_destroy
     TestHBNBCommand_update
+    TestHBNBCommand_near
 """
 import os
 import sys
@@ -1438,6 +1439,30 @@ class test_update_command(unittest.TestCase):
         test_dict = storage.all()["Review.{}".format(testId)].__dict__
         self.assertEqual("attr_value", test_dict["attr_name"])
 
+    def test_update_duplicate_email(self):
+        """
+        Test that a user can't be given the email of another user.
+        """
+        ids = []
+        for _ in range(2):
+            with patch("sys.stdout", new=StringIO()) as foutput:
+                HBNBCommand().onecmd("create User")
+                ids.append(foutput.getvalue().strip())
+        email = f"{ids[0]}@hbnb.io"
+        HBNBCommand().onecmd(f"update User {ids[0]} email {email}")
+        correct = "** email already exists **"
+        with patch("sys.stdout", new=StringIO()) as foutput:
+            self.assertFalse(HBNBCommand().onecmd(
+                f"update User {ids[1]} email {email}"))
+            self.assertEqual(correct, foutput.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as foutput:
+            self.assertFalse(HBNBCommand().onecmd(
+                f"User.update({ids[1]}, {{'email': '{email}'}})"))
+            self.assertEqual(correct, foutput.getvalue().strip())
+        self.assertEqual("", storage.all()[f"User.{ids[1]}"].email)
+        HBNBCommand().onecmd(f"update User {ids[0]} email {email}")
+        self.assertEqual(email, storage.all()[f"User.{ids[0]}"].email)
+
     def test_update_valid_dictionary_dot_notation(self):
 
         with patch("sys.stdout", new=StringIO()) as foutput:
@@ -1613,5 +1638,95 @@ class test_count_command(unittest.TestCase):
             self.assertEqual("1", foutput.getvalue().strip())
 
 
+class test_near_command(unittest.TestCase):
+    """Unittests for testing the near, nearest and within commands."""
+
+    def setUp(self):
+        """
+        A method to set up the environment for testing.
+        """
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.ids = []
+        for latitude, longitude in ((37.77, -122.42), (37.80, -122.27),
+                                    (40.71, -74.01)):
+            with patch("sys.stdout", new=StringIO()) as foutput:
+                HBNBCommand().onecmd("create Place")
+            self.ids.append(foutput.getvalue().strip())
+            HBNBCommand().onecmd(f"update Place {self.ids[-1]} latitude "
+                                 f"{latitude}")
+            HBNBCommand().onecmd(f"update Place {self.ids[-1]} longitude "
+                                 f"{longitude}")
+
+    def tearDown(self):
+        """
+        A method to clean up resources after running the tests.
+        """
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def places(self, command):
+        """
+        Return the ids of the places a command prints, in order.
+        """
+        with patch("sys.stdout", new=StringIO()) as foutput:
+            self.assertFalse(HBNBCommand().onecmd(command))
+        output = foutput.getvalue()
+        return sorted((output.index(id), id) for id in self.ids
+                      if id in output)
+
+    def test_near(self):
+        self.assertEqual([self.ids[1], self.ids[0]], [
+            id for _, id in self.places("near 37.80 -122.27 20")])
+        self.assertEqual([], self.places("near 0 0 100"))
+
+    def test_nearest(self):
+        self.assertEqual([self.ids[2], self.ids[1]], [
+            id for _, id in self.places("nearest 40 -75 2")])
+
+    def test_nearest_large_count(self):
+        self.assertEqual([self.ids[2], self.ids[1], self.ids[0]], [
+            id for _, id in self.places("nearest 40 -75 1e30")])
+
+    def test_within(self):
+        self.assertEqual([self.ids[2]], [
+            id for _, id in self.places("within 40 -75 41 -73")])
+
+    def test_missing_argument(self):
+        for command, msg in (("near", "** latitude missing **"),
+                             ("near 1", "** longitude missing **"),
+                             ("near 1 2", "** radius missing **"),
+                             ("nearest 1 2", "** count missing **"),
+                             ("within 1 2 3", "** east missing **")):
+            with patch("sys.stdout", new=StringIO()) as foutput:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual(msg, foutput.getvalue().strip())
+
+    def test_invalid_argument(self):
+        for command, msg in (("near x 1 2", "** invalid latitude **"),
+                             ("within 1 2 3 east", "** invalid east **"),
+                             ("nearest 1 2 1.5", "** invalid count **"),
+                             ("nearest 1 2 -1", "** invalid count **"),
+                             ("nearest 1 2 nan", "** invalid count **"),
+                             ("nearest 1 2 inf", "** invalid count **"),
+                             ("near nan 0 10", "** invalid latitude **"),
+                             ("near 91 0 10", "** invalid latitude **"),
+                             ("nearest 0 -inf 3", "** invalid longitude **"),
+                             ("nearest 0 181 3", "** invalid longitude **"),
+                             ("within 1 2 3 200", "** invalid east **")):
+            with patch("sys.stdout", new=StringIO()) as foutput:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual(msg, foutput.getvalue().strip())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -6,7 +6,10 @@ import unittest
 import os
 from time import sleep
 from datetime import datetime
+import models
+from unittest.mock import patch
 from models.base_model import BaseModel
+from models.user import User
 from models import storage
 
 
@@ -203,5 +206,71 @@ class TestBaseModel_to_dict(unittest.TestCase):
             BaseModel().to_dict("Invalid")
 
 
+class TestBaseModel_registry(unittest.TestCase):
+    """Unittest for the registration of the BaseModel classes"""
+
+    def test_models_registered(self):
+        for name in ("BaseModel", "User", "State", "City",
+                     "Amenity", "Place", "Review"):
+            self.assertIn(name, models.classes)
+            self.assertEqual(name, models.classes[name].__name__)
+
+    def test_subclass_registered(self):
+        class MyModel(BaseModel):
+            pass
+        self.addCleanup(models.classes.pop, "MyModel")
+        self.assertIs(MyModel, models.classes["MyModel"])
+
+    def test_duplicate_name(self):
+        with self.assertRaises(ValueError):
+            class User(BaseModel):
+                pass
+        self.assertEqual("models.user", models.classes["User"].__module__)
+
+
+class TestBaseModel_from_dict(unittest.TestCase):
+    """Unittest for the from_dict method of the BaseModel class"""
+
+    def test_from_dict_round_trip(self):
+        b = BaseModel()
+        b.name = "Holberton"
+        b.updated_at = datetime.now()
+        copy = BaseModel.from_dict(b.to_dict())
+        self.assertIs(type(copy), BaseModel)
+        self.assertIsNot(b, copy)
+        self.assertEqual(b.__dict__, copy.__dict__)
+
+    def test_from_dict_subclass(self):
+        u = User()
+        u.email = "betty@holberton.io"
+        copy = User.from_dict(u.to_dict())
+        self.assertIs(type(copy), User)
+        self.assertEqual("betty@holberton.io", copy.email)
+
+    def test_from_dict_same_timestamps(self):
+        iso_dt = datetime.now().isoformat()
+        b = BaseModel.from_dict({"__class__": "BaseModel", "id": "1",
+                                 "created_at": iso_dt, "updated_at": iso_dt})
+        self.assertEqual(datetime.fromisoformat(iso_dt), b.created_at)
+        self.assertIs(b.created_at, b.updated_at)
+
+    def test_from_dict_not_stored(self):
+        b = BaseModel.from_dict(BaseModel().to_dict())
+        b.id = "12345"
+        self.assertNotIn(b, storage.all().values())
+
+    def test_from_dict_does_not_modify_dict(self):
+        obj_dict = BaseModel().to_dict()
+        expected = dict(obj_dict)
+        BaseModel.from_dict(obj_dict)
+        self.assertEqual(expected, obj_dict)
+
+    def test_from_dict_skips_constructor(self):
+        obj_dict = BaseModel().to_dict()
+        with patch("uuid.uuid4") as mock_uuid:
+            BaseModel.from_dict(obj_dict)
+        mock_uuid.assert_not_called()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -5,6 +5,7 @@
 import unittest
 import os
 from models.city import City
+from models.place import Place
 from models.base_model import BaseModel
 from time import sleep
 from datetime import datetime
@@ -216,5 +217,25 @@ class TestCity_to_dict(unittest.TestCase):
             City().to_dict("Invalid")
 
 
+class TestCity_places(unittest.TestCase):
+    """Unittest for the places relationship of the City class"""
+
+    def test_places(self):
+        c = City()
+        p = Place()
+        p.city_id = c.id
+        Place()
+        self.assertEqual([p], c.places)
+
+    def test_places_after_move(self):
+        c1 = City()
+        c2 = City()
+        p = Place()
+        p.city_id = c1.id
+        p.city_id = c2.id
+        self.assertEqual([], c1.places)
+        self.assertEqual([p], c2.places)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+
+"""Unittest to test the binary snapshot format"""
+
+import unittest
+from datetime import datetime
+from models.engine.binary import MAGIC, encode, iter_records, pack
+
+
+class TestBinary(unittest.TestCase):
+    """Test the pack, encode and iter_records functions"""
+
+    def setUp(self):
+        self.attrs = {
+            "id": "8e5e2c8c-4b46-4a0b-9d5e-1c1bdb7f6d14",
+            "created_at": datetime(2017, 9, 28, 21, 3, 54, 52298),
+            "updated_at": datetime(2017, 9, 28, 21, 3, 54, 52302),
+            "name": "Cabin été", "number_rooms": 3,
+            "latitude": 37.77, "owner": None, "open": True,
+            "amenity_ids": ["a", "b"], "user_id": "not-a-uuid",
+            "big": 2 ** 70}
+
+    def snapshot(self, *records):
+        return b"".join(encode(pack(name, attrs) for name, attrs in records))
+
+    def test_round_trip(self):
+        records = list(iter_records(self.snapshot(("Place", self.attrs))))
+        key = f"Place.{self.attrs['id']}"
+        self.assertEqual([(key, dict(self.attrs, __class__="Place"))],
+                         records)
+        self.assertEqual(list(self.attrs) + ["__class__"],
+                         list(records[0][1]))
+
+    def test_iso_timestamps(self):
+        obj_dict = dict(self.attrs, __class__="Place",
+                        created_at=self.attrs["created_at"].isoformat(),
+                        updated_at=self.attrs["updated_at"].isoformat())
+        buffer = self.snapshot(("Place", obj_dict))
+        self.assertEqual(obj_dict,
+                         next(iter_records(buffer, datetimes=False))[1])
+        self.assertEqual(self.attrs["created_at"],
+                         next(iter_records(buffer))[1]["created_at"])
+
+    def test_shapes_shared(self):
+        other = dict(self.attrs, id="1", name="House")
+        one = self.snapshot(("Place", self.attrs))
+        two = self.snapshot(("Place", self.attrs), ("Place", other))
+        self.assertLess(len(two) - len(one), len(one) - len(MAGIC))
+        self.assertEqual(["Place." + self.attrs["id"], "Place.1"],
+                         [key for key, obj_dict in iter_records(two)])
+
+    def test_uuid_packed(self):
+        small = dict(self.attrs)
+        small["id"] = small["id"].upper()
+        self.assertLess(len(self.snapshot(("Place", self.attrs))),
+                        len(self.snapshot(("Place", small))))
+        obj_dict = next(iter_records(self.snapshot(("Place", small))))[1]
+        self.assertEqual(small["id"], obj_dict["id"])
+
+    def test_empty(self):
+        self.assertEqual([], list(iter_records(self.snapshot())))
+
+    def test_invalid(self):
+        buffer = self.snapshot(("Place", self.attrs))
+        for invalid in (b"", b"{}", buffer[:-1], buffer[:-6], buffer + b"0"):
+            with self.assertRaises(ValueError):
+                list(iter_records(invalid))
+
+
+if __name__ == "__main__":
+    unittest.main()
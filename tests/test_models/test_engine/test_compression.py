@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+
+"""Unittest to test the compression of the storage files"""
+
+import io
+import unittest
+from models.engine.compression import EXTENSIONS, method_of, wrap
+
+
+class TestCompression(unittest.TestCase):
+    """Test the method_of and wrap functions"""
+
+    def compress(self, method, *parts):
+        f = io.BytesIO()
+        for part in parts:
+            with wrap(f, method, "wb") as stream:
+                stream.write(part)
+        return f.getvalue()
+
+    def decompress(self, method, data):
+        with wrap(io.BytesIO(data), method, "rb") as stream:
+            return stream.read()
+
+    def test_method_of(self):
+        self.assertEqual("gzip", method_of("file.json.gz"))
+        self.assertEqual("lzma", method_of("file.json.xz"))
+        self.assertIsNone(method_of("file.json"))
+        self.assertEqual("bz2", method_of("file.json", "bz2"))
+        self.assertIsNone(method_of("file.json.gz", "none"))
+        with self.assertRaises(ValueError):
+            method_of("file.json", "zip")
+
+    def test_round_trip(self):
+        data = b'{"User.1": {"id": "1"}}' * 100
+        for method in EXTENSIONS:
+            with self.subTest(method=method):
+                compressed = self.compress(method, data)
+                self.assertLess(len(compressed), len(data))
+                self.assertEqual(data, self.decompress(method, compressed))
+
+    def test_appended_streams(self):
+        for method in EXTENSIONS:
+            with self.subTest(method=method):
+                compressed = self.compress(method, b"one\n", b"two\n")
+                self.assertEqual(b"one\ntwo\n",
+                                 self.decompress(method, compressed))
+
+    def test_leaves_file_open(self):
+        f = io.BytesIO()
+        with wrap(f, "zlib", "wb") as stream:
+            stream.write(b"data")
+        self.assertFalse(f.closed)
+
+    def test_truncated(self):
+        for method in EXTENSIONS:
+            with self.subTest(method=method):
+                compressed = self.compress(method, b"data" * 100)
+                with self.assertRaises(EOFError):
+                    self.decompress(method, compressed[:-4])
+
+
+if __name__ == "__main__":
+    unittest.main()
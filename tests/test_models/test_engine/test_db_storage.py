@@ -0,0 +1,248 @@
+#!/usr/bin/python3
+
+"""Unittest to test the DBStorage class"""
+
+import os
+import sqlite3
+import unittest
+import models
+from unittest.mock import patch
+from models.engine.db_storage import DBStorage
+from models.base_model import BaseModel
+from models.user import User
+from models.state import State
+from models.city import City
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+
+
+class TestDBStorage(unittest.TestCase):
+    """Test the methods of the DBStorage class"""
+
+    def setUp(self):
+        env = patch.dict(os.environ, {"HBNB_DB_PATH": "test_hbnb.db"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.storage = DBStorage()
+        storage = patch("models.storage", self.storage)
+        storage.start()
+        self.addCleanup(storage.stop)
+
+    def tearDown(self):
+        self.storage.close()
+        try:
+            os.remove("test_hbnb.db")
+        except FileNotFoundError:
+            pass
+
+    def reopen(self):
+        self.storage.close()
+        self.storage = DBStorage()
+        self.storage.reload()
+        return self.storage
+
+    def test_init_one_arg(self):
+        with self.assertRaises(TypeError):
+            DBStorage("Invalid way")
+
+    def test_one_table_per_class(self):
+        with sqlite3.connect("test_hbnb.db") as connection:
+            tables = {row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for name in ("BaseModel", "User", "State", "City",
+                     "Amenity", "Place", "Review"):
+            self.assertIn(name, tables)
+
+    def test_class_defined_later(self):
+        class Gadget(BaseModel):
+            pass
+        self.addCleanup(models.classes.pop, "Gadget")
+        self.assertEqual({}, self.storage.all(Gadget))
+        g = Gadget()
+        self.storage.save()
+        self.assertIsNone(self.storage.get("Gadget", "missing"))
+        self.assertEqual(g.to_dict(),
+                         self.reopen().get("Gadget", g.id).to_dict())
+
+    def test_all(self):
+        self.assertIs(type(self.storage.all()), dict)
+
+    def test_new(self):
+        u = User()
+        self.assertIn(f"User.{u.id}", self.storage.all())
+        self.assertIs(u, self.storage.all()[f"User.{u.id}"])
+
+    def test_save_reload(self):
+        objs = [BaseModel(), User(), State(), City(),
+                Amenity(), Place(), Review()]
+        self.storage.save()
+        objects = self.reopen().all()
+        for obj in objs:
+            key = f"{obj.__class__.__name__}.{obj.id}"
+            self.assertIn(key, objects)
+            self.assertEqual(obj.to_dict(), objects[key].to_dict())
+
+    def test_save_update(self):
+        p = Place()
+        p.save()
+        p.name = "Home"
+        p.price_by_night = 80
+        p.save()
+        reloaded = self.reopen().all()[f"Place.{p.id}"]
+        self.assertEqual("Home", reloaded.name)
+        self.assertEqual(80, reloaded.price_by_night)
+
+    def test_delete(self):
+        s = State()
+        s.save()
+        self.storage.delete(s)
+        self.assertNotIn(f"State.{s.id}", self.storage.all())
+        self.storage.save()
+        self.assertNotIn(f"State.{s.id}", self.reopen().all())
+
+    def test_delete_none(self):
+        State()
+        self.storage.delete(None)
+        self.assertEqual(1, len(self.storage.all()))
+
+    def test_all_cls(self):
+        u = User()
+        p = Place()
+        self.assertEqual({f"User.{u.id}": u}, self.storage.all(User))
+        self.assertEqual({f"Place.{p.id}": p}, self.storage.all("Place"))
+        self.assertEqual({}, self.storage.all("MyModel"))
+
+    def test_reload_loads_nothing(self):
+        User().save()
+        storage = self.reopen()
+        self.assertEqual({}, storage._DBStorage__objects)
+        self.assertEqual(1, storage.count())
+
+    def test_all_cls_loads_table(self):
+        u = User()
+        p = Place()
+        p.save()
+        storage = self.reopen()
+        self.assertEqual([f"User.{u.id}"], list(storage.all(User)))
+        self.assertEqual([f"User.{u.id}"], list(storage._DBStorage__objects))
+        self.assertEqual({f"User.{u.id}", f"Place.{p.id}"},
+                         set(storage.all()))
+
+    def test_all_cls_keeps_loaded_rows(self):
+        users = [User(), User()]
+        self.storage.save()
+        storage = self.reopen()
+        got = storage.get("User", users[0].id)
+        got.first_name = "Betty"
+        objects = storage.all(User)
+        self.assertIs(got, objects[f"User.{users[0].id}"])
+        self.assertIn(f"User.{users[1].id}", objects)
+
+    def test_count(self):
+        User()
+        User().save()
+        State()
+        self.assertEqual(3, self.storage.count())
+        self.assertEqual(2, self.storage.count(User))
+        self.assertEqual(0, self.storage.count("City"))
+
+    def test_get_loads_single_row(self):
+        u = User()
+        u.save()
+        State().save()
+        storage = self.reopen()
+        got = storage.get("User", u.id)
+        self.assertEqual(u.id, got.id)
+        self.assertEqual([f"User.{u.id}"], list(storage._DBStorage__objects))
+
+    def test_get_missing(self):
+        self.assertIsNone(self.storage.get("User", "1"))
+        self.assertIsNone(self.storage.get("MyModel", "1"))
+
+    def test_query(self):
+        places = [Place(), Place(), Place()]
+        for price, place in zip((80, 120, 200), places):
+            place.price_by_night = price
+        self.storage.save()
+        query = self.storage.query(Place).where("price_by_night", ">", 100)
+        self.assertEqual([places[2], places[1]],
+                         list(query.order_by("price_by_night", True)))
+
+    def test_unique_email(self):
+        users = [User(), User()]
+        users[0].email = "betty@hbnb.io"
+        self.storage.save()
+        with self.assertRaises(ValueError):
+            users[1].email = "betty@hbnb.io"
+        self.assertEqual("", users[1].email)
+        users[1].email = "holberton@hbnb.io"
+        self.assertEqual(users[0].id, self.storage.get_by(
+            User, email="betty@hbnb.io").id)
+        self.assertIsNone(self.storage.get_by(User, email="x@hbnb.io"))
+        User(email="betty@hbnb.io").email = "holberton@hbnb.io"
+        with self.assertRaises(ValueError):
+            self.storage.new(User(email="betty@hbnb.io"))
+
+    def test_batch(self):
+        with patch.object(DBStorage, "save",
+                          wraps=self.storage.save) as save:
+            with self.storage.batch():
+                users = [User(), User()]
+                for user in users:
+                    user.first_name = "Betty"
+                    user.save()
+                with sqlite3.connect("test_hbnb.db") as connection:
+                    self.assertEqual([], list(connection.execute(
+                        'SELECT id FROM "User"')))
+        self.assertEqual(3, save.call_count)
+        self.assertEqual(["Betty", "Betty"], [
+            self.reopen().get("User", user.id).first_name
+            for user in users])
+
+    def test_batch_rollback(self):
+        s = State()
+        s.name = "California"
+        p = Place()
+        p.amenity_ids.append("wifi")
+        self.storage.save()
+        with self.assertRaises(ValueError):
+            with self.storage.batch():
+                s.name = "Nevada"
+                p.amenity_ids.append("pool")
+                u = User()
+                self.storage.delete(p)
+                u.save()
+                raise ValueError("cancel")
+        self.assertEqual("California", s.name)
+        self.assertEqual(["wifi"], p.amenity_ids)
+        self.assertIs(p, self.storage.get("Place", p.id))
+        self.assertIsNone(self.storage.get("User", u.id))
+        self.storage.save()
+        self.assertEqual("California",
+                         self.reopen().get("State", s.id).name)
+        self.assertEqual({f"Place.{p.id}"}, set(self.storage.all(Place)))
+
+    def test_query_search(self):
+        reviews = [Review(), Review()]
+        reviews[0].text = "Clean and quiet"
+        reviews[1].text = "Noisy"
+        self.storage.save()
+        self.assertEqual([reviews[0]], list(
+            self.storage.query(Review).search("QUIET clean")))
+
+    def test_query_having(self):
+        places = [Place(), Place()]
+        places[0].amenity_ids.append("wifi")
+        places[1].amenity_ids = ["wifi", "pool"]
+        self.storage.save()
+        self.storage.reload()
+        self.assertEqual([places[1].id], [
+            place.id for place in self.storage.query(Place).having(
+                "amenity_ids", "pool", "wifi")])
+        self.assertEqual(2, len(list(
+            self.storage.query(Place).having("amenity_ids", "wifi"))))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,10 +2,20 @@
 
 """Unittest to test the FileStorage class"""
 
+import glob
+import json
+import math
 import unittest
 import models
 import os
+import subprocess
+import sys
+from datetime import datetime
+from time import sleep
+from unittest.mock import patch
+from models.engine import parallel, text
 from models.engine.file_storage import FileStorage
+from models.engine.indexes import TextIndex
 from models.base_model import BaseModel
 from models.user import User
 from models.state import State
@@ -58,6 +68,7 @@ class TestFileStorage_methods(unittest.TestCase):
             os.rename("file.json", "tmp.json")
         except FileNotFoundError:
             pass
+        FileStorage._FileStorage__objects = {}
 
     def tearDown(self):
         try:
@@ -73,9 +84,106 @@ class TestFileStorage_methods(unittest.TestCase):
     def test_all_no_args(self):
         self.assertIs(type(models.storage.all()), dict)
 
-    def test_all_one_arg(self):
+    def test_all_two_args(self):
         with self.assertRaises(TypeError):
-            models.storage.all("Invalid way")
+            models.storage.all(User, "Invalid way")
+
+    def test_all_unknown_class(self):
+        User()
+        self.assertEqual({}, models.storage.all("Invalid way"))
+
+    def test_all_cls(self):
+        u1 = User()
+        u2 = User()
+        p = Place()
+        for cls in (User, "User"):
+            users = models.storage.all(cls)
+            self.assertEqual({f"User.{u1.id}": u1, f"User.{u2.id}": u2},
+                             users)
+        self.assertEqual({f"Place.{p.id}": p}, models.storage.all(Place))
+        self.assertEqual({}, models.storage.all(Review))
+
+    def test_all_cls_after_delete(self):
+        u = User()
+        models.storage.delete(u)
+        self.assertEqual({}, models.storage.all(User))
+
+    def test_all_cls_after_reload(self):
+        u = User()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn(f"User.{u.id}", models.storage.all(User))
+
+    def test_count(self):
+        User()
+        User()
+        s = State()
+        self.assertEqual(3, models.storage.count())
+        self.assertEqual(2, models.storage.count(User))
+        self.assertEqual(1, models.storage.count("State"))
+        self.assertEqual(0, models.storage.count(City))
+        models.storage.delete(s)
+        self.assertEqual(0, models.storage.count(State))
+
+    def test_lookup(self):
+        s = State()
+        c1 = City()
+        c1.state_id = s.id
+        c2 = City()
+        c2.state_id = s.id
+        City().state_id = "other"
+        self.assertEqual({f"City.{c1.id}": c1, f"City.{c2.id}": c2},
+                         models.storage.lookup(City, "state_id", s.id))
+
+    def test_lookup_follows_updates(self):
+        r = Review()
+        r.place_id = "p1"
+        r.place_id = "p2"
+        self.assertEqual({}, models.storage.lookup(Review, "place_id", "p1"))
+        self.assertIn(f"Review.{r.id}",
+                      models.storage.lookup("Review", "place_id", "p2"))
+        models.storage.delete(r)
+        self.assertEqual({}, models.storage.lookup(Review, "place_id", "p2"))
+
+    def test_lookup_ignores_copies(self):
+        r = Review()
+        r.place_id = "p1"
+        copy = Review(**r.to_dict())
+        copy.place_id = "p2"
+        self.assertEqual({f"Review.{r.id}": r},
+                         models.storage.lookup(Review, "place_id", "p1"))
+        self.assertEqual({}, models.storage.lookup(Review, "place_id", "p2"))
+
+    def test_touch_reindexes_assigned_attribute(self):
+        p = Place()
+        p.city_id = "c1"
+        with patch.object(TextIndex, "add") as add:
+            p.price_by_night = 100
+        add.assert_not_called()
+        self.assertIn(f"Place.{p.id}",
+                      models.storage.lookup(Place, "city_id", "c1"))
+
+    def test_lookup_after_reload(self):
+        p = Place()
+        p.user_id = "u1"
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn(f"Place.{p.id}",
+                      models.storage.lookup(Place, "user_id", "u1"))
+
+    def test_lookup_not_indexed(self):
+        u = User()
+        u.first_name = "Betty"
+        User()
+        self.assertEqual({f"User.{u.id}": u},
+                         models.storage.lookup(User, "first_name", "Betty"))
+
+    def test_count_after_objects_replaced(self):
+        User()
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(0, models.storage.count(User))
 
     def test_new_no_args(self):
         with self.assertRaises(TypeError):
@@ -175,10 +283,1760 @@ class TestFileStorage_methods(unittest.TestCase):
         self.assertIn(f"Place.{p.id}", objects.keys())
         self.assertIn(f"Review.{r.id}", objects.keys())
 
+    def test_reload_without_eval(self):
+        u = User()
+        models.storage.save()
+        with patch("builtins.eval") as mock_eval:
+            models.storage.reload()
+            self.assertIsInstance(models.storage.all()[f"User.{u.id}"], User)
+        mock_eval.assert_not_called()
+
+    def test_reload_streams(self):
+        u = User()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        with patch("json.load") as mock_load:
+            models.storage.reload()
+        mock_load.assert_not_called()
+        self.assertIsInstance(models.storage.get("User", u.id), User)
+        self.assertEqual({}, FileStorage._FileStorage__raw)
+
     def test_reload_one_args(self):
         with self.assertRaises(TypeError):
             models.storage.reload("Invalid")
 
 
+class TestFileStorage_journal(unittest.TestCase):
+    """Test the append-only journal mode of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage.journal = True
+        models.storage.compact()
+
+    def tearDown(self):
+        FileStorage.journal = False
+        for path in ("file.json", "file.json.journal"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def read_journal(self):
+        with open("file.json.journal", "r", encoding="UTF8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_reload_without_snapshot_drops_unsaved(self):
+        os.remove("file.json")
+        saved = User()
+        models.storage.save()
+        unsaved = User()
+        models.storage.reload()
+        self.assertIn(f"User.{saved.id}", models.storage.all())
+        self.assertNotIn(f"User.{unsaved.id}", models.storage.all())
+        FileStorage.file_format = "ndjson"
+        try:
+            unsaved = User()
+            models.storage.reload()
+            self.assertNotIn(f"User.{unsaved.id}", models.storage.all())
+        finally:
+            FileStorage.file_format = "json"
+
+    def test_save_appends_create(self):
+        u = User()
+        models.storage.save()
+        records = self.read_journal()
+        self.assertEqual(1, len(records))
+        self.assertEqual("create", records[0]["op"])
+        self.assertEqual(f"User.{u.id}", records[0]["key"])
+        self.assertEqual(u.to_dict(), records[0]["obj"])
+
+    def test_save_does_not_rewrite_snapshot(self):
+        with open("file.json", "r", encoding="UTF8") as f:
+            snapshot = f.read()
+        User().save()
+        with open("file.json", "r", encoding="UTF8") as f:
+            self.assertEqual(snapshot, f.read())
+
+    def test_save_appends_only_changes(self):
+        u = User()
+        p = Place()
+        models.storage.save()
+        p.name = "Home"
+        p.save()
+        records = self.read_journal()
+        self.assertEqual(3, len(records))
+        self.assertEqual("update", records[2]["op"])
+        self.assertEqual(f"Place.{p.id}", records[2]["key"])
+        self.assertEqual("Home", records[2]["obj"]["name"])
+
+    def test_delete_appends_delete(self):
+        s = State()
+        models.storage.save()
+        models.storage.delete(s)
+        models.storage.save()
+        records = self.read_journal()
+        self.assertEqual("delete", records[-1]["op"])
+        self.assertNotIn("obj", records[-1])
+
+    def test_delete_before_save_not_journaled(self):
+        s = State()
+        models.storage.delete(s)
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.json.journal"))
+
+    def test_reload_replays_journal(self):
+        u = User()
+        c = City()
+        models.storage.save()
+        u.first_name = "Betty"
+        u.save()
+        models.storage.delete(c)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objects = models.storage.all()
+        self.assertIn(f"User.{u.id}", objects)
+        self.assertEqual("Betty", objects[f"User.{u.id}"].first_name)
+        self.assertNotIn(f"City.{c.id}", objects)
+
+    def test_reload_drops_torn_record(self):
+        u = User()
+        models.storage.save()
+        with open("file.json.journal", "a", encoding="UTF8") as f:
+            f.write('{"op": "create", "key": "User.1", "ob')
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn(f"User.{u.id}", models.storage.all())
+        self.assertNotIn("User.1", models.storage.all())
+        self.assertEqual(1, len(self.read_journal()))
+
+    def test_compact(self):
+        u = User()
+        models.storage.save()
+        models.storage.compact()
+        self.assertFalse(os.path.exists("file.json.journal"))
+        with open("file.json", "r", encoding="UTF8") as f:
+            self.assertIn(f"User.{u.id}", f.read())
+
+    def test_save_compacts_past_limit(self):
+        limit = FileStorage.journal_limit
+        FileStorage.journal_limit = 2
+        try:
+            for _ in range(3):
+                User().save()
+        finally:
+            FileStorage.journal_limit = limit
+        self.assertFalse(os.path.exists("file.json.journal"))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(3, len(models.storage.all()))
+
+
+class TestFileStorage_dirty(unittest.TestCase):
+    """Test that FileStorage only encodes the objects that changed"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_save_encodes_only_dirty(self):
+        u = User()
+        p = Place()
+        models.storage.save()
+        with patch.object(User, "to_dict", wraps=u.to_dict) as u_dict, \
+                patch.object(Place, "to_dict", wraps=p.to_dict) as p_dict:
+            p.name = "Home"
+            models.storage.save()
+        u_dict.assert_not_called()
+        p_dict.assert_called_once()
+
+    def test_attribute_assignment_marks_dirty(self):
+        u = User()
+        models.storage.save()
+        u.email = "betty@holberton.io"
+        models.storage.save()
+        with open("file.json", "r", encoding="UTF8") as f:
+            self.assertEqual(u.to_dict(), json.load(f)[f"User.{u.id}"])
+
+    def test_unstored_assignment_unlocked(self):
+        u = User()
+        models.storage.save()
+        copy = User(**u.to_dict())
+        with patch("models.engine.file_storage._lock") as lock:
+            copy.first_name = "Betty"
+            User(**u.to_dict()).last_name = "Holberton"
+        lock.__enter__.assert_not_called()
+        self.assertNotIn(f"User.{u.id}", FileStorage._FileStorage__dirty)
+
+    def test_assignment_indexed_on_use(self):
+        p = Place()
+        p.city_id = "c1"
+        p.name = "Home"
+        self.assertIn(f"Place.{p.id}", FileStorage._FileStorage__unindexed)
+        with patch.object(TextIndex, "add") as add:
+            self.assertEqual([f"Place.{p.id}"], list(
+                models.storage.lookup(Place, "city_id", "c1")))
+        add.assert_called_once()
+        self.assertEqual({}, FileStorage._FileStorage__unindexed)
+        p.city_id = "c2"
+        with patch.object(TextIndex, "add") as add:
+            self.assertEqual([f"Place.{p.id}"], list(
+                models.storage.lookup(Place, "city_id", "c2")))
+        add.assert_not_called()
+
+    def test_save_output_is_json(self):
+        b = BaseModel()
+        s = State()
+        models.storage.save()
+        s.name = "California"
+        models.storage.save()
+        with open("file.json", "r", encoding="UTF8") as f:
+            objects = json.load(f)
+        self.assertEqual(b.to_dict(), objects[f"BaseModel.{b.id}"])
+        self.assertEqual(s.to_dict(), objects[f"State.{s.id}"])
+
+    def test_replaced_object_is_encoded(self):
+        u = User()
+        models.storage.save()
+        other = User(**u.to_dict())
+        other.__dict__["first_name"] = "Holberton"
+        models.storage.all()[f"User.{u.id}"] = other
+        models.storage.save()
+        with open("file.json", "r", encoding="UTF8") as f:
+            objects = json.load(f)
+        self.assertEqual("Holberton", objects[f"User.{u.id}"]["first_name"])
+
+
+class TestFileStorage_lazy(unittest.TestCase):
+    """Test the lazy reload mode of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.u = User()
+        self.p = Place()
+        self.r = Review()
+        models.storage.save()
+        FileStorage.lazy = True
+        models.storage.reload()
+
+    def tearDown(self):
+        FileStorage.lazy = False
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__raw = {}
+
+    def test_reload_reads_nothing(self):
+        self.assertFalse(FileStorage._FileStorage__loaded)
+        self.assertEqual({}, FileStorage._FileStorage__raw)
+
+    def test_get_builds_one(self):
+        u = models.storage.get("User", self.u.id)
+        self.assertIsInstance(u, User)
+        self.assertEqual(self.u.to_dict(), u.to_dict())
+        self.assertEqual([f"User.{u.id}"],
+                         list(FileStorage._FileStorage__objects))
+        self.assertEqual(2, len(FileStorage._FileStorage__raw))
+
+    def test_get_missing(self):
+        self.assertIsNone(models.storage.get("User", "1"))
+        self.assertIsNone(models.storage.get("MyModel", self.u.id))
+
+    def test_all_builds_every_object(self):
+        objects = models.storage.all()
+        self.assertEqual(3, len(objects))
+        self.assertIsInstance(objects[f"Review.{self.r.id}"], Review)
+        self.assertEqual({}, FileStorage._FileStorage__raw)
+
+    def test_save_encodes_unbuilt_objects_once(self):
+        p = models.storage.get("Place", self.p.id)
+        p.save()
+        with patch("json.dumps", wraps=json.dumps) as dumps:
+            p.name = "Home"
+            p.save()
+        encoded = [args[0] for args, kwargs in dumps.call_args_list
+                   if isinstance(args[0], dict)]
+        self.assertEqual([p.to_dict()], encoded)
+        self.assertEqual(2, len(FileStorage._FileStorage__raw))
+
+    def test_save_keeps_unbuilt_objects(self):
+        p = models.storage.get("Place", self.p.id)
+        p.name = "Home"
+        p.save()
+        self.assertEqual(2, len(FileStorage._FileStorage__raw))
+        with open("file.json", "r", encoding="UTF8") as f:
+            objects = json.load(f)
+        self.assertEqual(3, len(objects))
+        self.assertEqual("Home", objects[f"Place.{self.p.id}"]["name"])
+
+    def test_new_after_reload(self):
+        s = State()
+        self.assertEqual(4, len(models.storage.all()))
+        self.assertIn(f"State.{s.id}", models.storage.all())
+
+    def test_journal_replayed_lazily(self):
+        FileStorage.journal = True
+        try:
+            p = models.storage.get("Place", self.p.id)
+            p.name = "Home"
+            p.save()
+            models.storage.reload()
+            self.assertEqual("Home",
+                             models.storage.get("Place", self.p.id).name)
+        finally:
+            FileStorage.journal = False
+            models.storage.compact()
+
+
+class TestFileStorage_durability(unittest.TestCase):
+    """Test the atomic saves of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        FileStorage.durability = "none"
+        FileStorage.journal = False
+        for path in ("file.json", "file.json.journal"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_save_leaves_no_temporary_file(self):
+        User().save()
+        self.assertTrue(os.path.exists("file.json"))
+        self.assertFalse(os.path.exists("file.json.tmp"))
+
+    def test_interrupted_save_keeps_snapshot(self):
+        u = User()
+        models.storage.save()
+        with open("file.json", "r", encoding="UTF8") as f:
+            snapshot = f.read()
+        p = Place()
+        with patch.object(Place, "to_dict", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                models.storage.save()
+        with open("file.json", "r", encoding="UTF8") as f:
+            self.assertEqual(snapshot, f.read())
+        self.assertFalse(os.path.exists("file.json.tmp"))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn(f"User.{u.id}", models.storage.all())
+        self.assertNotIn(f"Place.{p.id}", models.storage.all())
+
+    def test_durability_none(self):
+        User()
+        with patch("os.fsync") as mock_fsync:
+            models.storage.save()
+        mock_fsync.assert_not_called()
+
+    def test_durability_file(self):
+        FileStorage.durability = "file"
+        User()
+        with patch("os.fsync") as mock_fsync:
+            models.storage.save()
+        self.assertEqual(1, mock_fsync.call_count)
+
+    def test_durability_dir(self):
+        FileStorage.durability = "dir"
+        User()
+        with patch("os.fsync") as mock_fsync:
+            models.storage.save()
+        self.assertEqual(2, mock_fsync.call_count)
+
+    def test_durability_journal(self):
+        FileStorage.journal = True
+        FileStorage.durability = "file"
+        User()
+        with patch("os.fsync") as mock_fsync:
+            models.storage.save()
+        self.assertEqual(1, mock_fsync.call_count)
+
+    def test_durability_unknown(self):
+        FileStorage.durability = "always"
+        with self.assertRaises(ValueError):
+            models.storage.save()
+
+
+class TestFileStorage_write_behind(unittest.TestCase):
+    """Test the write-behind mode of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage.write_behind = True
+        FileStorage.flush_interval = 60
+
+    def tearDown(self):
+        FileStorage.write_behind = False
+        FileStorage.flush_interval = 1
+        FileStorage.flush_batch = 1000
+        FileStorage._FileStorage__wake.set()
+        flusher = FileStorage._FileStorage__flusher
+        if flusher is not None:
+            flusher.join(5)
+        FileStorage._FileStorage__unflushed = False
+        FileStorage._FileStorage__flush_error = None
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def wait_for_file(self):
+        for _ in range(500):
+            if os.path.exists("file.json"):
+                return True
+            sleep(0.01)
+        return False
+
+    def test_save_returns_before_writing(self):
+        User().save()
+        self.assertFalse(os.path.exists("file.json"))
+        self.assertTrue(FileStorage._FileStorage__flusher.is_alive())
+
+    def test_flush(self):
+        u = User()
+        u.save()
+        models.storage.flush()
+        with open("file.json", "r", encoding="UTF8") as f:
+            self.assertIn(f"User.{u.id}", f.read())
+
+    def test_reload_flushes_saves(self):
+        for journal in (False, True):
+            FileStorage.journal = journal
+            u = User()
+            u.save()
+            u.first_name = "Bob"
+            u.save()
+            try:
+                models.storage.reload()
+            finally:
+                FileStorage.journal = False
+            self.assertEqual(
+                "Bob", models.storage.get("User", u.id).first_name)
+            self.assertFalse(FileStorage._FileStorage__unflushed)
+            models.storage.compact()
+            models.storage.reload()
+            self.assertEqual(
+                "Bob", models.storage.get("User", u.id).first_name)
+
+    def test_flush_coalesces_saves(self):
+        objs = [User() for _ in range(5)]
+        for obj in objs:
+            obj.save()
+        with patch("os.replace", wraps=os.replace) as mock_replace:
+            models.storage.flush()
+            models.storage.flush()
+        self.assertEqual(1, mock_replace.call_count)
+
+    def test_flush_after_interval(self):
+        FileStorage.flush_interval = 0.01
+        User().save()
+        self.assertTrue(self.wait_for_file())
+
+    def test_flush_after_batch(self):
+        FileStorage.flush_batch = 3
+        User().save()
+        User().save()
+        self.assertFalse(os.path.exists("file.json"))
+        User().save()
+        self.assertTrue(self.wait_for_file())
+
+    def test_flush_error_raised_on_save(self):
+        FileStorage.flush_interval = 0.01
+        with patch.object(FileStorage, "_FileStorage__write",
+                          side_effect=OSError("disk full")):
+            User().save()
+            for _ in range(500):
+                if FileStorage._FileStorage__flush_error is not None:
+                    break
+                sleep(0.01)
+        with self.assertRaises(OSError):
+            User().save()
+
+    def test_flush_registered_at_exit(self):
+        FileStorage._FileStorage__flusher = None
+        with patch("atexit.register") as mock_register:
+            User().save()
+        mock_register.assert_called_once_with(models.storage.flush)
+
+
+class TestFileStorage_batch(unittest.TestCase):
+    """Test the batch context manager of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.p = Place()
+        self.p.name = "Home"
+        models.storage.save()
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_batch_writes_once(self):
+        with patch("os.replace", wraps=os.replace) as mock_replace:
+            with models.storage.batch():
+                for _ in range(3):
+                    r = Review()
+                    r.place_id = self.p.id
+                    r.save()
+                self.p.save()
+                mock_replace.assert_not_called()
+        self.assertEqual(1, mock_replace.call_count)
+        with open("file.json", "r", encoding="UTF8") as f:
+            self.assertEqual(4, len(json.load(f)))
+
+    def test_batch_writes_changes_without_save(self):
+        with models.storage.batch():
+            self.p.name = "Cabin"
+        with open("file.json", "r", encoding="UTF8") as f:
+            objects = json.load(f)
+        self.assertEqual("Cabin", objects[f"Place.{self.p.id}"]["name"])
+
+    def test_batch_without_changes_does_not_write(self):
+        with patch("os.replace") as mock_replace:
+            with models.storage.batch():
+                models.storage.all()
+        mock_replace.assert_not_called()
+
+    def test_nested_batch(self):
+        with patch("os.replace", wraps=os.replace) as mock_replace:
+            with models.storage.batch():
+                with models.storage.batch():
+                    User().save()
+                mock_replace.assert_not_called()
+                User().save()
+        self.assertEqual(1, mock_replace.call_count)
+
+    def test_batch_rollback(self):
+        u = User()
+        u.save()
+        with self.assertRaises(ValueError):
+            with models.storage.batch():
+                r = Review()
+                r.place_id = self.p.id
+                self.p.name = "Cabin"
+                self.p.max_guest = 4
+                models.storage.delete(u)
+                models.storage.save()
+                raise ValueError("cancel")
+        objects = models.storage.all()
+        self.assertNotIn(f"Review.{r.id}", objects)
+        self.assertIs(u, objects[f"User.{u.id}"])
+        self.assertIs(self.p, objects[f"Place.{self.p.id}"])
+        self.assertEqual("Home", self.p.name)
+        self.assertNotIn("max_guest", self.p.__dict__)
+        self.assertEqual([], self.p.reviews)
+        self.assertEqual(1, models.storage.count(User))
+
+    def test_batch_rollback_reindexes_changes(self):
+        c = City()
+        c.state_id = "s1"
+        models.storage.lookup(City, "state_id", "s1")
+        with patch.object(TextIndex, "clear") as clear:
+            with self.assertRaises(ValueError):
+                with models.storage.batch():
+                    c.state_id = "s2"
+                    r = Review()
+                    r.place_id = self.p.id
+                    models.storage.delete(self.p)
+                    raise ValueError("cancel")
+            self.assertIn(f"City.{c.id}",
+                          models.storage.lookup(City, "state_id", "s1"))
+            self.assertEqual({}, models.storage.lookup(City, "state_id",
+                                                       "s2"))
+            self.assertEqual([], self.p.reviews)
+            self.assertEqual([self.p], list(
+                models.storage.query(Place).where(name="Home")))
+        clear.assert_not_called()
+
+    def test_batch_rollback_amenity_ids(self):
+        self.p.amenity_ids.append("wifi")
+        with self.assertRaises(ValueError):
+            with models.storage.batch():
+                self.p.amenity_ids.append("pool")
+                raise ValueError("cancel")
+        self.assertEqual(["wifi"], self.p.amenity_ids)
+        self.assertEqual([], list(
+            models.storage.query(Place).having("amenity_ids", "pool")))
+        self.p.amenity_ids.append("spa")
+        self.assertEqual([self.p], list(
+            models.storage.query(Place).having("amenity_ids", "spa")))
+
+    def test_batch_rollback_does_not_write(self):
+        with open("file.json", "r", encoding="UTF8") as f:
+            snapshot = f.read()
+        with self.assertRaises(ValueError):
+            with models.storage.batch():
+                self.p.name = "Cabin"
+                self.p.save()
+                raise ValueError("cancel")
+        with open("file.json", "r", encoding="UTF8") as f:
+            self.assertEqual(snapshot, f.read())
+        models.storage.save()
+        with open("file.json", "r", encoding="UTF8") as f:
+            objects = json.load(f)
+        self.assertEqual("Home", objects[f"Place.{self.p.id}"]["name"])
+
+
+class TestFileStorage_sharded(unittest.TestCase):
+    """Test the sharded layout of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage.sharded = True
+        self.u = User()
+        self.p = Place()
+        self.r = Review()
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage.sharded = False
+        FileStorage.lazy = False
+        FileStorage.shard_buckets = 1
+        for path in glob.glob("file.*.json"):
+            os.remove(path)
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__raw = {}
+        FileStorage._FileStorage__loaded = True
+
+    def test_one_file_per_class(self):
+        self.assertFalse(os.path.exists("file.json"))
+        self.assertEqual(["file.Place.json", "file.Review.json",
+                          "file.User.json"], sorted(glob.glob("file.*.json")))
+        with open("file.Place.json", "r", encoding="UTF8") as f:
+            self.assertEqual([f"Place.{self.p.id}"], list(json.load(f)))
+
+    def test_save_rewrites_dirty_shards(self):
+        inodes = {path: os.stat(path).st_ino
+                  for path in glob.glob("file.*.json")}
+        self.p.name = "Home"
+        self.p.save()
+        self.assertNotEqual(inodes.pop("file.Place.json"),
+                            os.stat("file.Place.json").st_ino)
+        for path, inode in inodes.items():
+            self.assertEqual(inode, os.stat(path).st_ino)
+
+    def test_reload(self):
+        self.p.name = "Home"
+        self.p.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(3, models.storage.count())
+        self.assertEqual("Home", models.storage.get("Place", self.p.id).name)
+
+    def test_reload_one_class(self):
+        with open("file.Review.json", "w", encoding="UTF8") as f:
+            f.write("not JSON")
+        FileStorage.lazy = True
+        models.storage.reload()
+        self.assertEqual(1, models.storage.count(Place))
+        self.assertIn(f"User.{self.u.id}", models.storage.all(User))
+        self.assertEqual([f"Place.{self.p.id}", f"User.{self.u.id}"],
+                         sorted([*FileStorage._FileStorage__objects,
+                                 *FileStorage._FileStorage__raw]))
+        with self.assertRaises(ValueError):
+            models.storage.count(Review)
+
+    def test_new_after_lazy_reload(self):
+        FileStorage.lazy = True
+        models.storage.reload()
+        Place().save()
+        self.assertEqual(2, models.storage.count(Place))
+        with open("file.Place.json", "r", encoding="UTF8") as f:
+            self.assertEqual(2, len(json.load(f)))
+
+    def test_delete_last_removes_shard(self):
+        models.storage.delete(self.r)
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.Review.json"))
+        self.assertTrue(os.path.exists("file.Place.json"))
+
+    def test_buckets(self):
+        FileStorage.shard_buckets = 4
+        places = [Place() for _ in range(20)]
+        models.storage.compact()
+        self.assertFalse(os.path.exists("file.Place.json"))
+        paths = glob.glob("file.Place.*.json")
+        self.assertLess(1, len(paths))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(21, models.storage.count(Place))
+        self.assertEqual(places[5].to_dict(), models.storage.get(
+            "Place", places[5].id).to_dict())
+
+    def test_bucket_rewritten_alone(self):
+        FileStorage.shard_buckets = 4
+        for _ in range(20):
+            Place()
+        models.storage.compact()
+        inodes = {path: os.stat(path).st_ino
+                  for path in glob.glob("file.*.json")}
+        self.p.save()
+        changed = [path for path, inode in inodes.items()
+                   if os.stat(path).st_ino != inode]
+        self.assertEqual(1, len(changed))
+
+
+class TestFileStorage_ndjson(unittest.TestCase):
+    """Test the line-delimited JSON format of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage.file_format = "ndjson"
+        self.u = User()
+        self.p = Place()
+        self.r = Review()
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage.file_format = "json"
+        try:
+            os.remove("file.ndjson")
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__raw = {}
+        FileStorage._FileStorage__stale = 0
+
+    def read_lines(self):
+        with open("file.ndjson", "r", encoding="UTF8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_one_line_per_object(self):
+        self.assertFalse(os.path.exists("file.json"))
+        self.assertEqual([self.u.to_dict(), self.p.to_dict(),
+                          self.r.to_dict()], self.read_lines())
+
+    def test_save_appends(self):
+        self.p.name = "Home"
+        self.p.save()
+        lines = self.read_lines()
+        self.assertEqual(4, len(lines))
+        self.assertEqual("Home", lines[-1]["name"])
+
+    def test_reload_maps_without_decoding(self):
+        FileStorage._FileStorage__objects = {}
+        with patch("json.loads", wraps=json.loads) as mock_loads:
+            models.storage.reload()
+            mock_loads.assert_not_called()
+            u = models.storage.get("User", self.u.id)
+            self.assertEqual(1, mock_loads.call_count)
+        self.assertEqual(self.u.to_dict(), u.to_dict())
+        self.assertEqual([f"User.{self.u.id}"],
+                         list(FileStorage._FileStorage__objects))
+        self.assertEqual(3, models.storage.count())
+
+    def test_reload_latest_line(self):
+        self.p.name = "Home"
+        self.p.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual("Home", models.storage.get("Place", self.p.id).name)
+        self.assertEqual(1, models.storage.count(Place))
+
+    def test_delete_appends_tombstone(self):
+        models.storage.delete(self.r)
+        models.storage.save()
+        self.assertTrue(self.read_lines()[-1]["__deleted__"])
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertNotIn(f"Review.{self.r.id}", models.storage.all())
+        self.assertEqual(2, models.storage.count())
+
+    def test_compacts_when_mostly_stale(self):
+        for _ in range(3):
+            self.p.save()
+        self.assertEqual(6, len(self.read_lines()))
+        self.p.save()
+        self.assertEqual(3, len(self.read_lines()))
+
+    def test_compact(self):
+        models.storage.delete(self.r)
+        self.p.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        models.storage.compact()
+        keys = [f"{line['__class__']}.{line['id']}"
+                for line in self.read_lines()]
+        self.assertEqual(sorted([f"User.{self.u.id}", f"Place.{self.p.id}"]),
+                         sorted(keys))
+
+    def test_reload_drops_torn_line(self):
+        with open("file.ndjson", "a", encoding="UTF8") as f:
+            f.write('{"id": "1", "__cla')
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(3, models.storage.count())
+        self.assertEqual(3, len(self.read_lines()))
+        User().save()
+        self.assertEqual(4, len(self.read_lines()))
+
+    def test_unknown_format(self):
+        FileStorage.file_format = "xml"
+        with self.assertRaises(ValueError):
+            models.storage.save()
+
+
+class TestFileStorage_binary(unittest.TestCase):
+    """Test the binary snapshot format of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage.file_format = "binary"
+        self.u = User()
+        self.u.email = "betty@hbnb.io"
+        self.p = Place()
+        self.p.number_rooms = 3
+        self.p.latitude = 37.77
+        self.p.amenity_ids = ["a", "b"]
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage.file_format = "json"
+        FileStorage.lazy = False
+        FileStorage.journal = False
+        for path in ("file.bin", "file.json.journal"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__raw = {}
+
+    def test_save(self):
+        self.assertFalse(os.path.exists("file.json"))
+        with open("file.bin", "rb") as f:
+            self.assertEqual(b"HBNB", f.read(4))
+
+    def test_reload(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(self.u.to_dict(),
+                         models.storage.get("User", self.u.id).to_dict())
+        p = models.storage.get("Place", self.p.id)
+        self.assertEqual(self.p.to_dict(), p.to_dict())
+        self.assertIsInstance(p.updated_at, datetime)
+
+    def test_lazy_reload(self):
+        FileStorage.lazy = True
+        models.storage.reload()
+        self.assertEqual(2, models.storage.count())
+        self.assertEqual(self.p.to_dict(), FileStorage._FileStorage__raw[
+            f"Place.{self.p.id}"])
+        self.assertEqual(self.p.to_dict(),
+                         models.storage.get("Place", self.p.id).to_dict())
+
+    def test_journal(self):
+        FileStorage.journal = True
+        self.p.name = "Home"
+        self.p.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual("Home", models.storage.get("Place", self.p.id).name)
+        models.storage.compact()
+        self.assertFalse(os.path.exists("file.json.journal"))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual("Home", models.storage.get("Place", self.p.id).name)
+
+    def test_smaller_than_json(self):
+        for _ in range(20):
+            Place().save()
+        size = os.path.getsize("file.bin")
+        FileStorage.file_format = "json"
+        models.storage.save()
+        self.assertLess(size * 2, os.path.getsize("file.json"))
+        os.remove("file.json")
+
+
+class TestFileStorage_compression(unittest.TestCase):
+    """Test the compression of the files of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage.compression = "gzip"
+        self.u = User()
+        self.u.email = "betty@hbnb.io"
+        self.p = Place()
+        self.p.user_id = self.u.id
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage.compression = ""
+        FileStorage.journal = False
+        FileStorage.sharded = False
+        FileStorage.file_format = "json"
+        FileStorage._FileStorage__file_path = "file.json"
+        for path in glob.glob("file.*"):
+            if path != "tmp.json":
+                os.remove(path)
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__raw = {}
+
+    def reload(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+
+    def test_save(self):
+        self.assertFalse(os.path.exists("file.json"))
+        with open("file.json.gz", "rb") as f:
+            self.assertEqual(b"\x1f\x8b", f.read(2))
+        self.reload()
+        self.assertEqual(self.p.to_dict(),
+                         models.storage.get("Place", self.p.id).to_dict())
+
+    def test_methods(self):
+        for method, ext in (("bz2", ".bz2"), ("lzma", ".xz"),
+                            ("zlib", ".zz")):
+            with self.subTest(method=method):
+                FileStorage.compression = method
+                models.storage.save()
+                self.assertTrue(os.path.exists(f"file.json{ext}"))
+                self.reload()
+                self.assertEqual(2, len(models.storage.all()))
+
+    def test_by_extension(self):
+        FileStorage.compression = ""
+        FileStorage._FileStorage__file_path = "file.json.xz"
+        models.storage.save()
+        with open("file.json.xz", "rb") as f:
+            self.assertEqual(b"\xfd7zXZ", f.read(5))
+        self.reload()
+        self.assertEqual(self.u.to_dict(),
+                         models.storage.get("User", self.u.id).to_dict())
+
+    def test_journal(self):
+        FileStorage.journal = True
+        self.p.name = "Home"
+        self.p.save()
+        self.u.first_name = "Betty"
+        self.u.save()
+        self.assertTrue(os.path.exists("file.json.journal.gz"))
+        self.reload()
+        self.assertEqual("Home", models.storage.get("Place", self.p.id).name)
+        self.assertEqual("Betty",
+                         models.storage.get("User", self.u.id).first_name)
+        models.storage.compact()
+        self.assertFalse(os.path.exists("file.json.journal.gz"))
+
+    def test_torn_journal(self):
+        FileStorage.journal = True
+        self.p.name = "Home"
+        self.p.save()
+        self.u.first_name = "Betty"
+        self.u.save()
+        with open("file.json.journal.gz", "r+b") as f:
+            f.truncate(os.path.getsize("file.json.journal.gz") - 4)
+        self.reload()
+        self.assertEqual("Home", models.storage.get("Place", self.p.id).name)
+        self.assertFalse(os.path.exists("file.json.journal.gz"))
+        self.reload()
+        self.assertEqual("Home", models.storage.get("Place", self.p.id).name)
+
+    def test_sharded(self):
+        FileStorage.sharded = True
+        models.storage.compact()
+        self.assertTrue(os.path.exists("file.User.json.gz"))
+        self.assertTrue(os.path.exists("file.Place.json.gz"))
+        self.reload()
+        self.assertEqual(self.p.to_dict(),
+                         models.storage.get("Place", self.p.id).to_dict())
+
+    def test_binary(self):
+        FileStorage.file_format = "binary"
+        models.storage.save()
+        self.assertTrue(os.path.exists("file.bin.gz"))
+        self.reload()
+        self.assertEqual(self.p.to_dict(),
+                         models.storage.get("Place", self.p.id).to_dict())
+
+    def test_ndjson(self):
+        FileStorage.file_format = "ndjson"
+        models.storage.compact()
+        with open("file.ndjson", "rb") as f:
+            self.assertEqual(b"{", f.read(1))
+
+    def test_unknown(self):
+        FileStorage.compression = "zip"
+        with self.assertRaises(ValueError):
+            models.storage.save()
+
+
+class TestFileStorage_parallel(unittest.TestCase):
+    """Test the parallel reload of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage.workers = 2
+        self.chunk_size = patch.object(parallel, "CHUNK_SIZE", 1)
+        self.chunk_size.start()
+        self.objs = [User(), State(), Place(), Review()]
+        self.objs[2].name = "Cabin"
+        models.storage.save()
+
+    def tearDown(self):
+        self.chunk_size.stop()
+        FileStorage.workers = 1
+        FileStorage.sharded = False
+        FileStorage.lazy = False
+        for path in glob.glob("file.*"):
+            os.remove(path)
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__raw = {}
+
+    def assertReloaded(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(len(self.objs), models.storage.count())
+        for obj in self.objs:
+            reloaded = models.storage.get(type(obj).__name__, obj.id)
+            self.assertIsNot(obj, reloaded)
+            self.assertEqual(obj.to_dict(), reloaded.to_dict())
+
+    def test_reload(self):
+        self.assertLess(1, len(parallel.chunks("file.json", 2)))
+        self.assertReloaded()
+        self.assertEqual({}, FileStorage._FileStorage__dirty)
+        self.assertEqual([f"Place.{self.objs[2].id}"],
+                         list(models.storage.lookup(Place, "city_id", "")))
+
+    def test_import(self):
+        # Shrink the chunks as soon as the module is loaded, before
+        # the package reloads the storage
+        code = "\n".join((
+            "import importlib.machinery, sys",
+            "class Finder:",
+            "    def find_spec(self, name, path, target=None):",
+            "        if name != 'models.engine.parallel':",
+            "            return None",
+            "        spec = importlib.machinery.PathFinder.find_spec(",
+            "            name, path)",
+            "        exec_module = spec.loader.exec_module",
+            "        def shrink(module):",
+            "            exec_module(module)",
+            "            module.CHUNK_SIZE = 1",
+            "        spec.loader.exec_module = shrink",
+            "        return spec",
+            "sys.meta_path.insert(0, Finder())",
+            "import models",
+            "from models.engine import parallel",
+            "print(parallel.CHUNK_SIZE, models.storage.count())"))
+        env = dict(os.environ, HBNB_WORKERS="2")
+        result = subprocess.run([sys.executable, "-c", code], env=env,
+                                capture_output=True, text=True,
+                                timeout=30, check=True)
+        self.assertEqual(f"1 {len(self.objs)}", result.stdout.strip())
+
+    def test_one_entry_per_line(self):
+        with open("file.json") as f:
+            self.assertEqual(len(self.objs), len(f.readlines()))
+        with open("file.json") as f:
+            self.assertEqual(len(self.objs), len(json.load(f)))
+
+    def test_not_one_entry_per_line(self):
+        with open("file.json") as f:
+            objs = json.load(f)
+        with open("file.json", "w") as f:
+            json.dump(objs, f, indent=4)
+        self.assertReloaded()
+
+    def test_sharded(self):
+        FileStorage.sharded = True
+        models.storage.compact()
+        self.assertReloaded()
+
+    def test_lazy(self):
+        FileStorage.lazy = True
+        models.storage.reload()
+        self.assertEqual(len(self.objs), models.storage.count())
+        self.assertEqual(len(self.objs),
+                         len(FileStorage._FileStorage__raw))
+
+
+class TestFileStorage_shared(unittest.TestCase):
+    """Test the FileStorage class shared between processes"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage.shared = True
+        self.state = State()
+        self.state.name = "California"
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage.shared = False
+        FileStorage.journal = False
+        FileStorage._FileStorage__generation = None
+        for path in glob.glob("file.*"):
+            os.remove(path)
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__raw = {}
+        FileStorage._FileStorage__dirty = {}
+
+    def other_process(self, *lines):
+        """Run `lines` in another process sharing the files"""
+        env = dict(os.environ, HBNB_SHARED="1",
+                   HBNB_JOURNAL="1" if FileStorage.journal else "0")
+        result = subprocess.run(
+            [sys.executable, "-c", "\n".join((
+                "import models", "from models.user import User", *lines))],
+            env=env, capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+
+    def add_user(self):
+        return self.other_process(
+            "user = User()", "user.email = 'other@hbnb.io'", "user.save()",
+            "print(user.id)")
+
+    def test_generation(self):
+        with open("file.json.lock") as f:
+            generation = int(f.read())
+        self.state.save()
+        with open("file.json.lock") as f:
+            self.assertEqual(generation + 1, int(f.read()))
+
+    def test_no_clobber(self):
+        user_id = self.add_user()
+        city = City()
+        city.name = "San Francisco"
+        models.storage.save()
+        with open("file.json") as f:
+            stored = json.load(f)
+        self.assertEqual({f"State.{self.state.id}", f"User.{user_id}",
+                          f"City.{city.id}"}, set(stored))
+
+    def test_change_detection(self):
+        with patch("models.engine.json_stream.iter_items") as iter_items:
+            models.storage.count()
+        iter_items.assert_not_called()
+        user_id = self.add_user()
+        self.assertEqual(2, models.storage.count())
+        self.assertEqual("other@hbnb.io",
+                         models.storage.get("User", user_id).email)
+
+    def test_local_changes(self):
+        self.state.name = "Nevada"
+        user_id = self.add_user()
+        self.assertIsNotNone(models.storage.get("User", user_id))
+        self.assertEqual("Nevada",
+                         models.storage.get("State", self.state.id).name)
+        models.storage.save()
+        self.assertEqual("Nevada", self.other_process(
+            f"print(models.storage.get('State', '{self.state.id}').name)"))
+
+    def test_journal_delta(self):
+        FileStorage.journal = True
+        models.storage.compact()
+        user_id = self.add_user()
+        self.assertIs(self.state,
+                      models.storage.get("State", self.state.id))
+        self.assertEqual("other@hbnb.io",
+                         models.storage.get("User", user_id).email)
+        self.other_process(
+            f"models.storage.delete(models.storage.get('User', '{user_id}'))",
+            "models.storage.save()")
+        self.assertIsNone(models.storage.get("User", user_id))
+        self.assertIs(self.state,
+                      models.storage.get("State", self.state.id))
+
+    def test_journal_delta_indexes(self):
+        FileStorage.journal = True
+        models.storage.compact()
+        self.assertEqual(1, models.storage.count(State))
+        with patch.object(TextIndex, "clear") as clear:
+            user_id = self.add_user()
+            self.assertEqual(user_id, models.storage.get_by(
+                User, email="other@hbnb.io").id)
+            self.assertEqual(1, models.storage.count(User))
+            self.other_process(
+                f"user = models.storage.get('User', '{user_id}')",
+                "user.email = 'moved@hbnb.io'", "user.save()")
+            self.assertIsNone(models.storage.get_by(
+                User, email="other@hbnb.io"))
+            self.assertEqual(user_id, models.storage.get_by(
+                User, email="moved@hbnb.io").id)
+        clear.assert_not_called()
+
+
+class TestFileStorage_unique(unittest.TestCase):
+    """Test the unique emails of the users of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.users = [User(), User(), User()]
+        self.users[0].email = "betty@hbnb.io"
+        self.users[1].email = "holberton@hbnb.io"
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage.lazy = False
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__raw = {}
+
+    def test_update_duplicate(self):
+        with self.assertRaises(ValueError):
+            self.users[1].email = "betty@hbnb.io"
+        self.assertEqual("holberton@hbnb.io", self.users[1].email)
+        self.assertIs(self.users[1],
+                      models.storage.get_by(User, email="holberton@hbnb.io"))
+
+    def test_update_same(self):
+        self.users[0].email = "betty@hbnb.io"
+        self.users[2].email = ""
+        self.users[1].email = "holberton@hbnb.io"
+
+    def test_new_duplicate(self):
+        obj_dict = self.users[0].to_dict()
+        obj_dict["id"] = "1234"
+        user = User.from_dict(obj_dict)
+        with self.assertRaises(ValueError):
+            models.storage.new(user)
+        self.assertIsNone(models.storage.get("User", "1234"))
+        models.storage.new(self.users[0])
+
+    def test_unstored_not_checked(self):
+        user = User(**self.users[1].to_dict())
+        user.email = "betty@hbnb.io"
+        copy = User(email="betty@hbnb.io")
+        with self.assertRaises(ValueError):
+            models.storage.new(copy)
+        self.assertIs(self.users[0],
+                      models.storage.get_by(User, email="betty@hbnb.io"))
+
+    def test_empty_not_unique(self):
+        User().email = ""
+        self.assertEqual(2, len(models.storage.lookup(User, "email", "")))
+
+    def test_freed_email(self):
+        self.users[0].email = "betty@alx.io"
+        self.users[2].email = "betty@hbnb.io"
+        models.storage.delete(self.users[1])
+        self.users[0].email = "holberton@hbnb.io"
+        self.assertIs(self.users[2],
+                      models.storage.get_by(User, email="betty@hbnb.io"))
+
+    def test_get_by(self):
+        self.assertIs(self.users[1],
+                      models.storage.get_by(User, email="holberton@hbnb.io"))
+        self.assertIs(self.users[0], models.storage.get_by(
+            "User", email="betty@hbnb.io", password=""))
+        self.assertIsNone(models.storage.get_by(User, email="x@hbnb.io"))
+        self.assertIsNone(models.storage.get_by(
+            User, email="betty@hbnb.io", first_name="Betty"))
+
+    def test_get_by_lazy(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage.lazy = True
+        models.storage.reload()
+        user = models.storage.get_by(User, email="betty@hbnb.io")
+        self.assertEqual(self.users[0].id, user.id)
+        raw = FileStorage._FileStorage__raw
+        self.assertIn(f"User.{self.users[1].id}", raw)
+        with self.assertRaises(ValueError):
+            user.email = "holberton@hbnb.io"
+
+    def test_reload(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        user = models.storage.get("User", self.users[2].id)
+        with self.assertRaises(ValueError):
+            user.email = "holberton@hbnb.io"
+
+
+class TestFileStorage_query(unittest.TestCase):
+    """Test the query method of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.states = [State(), State()]
+        self.cities = []
+        for i in range(6):
+            city = City()
+            city.state_id = self.states[i % 2].id
+            city.name = f"City {i}"
+            self.cities.append(city)
+        self.places = []
+        for price in (80, 120, 200, 50):
+            place = Place()
+            place.price_by_night = price
+            self.places.append(place)
+        self.user = User()
+        self.user.email = "betty@hbnb.io"
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage.lazy = False
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__raw = {}
+
+    def test_range(self):
+        query = models.storage.query(Place).where("price_by_night", ">=", 80)
+        self.assertEqual(self.places[:3], list(query))
+        self.assertEqual([self.places[2], self.places[1]], list(
+            query.order_by("price_by_night", descending=True).limit(2)))
+        self.assertEqual([self.places[0], self.places[1]], list(
+            query.order_by("price_by_night").limit(2)))
+
+    def test_indexed(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage.lazy = True
+        models.storage.reload()
+        state_id = self.states[1].id
+        cities = list(models.storage.query("City").where(state_id=state_id))
+        self.assertEqual([city.id for city in self.cities[1::2]],
+                         [city.id for city in cities])
+        raw = FileStorage._FileStorage__raw
+        for city in self.cities[::2]:
+            self.assertIn(f"City.{city.id}", raw)
+
+    def test_indexed_in(self):
+        query = models.storage.query(City).where(
+            "state_id", "in", [state.id for state in self.states])
+        self.assertEqual(self.cities, list(query.where("name", "!=", "")))
+        self.assertEqual([], list(models.storage.query(City).where(
+            "state_id", "in", [])))
+
+    def test_email(self):
+        query = models.storage.query(User).where(email="betty@hbnb.io")
+        self.assertEqual([self.user], list(query))
+
+    def test_offset(self):
+        query = models.storage.query(City).order_by("name").offset(4)
+        self.assertEqual(self.cities[4:], list(query))
+
+    def test_range_indexed(self):
+        FileStorage._FileStorage__objects = {}
+        FileStorage.lazy = True
+        models.storage.reload()
+        query = models.storage.query(Place).where(
+            "price_by_night", ">", 60).where("price_by_night", "<", 150)
+        self.assertEqual([self.places[0].id, self.places[1].id],
+                         [place.id for place in query])
+        raw = FileStorage._FileStorage__raw
+        self.assertIn(f"Place.{self.places[2].id}", raw)
+        self.assertIn(f"Place.{self.places[3].id}", raw)
+
+    def test_range_updated(self):
+        query = models.storage.query(Place).where("price_by_night", "<", 100)
+        self.assertEqual([self.places[3], self.places[0]],
+                         list(query.order_by("price_by_night")))
+        self.places[2].price_by_night = 60
+        self.places[2].max_guest = 4
+        models.storage.delete(self.places[3])
+        self.assertEqual([self.places[2], self.places[0]],
+                         list(query.order_by("price_by_night")))
+        self.assertEqual([self.places[2]], list(query.where(
+            "max_guest", ">=", 4)))
+
+    def test_range_lookup(self):
+        self.places[0].number_rooms = "2"
+        self.assertEqual([f"Place.{self.places[0].id}"], list(
+            models.storage.lookup(Place, "number_rooms", "2")))
+
+    def locate(self):
+        locations = ((37.77, -122.42), (37.80, -122.27), (40.71, -74.01),
+                     (-17.71, 178.07))
+        for place, (latitude, longitude) in zip(self.places, locations):
+            place.latitude = latitude
+            place.longitude = longitude
+        models.storage.save()
+
+    def test_near(self):
+        self.locate()
+        query = models.storage.query(Place)
+        self.assertEqual(self.places[:2], list(query.near(37.77, -122.42,
+                                                          20)))
+        self.assertEqual([self.places[1]], list(query.near(
+            37.77, -122.42, 20).where("price_by_night", ">", 100)))
+        self.assertEqual([], list(query.near(0, 0, 1000)))
+
+    def test_within(self):
+        self.locate()
+        query = models.storage.query(Place)
+        self.assertEqual(self.places[:3], list(query.within(30, -130, 45,
+                                                            -70)))
+        self.assertEqual([self.places[3]], list(query.within(-20, 170, -10,
+                                                             -170)))
+
+    def test_nearest(self):
+        self.locate()
+        query = models.storage.query(Place)
+        self.assertEqual([self.places[2], self.places[1], self.places[0]],
+                         list(query.nearest(40, -75, 3)))
+        self.assertEqual([self.places[0], self.places[3]], list(
+            query.nearest(40, -75).where("price_by_night", "<", 150)
+            .offset(1)))
+        self.assertEqual([self.places[1], self.places[0]], list(
+            query.near(37.77, -122.42, 20).nearest(37.80, -122.27)))
+
+    def test_nearest_not_located(self):
+        self.locate()
+        query = models.storage.query(Place)
+        for origin in ((math.nan, 0), (math.inf, 0), (0, 200), (None, 0)):
+            self.assertEqual(len(self.places),
+                             len(list(query.nearest(*origin))))
+            self.assertEqual([], list(query.near(*origin, 10)))
+
+    def test_near_indexed(self):
+        self.locate()
+        FileStorage._FileStorage__objects = {}
+        FileStorage.lazy = True
+        models.storage.reload()
+        query = models.storage.query(Place)
+        self.assertEqual([self.places[0].id], [
+            place.id for place in query.near(37.7, -122.4, 10)])
+        self.assertEqual([self.places[3].id], [
+            place.id for place in query.nearest(-17, 178, 1)])
+        self.assertIn(f"Place.{self.places[2].id}",
+                      FileStorage._FileStorage__raw)
+
+    def test_near_updated(self):
+        self.locate()
+        query = models.storage.query(Place).near(40.71, -74.01, 50)
+        self.places[0].latitude = 40.8
+        self.places[0].longitude = -74.0
+        models.storage.delete(self.places[2])
+        self.assertEqual([self.places[0]], list(query))
+        self.assertEqual(self.places[0], next(iter(
+            models.storage.query(Place).nearest(41, -74))))
+
+    def equip(self):
+        for place, ids in zip(self.places, (["wifi", "pool"], ["wifi"],
+                                            ["pool", "wifi", "parking"])):
+            place.amenity_ids = ids
+        models.storage.save()
+
+    def test_having(self):
+        self.equip()
+        query = models.storage.query(Place)
+        self.assertEqual([self.places[0], self.places[2]], list(
+            query.having("amenity_ids", "wifi", "pool")))
+        self.assertEqual([self.places[2]], list(
+            query.having("amenity_ids", "pool", "wifi", "parking")))
+        self.assertEqual([self.places[1]], list(query.having(
+            "amenity_ids", "wifi").where("price_by_night", ">", 100)
+            .where("price_by_night", "<", 150)))
+        self.assertEqual([], list(query.having("amenity_ids", "spa")))
+
+    def test_having_indexed(self):
+        self.equip()
+        FileStorage._FileStorage__objects = {}
+        FileStorage.lazy = True
+        models.storage.reload()
+        query = models.storage.query(Place).having("amenity_ids", "parking")
+        self.assertEqual([self.places[2].id], [place.id for place in query])
+        raw = FileStorage._FileStorage__raw
+        self.assertIn(f"Place.{self.places[0].id}", raw)
+        self.assertIn(f"Place.{self.places[3].id}", raw)
+
+    def test_having_updated(self):
+        self.equip()
+        query = models.storage.query(Place).having("amenity_ids", "pool")
+        self.places[0].amenity_ids.remove("pool")
+        self.places[3].amenity_ids.append("pool")
+        self.places[1].amenity_ids += ["pool"]
+        self.assertEqual([self.places[2], self.places[3], self.places[1]],
+                         list(query))
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual([["wifi"], ["wifi", "pool"], ["pool"]], [
+            models.storage.get("Place", self.places[i].id).amenity_ids
+            for i in (0, 1, 3)])
+
+    def test_changes_after_query(self):
+        results = iter(models.storage.query(City))
+        self.assertIs(self.cities[0], next(results))
+        models.storage.delete(self.cities[1])
+        self.assertEqual(self.cities[2:], list(results))
+
+
+class TestFileStorage_search(unittest.TestCase):
+    """Test the text indexes of the FileStorage class"""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.place = Place()
+        self.place.name = "Cozy loft"
+        self.place.description = "A quiet loft near the beach"
+        self.reviews = []
+        for words in ("Clean and quiet", "clean, CLEAN, clean!",
+                      "Noisy street", "Quiet nights and a clean kitchen"):
+            review = Review()
+            review.place_id = self.place.id
+            review.text = words
+            self.reviews.append(review)
+        self.amenity = Amenity()
+        self.amenity.name = "Wifi"
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage.lazy = False
+        FileStorage.journal = False
+        FileStorage.persist_terms = False
+        for path in glob.glob("file.*"):
+            if path != "tmp.json":
+                os.remove(path)
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__raw = {}
+
+    def reload(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+
+    def ids(self, query):
+        return [obj.id for obj in query]
+
+    def test_search_ranked(self):
+        self.assertEqual([self.reviews[1].id, self.reviews[0].id,
+                          self.reviews[3].id], self.ids(
+            models.storage.query(Review).search("clean")))
+        self.assertEqual([self.reviews[0].id, self.reviews[3].id], self.ids(
+            models.storage.query(Review).search("QUIET clean")))
+        self.assertEqual([], self.ids(
+            models.storage.query(Review).search("clean pool")))
+
+    def test_search_classes(self):
+        self.assertEqual([self.place.id], self.ids(
+            models.storage.query(Place).search("cozy beach")))
+        self.assertEqual([self.amenity.id], self.ids(
+            models.storage.query(Amenity).search("wifi")))
+
+    def test_search_narrowed(self):
+        other = Review()
+        other.text = "clean"
+        query = models.storage.query(Review).where(
+            place_id=self.place.id).search("clean")
+        self.assertEqual([self.reviews[1].id, self.reviews[0].id,
+                          self.reviews[3].id], self.ids(query))
+        self.assertEqual([self.reviews[1].id], self.ids(
+            query.order_by("text", descending=True).limit(1)))
+
+    def test_search_updated(self):
+        self.reviews[2].text = "Clean, at last"
+        models.storage.delete(self.reviews[1])
+        self.assertEqual([self.reviews[0].id, self.reviews[2].id,
+                          self.reviews[3].id], self.ids(
+            models.storage.query(Review).search("clean")))
+        self.assertEqual([], self.ids(
+            models.storage.query(Review).search("noisy")))
+
+    def test_search_lazy(self):
+        FileStorage.lazy = True
+        self.reload()
+        self.assertEqual([self.reviews[2].id], self.ids(
+            models.storage.query(Review).search("street")))
+        raw = FileStorage._FileStorage__raw
+        self.assertIn(f"Review.{self.reviews[0].id}", raw)
+
+    def test_persist_terms(self):
+        FileStorage.persist_terms = True
+        models.storage.save()
+        with open("file.json.terms", "r", encoding="UTF8") as f:
+            terms = json.load(f)
+        self.assertEqual(list(os.stat("file.json")[1:2]),
+                         terms["snapshot"][:1])
+        self.assertEqual(["name", "description"],
+                         terms["indexes"]["Place"]["attrs"])
+        self.assertEqual({f"Review.{self.reviews[2].id}": 1},
+                         terms["indexes"]["Review"]["terms"]["noisy"])
+        self.reload()
+        with patch("models.engine.text.tokens",
+                   wraps=text.tokens) as mock_tokens:
+            self.assertEqual([self.reviews[1].id, self.reviews[0].id,
+                              self.reviews[3].id], self.ids(
+                models.storage.query(Review).search("clean")))
+        for call in mock_tokens.call_args_list:
+            self.assertNotEqual(("Noisy street",), call.args)
+
+    def test_persist_terms_journal(self):
+        FileStorage.persist_terms = True
+        FileStorage.journal = True
+        models.storage.compact()
+        self.reviews[2].text = "Clean street"
+        models.storage.delete(self.reviews[1])
+        models.storage.save()
+        self.reload()
+        self.assertEqual([self.reviews[2].id, self.reviews[0].id,
+                          self.reviews[3].id], self.ids(
+            models.storage.query(Review).search("clean")))
+        self.assertEqual([], self.ids(
+            models.storage.query(Review).search("noisy")))
+
+    def test_persist_terms_stale(self):
+        FileStorage.persist_terms = True
+        models.storage.save()
+        FileStorage.persist_terms = False
+        self.reviews[2].text = "clean"
+        models.storage.save()
+        FileStorage.persist_terms = True
+        self.reload()
+        self.assertEqual(4, len(self.ids(
+            models.storage.query(Review).search("clean"))))
+
+    def test_persist_terms_torn(self):
+        FileStorage.persist_terms = True
+        models.storage.save()
+        with open("file.json.terms", "r+", encoding="UTF8") as f:
+            f.truncate(100)
+        self.reload()
+        self.assertEqual(3, len(self.ids(
+            models.storage.query(Review).search("clean"))))
+
+    def test_persist_terms_empty(self):
+        FileStorage.persist_terms = True
+        models.storage.save()
+        self.assertTrue(os.path.exists("file.json.terms"))
+        for obj in [self.place, self.amenity] + self.reviews:
+            models.storage.delete(obj)
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.json.terms"))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+
+"""Unittest to test the geo module"""
+
+import unittest
+from models.engine import geo
+
+
+class TestGeo(unittest.TestCase):
+    """Test the distances and boxes of the geo module"""
+
+    def test_located(self):
+        self.assertTrue(geo.located((37.77, -122.42)))
+        self.assertTrue(geo.located((90, 180)))
+        self.assertFalse(geo.located((91, 0)))
+        self.assertFalse(geo.located(("37", 0)))
+        self.assertFalse(geo.located((None, None)))
+        self.assertFalse(geo.located((True, 0)))
+        self.assertFalse(geo.located(1))
+
+    def test_distance(self):
+        self.assertAlmostEqual(0, geo.distance((10, 20), (10, 20)))
+        self.assertAlmostEqual(111.195, geo.distance((0, 0), (1, 0)), 2)
+        self.assertAlmostEqual(111.195, geo.distance((0, 179.5),
+                                                     (0, -179.5)), 2)
+        self.assertAlmostEqual(20015.1, geo.distance((90, 0), (-90, 0)), 0)
+
+    def test_in_box(self):
+        self.assertTrue(geo.in_box((1, 1), (0, 0, 2, 2)))
+        self.assertFalse(geo.in_box((3, 1), (0, 0, 2, 2)))
+        self.assertTrue(geo.in_box((0, 179), (-1, 170, 1, -170)))
+        self.assertTrue(geo.in_box((0, -179), (-1, 170, 1, -170)))
+        self.assertFalse(geo.in_box((0, 0), (-1, 170, 1, -170)))
+
+    def test_box_around(self):
+        south, west, north, east = geo.box_around(0, 0, 111.195)
+        self.assertAlmostEqual(-1, south, 3)
+        self.assertAlmostEqual(1, north, 3)
+        self.assertAlmostEqual(-1, west, 3)
+        self.assertAlmostEqual(1, east, 3)
+        south, west, north, east = geo.box_around(0, 179.5, 111.195)
+        self.assertAlmostEqual(178.5, west, 3)
+        self.assertAlmostEqual(-179.5, east, 3)
+        south, west, north, east = geo.box_around(-89.5, 0, 200)
+        self.assertEqual((-90, -180, 180), (south, west, east))
+        self.assertAlmostEqual(-87.70, north, 2)
+
+    def test_near(self):
+        self.assertTrue(geo.near((0, 1), (0, 0, 112)))
+        self.assertFalse(geo.near((0, 1), (0, 0, 110)))
+        self.assertFalse(geo.near(("0", 1), (0, 0, 112)))
+
+    def test_within(self):
+        self.assertTrue(geo.within((1, 1), (0, 0, 2, 2)))
+        self.assertFalse(geo.within((1, None), (0, 0, 2, 2)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,430 @@
+#!/usr/bin/python3
+
+"""Unittest to test the storage indexes"""
+
+import json
+import math
+import random
+import unittest
+from models.engine import geo
+from models.engine.indexes import GeoIndex, HashIndex, ListIndex
+from models.engine.indexes import SortedIndex, TextIndex, UniqueIndex
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.user import User
+
+
+class TestHashIndex(unittest.TestCase):
+    """Test the HashIndex class"""
+
+    def setUp(self):
+        self.index = HashIndex(City, "state_id")
+
+    def test_add_instance(self):
+        c = City(id="1", created_at="2017-09-28T21:03:54.052298",
+                 updated_at="2017-09-28T21:03:54.052298", state_id="s1")
+        self.index.add("City.1", c)
+        self.assertEqual({"City.1": None}, self.index.find("s1"))
+
+    def test_add_dict(self):
+        self.index.add("City.1", {"state_id": "s1"})
+        self.index.add("City.2", {"state_id": "s1"})
+        self.assertEqual(["City.1", "City.2"], list(self.index.find("s1")))
+
+    def test_add_dict_class_default(self):
+        self.index.add("City.1", {})
+        self.assertEqual({"City.1": None}, self.index.find(""))
+
+    def test_add_replaces_value(self):
+        self.index.add("City.1", {"state_id": "s1"})
+        self.index.add("City.1", {"state_id": "s2"})
+        self.assertEqual({}, self.index.find("s1"))
+        self.assertEqual({"City.1": None}, self.index.find("s2"))
+        self.assertNotIn("s1", self.index.keys)
+
+    def test_add_unhashable(self):
+        self.index.add("City.1", {"state_id": ["s1"]})
+        self.assertEqual({"City.1": None}, self.index.find(None))
+
+    def test_discard(self):
+        self.index.add("City.1", {"state_id": "s1"})
+        self.index.discard("City.1")
+        self.index.discard("City.2")
+        self.assertEqual({}, self.index.find("s1"))
+        self.assertEqual({}, self.index.values)
+
+    def test_find_missing(self):
+        self.assertEqual({}, self.index.find("s1"))
+
+    def test_clear(self):
+        self.index.add("City.1", {"state_id": "s1"})
+        self.index.clear()
+        self.assertEqual({}, self.index.keys)
+        self.assertEqual({}, self.index.values)
+
+    def test_select(self):
+        self.index.add("City.1", {"state_id": "s1"})
+        self.index.add("City.2", {"state_id": "s2"})
+        self.assertEqual({"City.1": None},
+                         self.index.select([("==", "s1"), ("!=", "s2")]))
+        self.assertEqual(["City.1", "City.2"], list(
+            self.index.select([("in", ["s1", "s2", "s3"])])))
+        self.assertIsNone(self.index.select([(">", "s1")]))
+        self.assertIsNone(self.index.select([("==", ["s1"])]))
+
+
+class TestUniqueIndex(unittest.TestCase):
+    """Test the UniqueIndex class"""
+
+    def setUp(self):
+        self.index = UniqueIndex(User, "email")
+        self.index.add("User.0", {"email": "betty@hbnb.io"})
+        self.index.add("User.1", {})
+        self.index.add("User.2", {"email": ""})
+
+    def test_check(self):
+        with self.assertRaises(ValueError):
+            self.index.check("User.1", "betty@hbnb.io")
+        self.index.check("User.0", "betty@hbnb.io")
+        self.index.check("User.1", "holberton@hbnb.io")
+
+    def test_check_empty(self):
+        self.index.check("User.0", "")
+        self.index.check("User.0", None)
+
+    def test_check_unhashable(self):
+        self.index.check("User.1", ["betty@hbnb.io"])
+
+    def test_check_duplicates_stored(self):
+        self.index.add("User.3", {"email": "betty@hbnb.io"})
+        self.assertEqual(["User.0", "User.3"],
+                         list(self.index.find("betty@hbnb.io")))
+        with self.assertRaises(ValueError):
+            self.index.check("User.0", "betty@hbnb.io")
+
+    def test_discard(self):
+        self.index.discard("User.0")
+        self.index.check("User.1", "betty@hbnb.io")
+
+
+class TestListIndex(unittest.TestCase):
+    """Test the ListIndex class"""
+
+    def setUp(self):
+        self.index = ListIndex(Place, "amenity_ids")
+        for i, ids in enumerate((["wifi", "pool"], ["wifi"],
+                                 ["wifi", "pool", "parking", "wifi"], [])):
+            self.index.add(f"Place.{i}", {"amenity_ids": ids})
+
+    def test_add(self):
+        self.assertEqual(("wifi", "pool", "parking"),
+                         self.index.values["Place.2"])
+        self.assertEqual(["Place.0", "Place.1", "Place.2"],
+                         list(self.index.find("wifi")))
+        self.assertEqual(["Place.2"], list(self.index.find("parking")))
+
+    def test_add_replaces_value(self):
+        self.index.add("Place.2", {"amenity_ids": ("parking", "spa")})
+        self.assertEqual(["Place.0"], list(self.index.find("pool")))
+        self.assertEqual(["Place.2"], list(self.index.find("spa")))
+
+    def test_add_class_default(self):
+        self.index.add("Place.4", {})
+        self.assertEqual((), self.index.values["Place.4"])
+
+    def test_unindexed_values(self):
+        self.index.add("Place.4", {"amenity_ids": "wifi"})
+        self.index.add("Place.5", {"amenity_ids": [["wifi"], "spa"]})
+        self.assertEqual(3, len(self.index.find("wifi")))
+        self.assertEqual(["Place.5"], list(self.index.find("spa")))
+
+    def test_discard(self):
+        self.index.discard("Place.2")
+        self.index.discard("Place.9")
+        self.assertNotIn("parking", self.index.keys)
+        self.assertNotIn("Place.2", self.index.values)
+
+    def test_select(self):
+        self.assertEqual(["Place.0", "Place.2"], list(self.index.select(
+            [("has", "wifi"), ("has", "pool")])))
+        self.assertEqual(["Place.2"], list(self.index.select(
+            [("has", "pool"), ("has", "parking"), ("==", None)])))
+        self.assertEqual({}, self.index.select(
+            [("has", "wifi"), ("has", "spa")]))
+        self.assertIsNone(self.index.select([("has", ["wifi"])]))
+        self.assertIsNone(self.index.select([("==", ["wifi"])]))
+
+    def test_clear(self):
+        self.index.clear()
+        self.assertEqual({}, self.index.find("wifi"))
+        self.assertEqual({}, self.index.values)
+
+
+class TestSortedIndex(unittest.TestCase):
+    """Test the SortedIndex class"""
+
+    def setUp(self):
+        self.index = SortedIndex(Place, "price_by_night")
+        for i, price in enumerate((120, 80, 200, 80, 50)):
+            self.index.add(f"Place.{i}", {"price_by_night": price})
+
+    def test_range(self):
+        self.assertEqual(["Place.1", "Place.3", "Place.0"],
+                         list(self.index.range(80, 120)))
+        self.assertEqual(["Place.0"], list(self.index.range(80, 200, False,
+                                                            False)))
+        self.assertEqual(["Place.4"], list(
+            self.index.range(high=80, high_inclusive=False)))
+        self.assertEqual(["Place.2"], list(self.index.range(low=150)))
+        self.assertEqual({}, self.index.range(150, 100))
+
+    def test_find(self):
+        self.assertEqual(["Place.1", "Place.3"], list(self.index.find(80)))
+        self.assertEqual(["Place.1", "Place.3"], list(self.index.find(80.0)))
+
+    def test_add_replaces_value(self):
+        self.index.range()
+        self.index.add("Place.1", {"price_by_night": 300})
+        self.index.add("Place.5", {"price_by_night": 90})
+        self.assertEqual(["Place.3", "Place.5", "Place.0"],
+                         list(self.index.range(80, 150)))
+        self.assertEqual(["Place.1"], list(self.index.range(250)))
+
+    def test_add_class_default(self):
+        self.index.add("Place.5", {})
+        self.assertEqual({"Place.5": None}, self.index.find(0))
+
+    def test_unordered_values(self):
+        self.index.add("Place.1", {"price_by_night": "80"})
+        self.index.add("Place.5", {"price_by_night": None})
+        self.index.add("Place.6", {"price_by_night": float("nan")})
+        self.assertEqual(["Place.3"], list(self.index.find(80)))
+        self.index.discard("Place.1")
+        self.index.discard("Place.6")
+        self.assertEqual(4, len(self.index.range()))
+
+    def test_discard(self):
+        self.index.discard("Place.3")
+        self.index.discard("Place.9")
+        self.assertEqual(["Place.1"], list(self.index.find(80)))
+        self.assertNotIn("Place.3", self.index.values)
+
+    def test_select(self):
+        self.assertEqual(["Place.1", "Place.3", "Place.0"], list(
+            self.index.select([(">", 50), ("<=", 120), (">=", 50)])))
+        self.assertEqual(["Place.0"], list(
+            self.index.select([("==", 120), ("<", 200)])))
+        self.assertEqual(["Place.4", "Place.2"], list(
+            self.index.select([("in", [50, 200])])))
+        self.assertIsNone(self.index.select([("==", "80"), ("!=", 80)]))
+        self.assertEqual({}, self.index.select([(">", 80), ("<", 80)]))
+
+    def test_clear(self):
+        self.index.clear()
+        self.assertEqual({}, self.index.range())
+        self.assertEqual({}, self.index.values)
+
+
+class TestGeoIndex(unittest.TestCase):
+    """Test the GeoIndex class"""
+
+    def setUp(self):
+        self.index = GeoIndex(Place)
+        self.locations = {
+            "Place.sf": (37.77, -122.42), "Place.oakland": (37.80, -122.27),
+            "Place.nyc": (40.71, -74.01), "Place.fiji": (-17.71, 178.07),
+            "Place.samoa": (-13.76, -172.10), "Place.pole": (89.9, 10),
+        }
+        for key, (latitude, longitude) in self.locations.items():
+            self.index.add(key, {"latitude": latitude,
+                                 "longitude": longitude})
+
+    def test_add(self):
+        self.assertEqual((37.77, -122.42), self.index.values["Place.sf"])
+        self.assertEqual(["Place.sf", "Place.oakland"],
+                         list(self.index.cells[(127, 57)]))
+        self.index.add("Place.sf", {"latitude": 40.9, "longitude": -74.0})
+        self.assertEqual(["Place.oakland"],
+                         list(self.index.cells[(127, 57)]))
+        self.assertEqual(["Place.sf"], list(self.index.cells[(130, 106)]))
+
+    def test_add_class_default(self):
+        self.index.add("Place.x", {})
+        self.assertEqual((0.0, 0.0), self.index.values["Place.x"])
+        self.assertIn("Place.x", self.index.cells[(90, 180)])
+
+    def test_unlocated(self):
+        self.index.add("Place.x", {"latitude": "37", "longitude": 0})
+        self.index.add("Place.y", {"latitude": 100, "longitude": 0})
+        self.assertEqual(6, sum(len(keys)
+                                for keys in self.index.cells.values()))
+        self.index.discard("Place.x")
+        self.assertNotIn("Place.x", self.index.values)
+
+    def test_discard(self):
+        self.index.discard("Place.nyc")
+        self.index.discard("Place.nowhere")
+        self.assertNotIn((130, 105), self.index.cells)
+        self.assertNotIn("Place.nyc", self.index.values)
+
+    def test_box(self):
+        self.assertEqual(["Place.sf", "Place.oakland"],
+                         list(self.index.box(37, -123, 38, -122)))
+        self.assertIsNone(self.index.box(-20, 170, -10, -170))
+        index = GeoIndex(Place, size=10.0)
+        for key, value in self.index.values.items():
+            index.add(key, dict(zip(index.attr, value)))
+        self.assertEqual(["Place.fiji", "Place.samoa"],
+                         list(index.box(-20, 170, -10, -170)))
+        self.assertEqual({}, self.index.box(38, -123, 37, -122))
+        self.assertIsNone(self.index.box(-90, -180, 90, 180))
+
+    def test_select(self):
+        self.assertEqual(["Place.sf", "Place.oakland"], list(
+            self.index.select([("near", (37.77, -122.42, 20))])))
+        self.assertEqual(["Place.nyc"], list(self.index.select([
+            ("near", (40.7, -74, 50)), ("within", (30, -130, 45, -70))])))
+        self.assertIsNone(self.index.select([("near", (0, 0, 1e5))]))
+        self.assertIsNone(self.index.select([("near", ("0", 0, 1))]))
+        self.assertIsNone(self.index.select([("==", (0, 0))]))
+
+    def test_nearest(self):
+        self.index.add("Place.x", {"latitude": None, "longitude": None})
+        self.assertEqual(["Place.fiji", "Place.samoa", "Place.sf",
+                          "Place.oakland", "Place.pole", "Place.nyc",
+                          "Place.x"], list(self.index.nearest(-16, 175)))
+        self.assertEqual(["Place.pole", "Place.nyc"], list(
+            self.index.nearest(89, -170))[:2])
+
+    def test_nearest_not_located(self):
+        for origin in ((math.nan, 0), (0, math.inf), (91, 0), (None, 0)):
+            with self.assertRaises(ValueError):
+                next(self.index.nearest(*origin))
+
+    def test_nearest_random(self):
+        rng = random.Random(7)
+        index = GeoIndex(Place, size=5.0)
+        points = {}
+        for i in range(300):
+            points[f"Place.{i}"] = (rng.uniform(-90, 90),
+                                    rng.uniform(-180, 180))
+            index.add(f"Place.{i}", {"latitude": points[f"Place.{i}"][0],
+                                     "longitude": points[f"Place.{i}"][1]})
+        for _ in range(20):
+            origin = (rng.uniform(-90, 90), rng.uniform(-180, 180))
+            distances = [geo.distance(origin, points[key])
+                         for key in index.nearest(*origin)]
+            self.assertEqual(sorted(distances), distances)
+            self.assertEqual(300, len(distances))
+
+    def test_clear(self):
+        self.index.clear()
+        self.assertEqual({}, self.index.cells)
+        self.assertEqual([], list(self.index.nearest(0, 0)))
+
+
+class TestTextIndex(unittest.TestCase):
+    """Test the TextIndex class"""
+
+    def setUp(self):
+        self.index = TextIndex(Place, "name", "description")
+        for i, (name, description) in enumerate((
+                ("Cozy loft", "Quiet, clean loft near the park"),
+                ("Loft", "Noisy but central"),
+                ("House", "Clean house, very CLEAN garden"),
+                ("Cabin", None))):
+            self.index.add(f"Place.{i}", {"name": name,
+                                          "description": description})
+
+    def test_add(self):
+        self.assertEqual("house clean house very clean garden",
+                         self.index.values["Place.2"])
+        self.assertEqual({"Place.0": 2, "Place.1": 1},
+                         self.index.terms["loft"])
+        self.assertEqual({"Place.2": 2}, self.index.terms["house"])
+        self.assertEqual(19, self.index.length)
+
+    def test_covers(self):
+        self.assertTrue(self.index.covers("description"))
+        self.assertFalse(self.index.covers("price_by_night"))
+        self.assertTrue(TextIndex(Review, "text").covers("text"))
+
+    def test_add_single_attr(self):
+        index = TextIndex(Review, "text")
+        self.assertEqual("text", index.attr)
+        index.add("Review.0", {"text": "Great stay"})
+        index.add("Review.1", {})
+        self.assertEqual({"Review.0": "great stay", "Review.1": ""},
+                         index.values)
+
+    def test_add_replaces_value(self):
+        self.index.add("Place.1", {"name": "Loft",
+                                   "description": "Quiet at last"})
+        self.assertEqual({"Place.0": None, "Place.1": None},
+                         self.index.select([("match", "quiet loft")]))
+        self.assertNotIn("noisy", self.index.terms)
+        self.assertEqual(19, self.index.length)
+
+    def test_discard(self):
+        self.index.discard("Place.2")
+        self.index.discard("Place.9")
+        self.assertEqual({"Place.0": 1}, self.index.terms["clean"])
+        self.assertNotIn("house", self.index.terms)
+        self.assertEqual(13, self.index.length)
+
+    def test_select(self):
+        self.assertEqual(["Place.0", "Place.2"], list(
+            self.index.select([("match", "clean")])))
+        self.assertEqual(["Place.0"], list(
+            self.index.select([("match", "LOFT, clean")])))
+        self.assertEqual(["Place.0"], list(self.index.select(
+            [("match", "loft"), ("match", "park")])))
+        self.assertEqual({}, self.index.select([("match", "loft pool")]))
+        self.assertIsNone(self.index.select([("match", "!")]))
+        self.assertIsNone(self.index.select([("==", "loft")]))
+
+    def test_rank(self):
+        conditions = [("match", "clean")]
+        self.assertEqual(["Place.2", "Place.0"], self.index.rank(
+            self.index.select(conditions), conditions))
+        conditions = [("match", "loft")]
+        self.assertEqual(["Place.0", "Place.1"], self.index.rank(
+            ["Place.1", "Place.0"], conditions))
+        self.assertEqual(["Place.3", "Place.1"], self.index.rank(
+            ["Place.3", "Place.1"], []))
+
+    def test_dump_load(self):
+        state = json.loads(self.index.dump())
+        index = TextIndex(Place, "name", "description")
+        self.assertTrue(index.load(state))
+        self.assertEqual(self.index.values, index.values)
+        self.assertEqual(self.index.terms, index.terms)
+        self.assertEqual(self.index.length, index.length)
+        index.discard("Place.0")
+        self.assertEqual({"Place.1": 1}, index.terms["loft"])
+
+    def test_dump_reuses_fragments(self):
+        self.index.dump()
+        self.index.fragments["park"] = '{"Place.9": 1}'
+        self.index.add("Place.1", {"name": "Loft", "description": "Clean"})
+        state = json.loads(self.index.dump())
+        self.assertEqual({"Place.9": 1}, state["terms"]["park"])
+        self.assertEqual({"Place.0": 1, "Place.1": 1, "Place.2": 2},
+                         state["terms"]["clean"])
+
+    def test_load_other_index(self):
+        state = json.loads(TextIndex(Review, "text").dump())
+        self.assertFalse(self.index.load(state))
+        self.assertFalse(self.index.load(None))
+        self.assertFalse(self.index.load({"attrs": ["name", "description"]}))
+        self.assertEqual({}, self.index.values)
+
+    def test_clear(self):
+        self.index.clear()
+        self.assertEqual({}, self.index.terms)
+        self.assertEqual(0, self.index.length)
+
+
+if __name__ == "__main__":
+    unittest.main()
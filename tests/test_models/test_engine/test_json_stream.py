@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+
+"""Unittest to test the streaming JSON reader"""
+
+import json
+import unittest
+from io import StringIO
+from models.engine.json_stream import iter_items
+
+
+class TestIterItems(unittest.TestCase):
+    """Test the iter_items function"""
+
+    def setUp(self):
+        self.objects = {
+            f"Place.{i}": {"id": str(i), "__class__": "Place",
+                           "name": "A \"quoted\" {name}, with: commas",
+                           "number_rooms": i * 1000, "latitude": -1.5e3,
+                           "amenity_ids": ["a", "b"], "owner": None,
+                           "open": i % 2 == 0}
+            for i in range(50)}
+
+    def test_items(self):
+        items = iter_items(StringIO(json.dumps(self.objects)))
+        self.assertEqual(list(self.objects.items()), list(items))
+
+    def test_small_chunks(self):
+        for text in (json.dumps(self.objects),
+                     json.dumps(self.objects, indent=4)):
+            for chunk_size in (1, 2, 7, 100):
+                items = iter_items(StringIO(text), chunk_size)
+                self.assertEqual(self.objects, dict(items))
+
+    def test_number_cut_by_chunk(self):
+        items = iter_items(StringIO('{"a": 12345, "b": 6}'), 8)
+        self.assertEqual([("a", 12345), ("b", 6)], list(items))
+
+    def test_empty(self):
+        for text in ("{}", " { \n } \n"):
+            self.assertEqual([], list(iter_items(StringIO(text), 1)))
+
+    def test_one_at_a_time(self):
+        items = iter_items(StringIO(json.dumps(self.objects)), 64)
+        self.assertEqual(("Place.0", self.objects["Place.0"]), next(items))
+
+    def test_invalid(self):
+        for text in ("", "[]", '{"a": 1', '{"a" 1}', '{"a": 1,}',
+                     '{1: 2}', '{"a": tru}', '{"a": 1} 2'):
+            with self.assertRaises(json.JSONDecodeError, msg=text):
+                list(iter_items(StringIO(text), 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
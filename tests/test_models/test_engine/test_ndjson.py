@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+
+"""Unittest to test the line-delimited JSON helpers"""
+
+import json
+import unittest
+from models.engine.ndjson import MappedRecords, index_lines, tombstone
+
+
+class TestIndexLines(unittest.TestCase):
+    """Test the index_lines function"""
+
+    def setUp(self):
+        self.u1 = {"id": "1", "name": "Betty", "__class__": "User"}
+        self.u2 = {"id": "2", "name": "Holberton", "__class__": "User"}
+
+    def lines(self, *records):
+        return "".join(f"{json.dumps(record)}\n"
+                       for record in records).encode()
+
+    def test_offsets(self):
+        buffer = self.lines(self.u1, self.u2)
+        offsets, stale, end = index_lines(buffer)
+        self.assertEqual(["User.1", "User.2"], list(offsets))
+        offset, length = offsets["User.2"]
+        self.assertEqual(self.u2, json.loads(buffer[offset:offset + length]))
+        self.assertEqual(0, stale)
+        self.assertEqual(len(buffer), end)
+
+    def test_last_line_wins(self):
+        u1 = dict(self.u1, name="John")
+        buffer = self.lines(self.u1, self.u2, u1)
+        offsets, stale, end = index_lines(buffer)
+        offset, length = offsets["User.1"]
+        self.assertEqual(u1, json.loads(buffer[offset:offset + length]))
+        self.assertEqual(1, stale)
+
+    def test_tombstone(self):
+        buffer = self.lines(self.u1, self.u2) + tombstone("User.1").encode()
+        offsets, stale, end = index_lines(buffer)
+        self.assertEqual(["User.2"], list(offsets))
+        self.assertEqual(2, stale)
+
+    def test_escaped_keys(self):
+        record = {"id": 'a"b', "__class__": "User"}
+        buffer = self.lines(record) + tombstone('User.c"d').encode()
+        offsets, stale, end = index_lines(buffer)
+        self.assertEqual(['User.a"b'], list(offsets))
+        self.assertEqual(1, stale)
+
+    def test_torn_line(self):
+        buffer = self.lines(self.u1)
+        offsets, stale, end = index_lines(buffer + b'{"id": "2", "na')
+        self.assertEqual(["User.1"], list(offsets))
+        self.assertEqual(len(buffer), end)
+
+    def test_invalid_line(self):
+        with self.assertRaises(ValueError):
+            index_lines(b"not JSON\n")
+
+
+class TestMappedRecords(unittest.TestCase):
+    """Test the MappedRecords class"""
+
+    def setUp(self):
+        buffer = b'{"id": "1", "__class__": "User"}\n'
+        self.records = MappedRecords(buffer, index_lines(buffer)[0])
+
+    def test_get(self):
+        self.assertEqual({"id": "1", "__class__": "User"},
+                         self.records["User.1"])
+        self.assertIn("User.1", self.records)
+        self.assertNotIn("User.2", self.records)
+        self.assertIsNone(self.records.get("User.2"))
+        with self.assertRaises(KeyError):
+            self.records["User.2"]
+
+    def test_set(self):
+        self.records["User.1"] = {"id": "1"}
+        self.records["User.2"] = {"id": "2"}
+        self.assertEqual({"User.1": {"id": "1"}, "User.2": {"id": "2"}},
+                         dict(self.records))
+        self.assertEqual(2, len(self.records))
+
+    def test_pop(self):
+        self.assertEqual("1", self.records.pop("User.1")["id"])
+        self.assertEqual(0, len(self.records))
+        self.assertEqual({}, self.records)
+
+    def test_text(self):
+        self.assertEqual('{"id": "1", "__class__": "User"}',
+                         self.records.text("User.1"))
+        self.records["User.2"] = {"id": "2"}
+        self.assertEqual('{"id": "2"}', self.records.text("User.2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
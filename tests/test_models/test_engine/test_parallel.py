@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+
+"""Unittest to test the parallel reader of snapshot files"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from models.engine import parallel
+from models.place import Place
+from models.user import User
+
+
+class TestParallel(unittest.TestCase):
+    """Test the chunks, decode and read functions"""
+
+    def setUp(self):
+        self.dicts = {}
+        for cls in (User, Place, User):
+            obj = cls.from_dict({"__class__": cls.__name__,
+                                 "id": f"{cls.__name__}{len(self.dicts)}",
+                                 "created_at": "2017-09-28T21:03:54.052298",
+                                 "updated_at": "2017-09-28T21:03:54.052302"})
+            obj.__dict__["name"] = "A\nB"
+            self.dicts[f"{cls.__name__}.{obj.id}"] = obj.to_dict()
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, "w") as f:
+            f.write("{" + ",\n".join(
+                f"{json.dumps(key)}: {json.dumps(obj_dict)}"
+                for key, obj_dict in self.dicts.items()) + "}")
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def decoded(self, objects):
+        return {key: obj.to_dict() for key, obj in objects}
+
+    def test_chunks(self):
+        with patch.object(parallel, "CHUNK_SIZE", 1):
+            chunks = parallel.chunks(self.path, 2)
+        self.assertEqual(2, len(chunks))
+        self.assertEqual(0, chunks[0][0])
+        self.assertEqual(chunks[0][1], chunks[1][0])
+        self.assertEqual(os.path.getsize(self.path), chunks[1][1])
+        with open(self.path, "rb") as f:
+            f.seek(chunks[1][0] - 1)
+            self.assertEqual(b"\n", f.read(1))
+        self.assertEqual(1, len(parallel.chunks(self.path, 2)))
+
+    def test_decode(self):
+        with patch.object(parallel, "CHUNK_SIZE", 1):
+            objects = [item for start, end in parallel.chunks(self.path, 3)
+                       for item in parallel.decode(self.path, start, end)]
+        self.assertEqual(self.dicts, self.decoded(objects))
+
+    def test_decode_single_line(self):
+        with open(self.path, "w") as f:
+            json.dump(self.dicts, f)
+        objects = parallel.decode(self.path, 0, os.path.getsize(self.path))
+        self.assertEqual(self.dicts, self.decoded(objects))
+
+    def test_decode_not_entries(self):
+        with open(self.path, "w") as f:
+            json.dump(self.dicts, f, indent=4)
+        with self.assertRaises(ValueError):
+            parallel.decode(self.path, 0, os.path.getsize(self.path))
+
+    def test_read(self):
+        with patch.object(parallel, "CHUNK_SIZE", 1):
+            objects = list(parallel.read([self.path], 2))
+        self.assertEqual(list(self.dicts), [key for key, obj in objects])
+        self.assertEqual(self.dicts, self.decoded(objects))
+
+
+if __name__ == "__main__":
+    unittest.main()
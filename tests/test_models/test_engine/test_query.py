@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+
+"""Unittest to test the Query class"""
+
+import types
+import unittest
+from models.engine.query import Query
+
+
+class TestQuery(unittest.TestCase):
+    """Test the where, order_by, limit and offset methods of Query"""
+
+    def setUp(self):
+        self.objects = [
+            types.SimpleNamespace(name="b", price=120, rooms=2),
+            types.SimpleNamespace(name="a", price=80, rooms=1),
+            types.SimpleNamespace(name="c", price=None, rooms=3),
+            types.SimpleNamespace(name="d", price=200),
+        ]
+        self.selected = []
+
+        def select(conditions, order):
+            self.selected.append(conditions)
+            return iter(self.objects), False
+        self.query = Query("Place", select)
+
+    def names(self, query):
+        return [obj.name for obj in query]
+
+    def test_all(self):
+        self.assertEqual(["b", "a", "c", "d"], self.names(self.query))
+
+    def test_where(self):
+        self.assertEqual(["b", "d"], self.names(
+            self.query.where("price", ">=", 100)))
+        self.assertEqual(["a"], self.names(
+            self.query.where("price", "<", 100)))
+        self.assertEqual(["c"], self.names(self.query.where(price=None)))
+        self.assertEqual(["b", "c"], self.names(
+            self.query.where("rooms", "in", [2, 3])))
+
+    def test_where_chained(self):
+        query = self.query.where("price", ">", 50).where("rooms", "!=", 1)
+        self.assertEqual(["b", "d"], self.names(query))
+        self.assertEqual([(("price", ">", 50), ("rooms", "!=", 1))],
+                         self.selected)
+
+    def test_where_missing_attribute(self):
+        self.assertEqual(["d"], self.names(self.query.where(rooms=None)))
+
+    def test_where_unknown_operator(self):
+        with self.assertRaises(ValueError):
+            self.query.where("price", "~", 1)
+
+    def test_queries_are_immutable(self):
+        self.query.where("price", ">", 100).limit(1)
+        self.assertEqual(4, len(list(self.query)))
+
+    def test_order_by(self):
+        self.assertEqual(["c", "a", "b", "d"], self.names(
+            self.query.order_by("price")))
+        self.assertEqual(["d", "b", "a", "c"], self.names(
+            self.query.order_by("price", descending=True)))
+
+    def test_order_by_mixed_types(self):
+        self.objects[1].price = "cheap"
+        self.objects[3].price = [200]
+        self.assertEqual(["c", "b", "a", "d"], self.names(
+            self.query.order_by("price")))
+        self.assertEqual(["d", "a"], self.names(
+            self.query.order_by("price", descending=True).limit(2)))
+
+    def test_limit_offset(self):
+        self.assertEqual(["a", "c"], self.names(
+            self.query.offset(1).limit(2)))
+        self.assertEqual(["a", "b"], self.names(
+            self.query.order_by("price").offset(1).limit(2)))
+        self.assertEqual(["b", "a"], self.names(
+            self.query.order_by("price", True).offset(1).limit(2)))
+
+    def test_search(self):
+        self.objects[0].text = "Quiet and clean"
+        self.objects[1].text = "clean"
+        self.objects[2].text = None
+        self.assertEqual(["b", "a"], self.names(
+            Query("Review", self.query.select).search("CLEAN")))
+        self.assertEqual(["b"], self.names(
+            Query("Review", self.query.select).search("clean, quiet")))
+        self.assertEqual(["a"], self.names(
+            self.query.search("a", "name")))
+        self.assertEqual(("text", "match", "clean"), Query(
+            "Review", self.query.select).search("clean").conditions[0])
+        with self.assertRaises(ValueError):
+            Query("City", self.query.select).search("clean")
+
+    def test_lazy(self):
+        results = iter(self.query)
+        self.assertEqual([], self.selected)
+        self.assertEqual("b", next(results).name)
+        self.assertEqual(1, len(self.selected))
+
+    def test_near(self):
+        self.objects[0].__dict__.update(latitude=37.77, longitude=-122.42)
+        self.objects[1].__dict__.update(latitude=37.80, longitude=-122.27)
+        self.objects[2].__dict__.update(latitude=40.71, longitude=-74.01)
+        self.objects[3].__dict__.update(latitude="x", longitude=0)
+        self.assertEqual(["b", "a"], self.names(
+            self.query.near(37.77, -122.42, 20)))
+        self.assertEqual(["b"], self.names(
+            self.query.near(37.77, -122.42, 10)))
+        self.assertEqual(["b", "a", "c"], self.names(
+            self.query.within(30, -130, 45, -70)))
+        self.assertEqual([], self.names(self.query.within(30, 170, 45, -170)))
+        self.assertEqual(["b", "c", "d"], self.names(
+            self.query.nearest(37.80, -122.27).offset(1)))
+        self.assertEqual(["c"], self.names(self.query.nearest(41, -74, 1)))
+
+    def test_having(self):
+        self.objects[0].amenity_ids = ["wifi", "pool"]
+        self.objects[1].amenity_ids = ["wifi"]
+        self.objects[2].amenity_ids = "wifi"
+        self.assertEqual(["b", "a"], self.names(
+            self.query.having("amenity_ids", "wifi")))
+        self.assertEqual(["b"], self.names(
+            self.query.having("amenity_ids", "pool", "wifi")))
+        self.assertEqual([("amenity_ids", "has", "pool"),
+                          ("amenity_ids", "has", "wifi")], list(
+            self.query.having("amenity_ids", "pool", "wifi").conditions))
+        self.assertEqual(["b", "a", "c", "d"], self.names(
+            self.query.having("amenity_ids")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+
+"""Unittest to test the text module"""
+
+import unittest
+from models.engine import text
+
+
+class TestText(unittest.TestCase):
+    """Test the tokenizer of the text module"""
+
+    def test_tokens(self):
+        self.assertEqual(["a", "quiet", "clean", "loft", "2"],
+                         text.tokens("A quiet, CLEAN loft (2)!"))
+        self.assertEqual(["café", "strasse"], text.tokens("CAFÉ Straße"))
+        self.assertEqual(["fine"], text.tokens("\ufb01ne"))
+
+    def test_tokens_tuple(self):
+        self.assertEqual(["loft", "quiet", "loft"],
+                         text.tokens(("Loft", None, "quiet loft")))
+
+    def test_tokens_not_text(self):
+        self.assertEqual([], text.tokens(None))
+        self.assertEqual([], text.tokens(12))
+        self.assertEqual([], text.tokens(""))
+
+    def test_matches(self):
+        self.assertTrue(text.matches("A quiet, clean loft", "CLEAN quiet"))
+        self.assertTrue(text.matches(("Loft", "quiet"), "loft quiet"))
+        self.assertFalse(text.matches("A quiet loft", "quiet clean"))
+        self.assertFalse(text.matches("quietly", "quiet"))
+        self.assertTrue(text.matches(None, ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,9 @@
 
 import unittest
 import os
+import pickle
 from models.place import Place
+from models.review import Review
 from models.base_model import BaseModel
 from time import sleep
 from datetime import datetime
@@ -94,9 +96,37 @@ class TestPlace_init(unittest.TestCase):
 
     def test_Place_amenity_ids_is_public(self):
         p = Place()
-        self.assertIs(type(Place.amenity_ids), list)
+        self.assertIs(type(Place.amenity_ids), tuple)
         self.assertIn("amenity_ids", dir(p))
-        self.assertNotIn("amenity_ids", p.__dict__)
+        self.assertEqual([], p.__dict__["amenity_ids"])
+
+    def test_Place_amenity_ids_not_shared(self):
+        p1 = Place()
+        p2 = Place(**p1.to_dict())
+        p3 = Place.from_dict({"__class__": "Place", "id": "3",
+                              "created_at": p1.created_at.isoformat(),
+                              "updated_at": p1.updated_at.isoformat()})
+        p1.amenity_ids.append("wifi")
+        p1.amenity_ids.insert(0, "pool")
+        p1.amenity_ids.sort(reverse=True)
+        self.assertEqual(["wifi", "pool"], p1.amenity_ids)
+        self.assertEqual([], p2.amenity_ids)
+        self.assertEqual([], p3.amenity_ids)
+        self.assertIsInstance(p3.amenity_ids, list)
+
+    def test_Place_amenity_ids_pickled(self):
+        p = Place()
+        p.amenity_ids.append("wifi")
+        copy = pickle.loads(pickle.dumps(p))
+        self.assertEqual(["wifi"], copy.amenity_ids)
+        self.assertIs(copy, copy.amenity_ids.place)
+
+    def test_Place_amenity_ids_copied(self):
+        ids = ["wifi"]
+        p = Place()
+        p.amenity_ids = ids
+        ids.append("pool")
+        self.assertEqual(["wifi"], p.amenity_ids)
 
     def test_Place_value_saved(self):
         self.assertIn(Place(), storage.all().values())
@@ -257,7 +287,8 @@ class TestPlace_to_dict(unittest.TestCase):
                 'id': p.id,
                 '__class__': 'Place',
                 'created_at': p.created_at.isoformat(),
-                'updated_at': p.updated_at.isoformat()
+                'updated_at': p.updated_at.isoformat(),
+                'amenity_ids': []
                 }
         self.assertEqual(p.to_dict(), expected)
 
@@ -270,5 +301,21 @@ class TestPlace_to_dict(unittest.TestCase):
             Place().to_dict("Invalid")
 
 
+class TestPlace_reviews(unittest.TestCase):
+    """Unittest for the reviews relationship of the Place class"""
+
+    def test_reviews(self):
+        p = Place()
+        r1 = Review()
+        r1.place_id = p.id
+        r2 = Review()
+        r2.place_id = p.id
+        Review()
+        self.assertEqual([r1, r2], p.reviews)
+
+    def test_reviews_empty(self):
+        self.assertEqual([], Place().reviews)
+
+
 if __name__ == "__main__":
     unittest.main()
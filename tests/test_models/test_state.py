@@ -5,6 +5,7 @@
 import unittest
 import os
 from models.state import State
+from models.city import City
 from models.base_model import BaseModel
 from time import sleep
 from datetime import datetime
@@ -210,5 +211,28 @@ class TestState_to_dict(unittest.TestCase):
             State().to_dict("Invalid")
 
 
+class TestState_cities(unittest.TestCase):
+    """Unittest for the cities relationship of the State class"""
+
+    def test_cities(self):
+        s = State()
+        c1 = City()
+        c1.state_id = s.id
+        c2 = City()
+        c2.state_id = s.id
+        City()
+        self.assertEqual([c1, c2], s.cities)
+
+    def test_cities_empty(self):
+        self.assertEqual([], State().cities)
+
+    def test_cities_after_destroy(self):
+        s = State()
+        c = City()
+        c.state_id = s.id
+        storage.delete(c)
+        self.assertEqual([], s.cities)
+
+
 if __name__ == "__main__":
     unittest.main()
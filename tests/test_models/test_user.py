@@ -5,6 +5,8 @@
 import unittest
 import os
 from models.user import User
+from models.place import Place
+from models.review import Review
 from models.base_model import BaseModel
 from time import sleep
 from datetime import datetime
@@ -228,5 +230,23 @@ class TestUser_to_dict(unittest.TestCase):
             User().to_dict("Invalid")
 
 
+class TestUser_relationships(unittest.TestCase):
+    """Unittest for the places and reviews of the User class"""
+
+    def test_places(self):
+        u = User()
+        p = Place()
+        p.user_id = u.id
+        Place()
+        self.assertEqual([p], u.places)
+
+    def test_reviews(self):
+        u = User()
+        r = Review()
+        r.user_id = u.id
+        Review()
+        self.assertEqual([r], u.reviews)
+
+
 if __name__ == "__main__":
     unittest.main()